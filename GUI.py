@@ -1,10 +1,29 @@
+import time
+
+# Startup clock for --startup-benchmark (taken before the Qt imports)
+_STARTUP_T0 = time.perf_counter()
+
+import re
+import threading
+
 from logger import setup_logger
 from engine import (
     build_multi_plan,
+    draft_plan,
+    finish_plan,
     validate_plan,
     execute_plan,
     undo_last_rename,
+    undo_to,
+    export_copies,
+    CompactOperations,
+    PlanCache,
+    plan_roots,
+    FLAG_CONFLICT,
+    FLAG_EXISTS,
 )
+from config import MODE_ADVANCED, MODE_REGEX, RenameConfig, build_config_from_gui
+from locks import TreeLockedError, lock_trees
 from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -18,8 +37,7 @@ from PyQt6.QtWidgets import (
     QLineEdit,
     QComboBox,
     QSpinBox,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QSizePolicy,
     QFrame,
     QSplitter,
@@ -28,11 +46,24 @@ from PyQt6.QtWidgets import (
     QStyleOptionButton,
     QStyle,
     QApplication,
+    QProgressBar,
+    QToolButton,
+    QMenu,
+)
+from PyQt6.QtGui import QAction, QActionGroup, QShortcut, QKeySequence, QBrush
+from PyQt6.QtCore import (
+    Qt, QSize, QSettings, QTimer, QPropertyAnimation, QThread, pyqtSignal,
+    QAbstractTableModel, QModelIndex,
 )
-from PyQt6.QtGui import QAction, QActionGroup, QShortcut, QKeySequence
-from PyQt6.QtCore import Qt, QSize, QSettings, QTimer, QPropertyAnimation
 
-from core import CATEGORY_MAP, build_name_normal, build_name_advanced
+from preview_index import PreviewIndex, MODE_ALL, MODE_CONFLICTS, MODE_CHANGED
+from session import diff_plans, save_session, load_session
+from planio import close_plan
+from scanner import ScanFilter, split_globs
+from selection import SelectionModel
+
+# Category widgets shown only while regex mode is checked
+REGEX_FIELDS = ("regex_find", "regex_replace", "regex_ignore_case", "regex_case")
 
 
 class CheckBoxHeader(QHeaderView):
@@ -45,17 +76,319 @@ class CheckBoxHeader(QHeaderView):
         if logicalIndex == 0 and self.window:
             self.window.paint_header_section(painter, rect, logicalIndex)
 
-class NaturalSortItem(QTableWidgetItem):
-    def __lt__(self, other):
-        import re
+def _natural_key(text):
+    return [
+        int(chunk) if chunk.isdigit() else chunk.lower()
+        for chunk in re.split(r"(\d+)", text)
+    ]
+
+
+def _op_has_conflict(op, plan, errors):
+    # Detect internal conflicts
+    internal_conflict = any(
+        f"'{op.new_path.name}'" in msg for msg in plan.conflicts
+    )
+
+    # Detect external conflicts
+    external_conflict = any(
+        op.new_path.as_posix() in msg for msg in errors
+    )
+    return internal_conflict or external_conflict
+
+
+def _conflict_flags(plan, errors):
+    # Column-wise plans carry per-operation flags from planning and
+    # validation; other sequences (memory-mapped plans) fall back to
+    # matching conflict messages.
+    ops = plan.operations
+    if isinstance(ops, CompactOperations):
+        mask = FLAG_CONFLICT | FLAG_EXISTS
+        return [bool(ops.flags(i) & mask) for i in range(len(ops))]
+    return [_op_has_conflict(op, plan, errors) for op in ops]
+
+
+def _preview_index(plan, conflict_flags):
+    return PreviewIndex(
+        (op.category, op.old_path.name, op.new_path.name, flag)
+        for op, flag in zip(plan.operations, conflict_flags)
+    )
+
+
+class _PlanRows:
+    """Row accessors over a finished plan (same surface as engine.PlanDraft)."""
+
+    def __init__(self, plan):
+        self.operations = plan.operations
+        self._compact = isinstance(plan.operations, CompactOperations)
+
+    def __len__(self):
+        return len(self.operations)
+
+    def category(self, i):
+        return self.operations.category(i) if self._compact else self.operations[i].category
+
+    def old_path(self, i):
+        return self.operations.old_path(i) if self._compact else self.operations[i].old_path
+
+    def new_name(self, i):
+        return self.operations.new_name(i) if self._compact else self.operations[i].new_path.name
+
+
+class PreviewModel(QAbstractTableModel):
+    """
+    Preview rows, rendered on demand. Qt only asks for the cells on
+    screen, so a PlanDraft's new names are rendered as rows are scrolled
+    to. Rows map to source indices (draft or plan rows) through one list
+    that sorting and filtering rewrite; there are no per-row widgets.
+
+    conflict_flags is None while the background conflict pass runs.
+    """
+
+    HEADERS = ["", "Category", "Original Name", "New Name", "Conflict"]
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.source = None
+        self.conflict_flags = None
+        self._sort = None      # (column, order) last asked for by the header
+        self._order = None     # source indices in sorted order; None = source order
+        self._visible = None   # source indices the filter shows; None = all
+        self._rows = None      # row → source index; None = identity
+        self._count = 0
+
+    # -------------------------
+    # Contents
+    # -------------------------
+    def set_source(self, source, conflict_flags=None):
+        self.beginResetModel()
+        self.source = source
+        self.conflict_flags = conflict_flags
+        self._order = None
+        self._visible = None
+        # Sorting a draft would render every name up front; the sort is
+        # applied once the finished plan arrives
+        if self._sort is not None and source is not None and conflict_flags is not None:
+            self._order = self._sorted_order(*self._sort)
+        self._rebuild_rows()
+        self.endResetModel()
+
+    def set_visible(self, visible):
+        """Show only the given source indices (None: all)."""
+        self.beginResetModel()
+        self._visible = visible
+        self._rebuild_rows()
+        self.endResetModel()
+
+    def patch_source(self, source, conflict_flags):
+        """
+        Swap in a source whose rows line up one-to-one with the current
+        one (a fresh plan for the cached one) without a model reset:
+        scroll position and checkboxes stay, and only the cells on
+        screen are repainted.
+        """
+        self.source = source
+        self.conflict_flags = conflict_flags
+        if self._sort is not None:
+            # New names or flags may move rows
+            self.layoutAboutToBeChanged.emit()
+            self._order = self._sorted_order(*self._sort)
+            self._rebuild_rows()
+            self.layoutChanged.emit()
+        if self._count:
+            self.dataChanged.emit(self.index(0, 1), self.index(self._count - 1, len(self.HEADERS) - 1))
+
+    def _rebuild_rows(self):
+        if self.source is None:
+            self._rows, self._count = None, 0
+            return
+        if self._visible is None:
+            self._rows = self._order
+        elif self._order is None:
+            self._rows = sorted(self._visible)
+        else:
+            visible = self._visible
+            self._rows = [i for i in self._order if i in visible]
+        self._count = len(self.source) if self._rows is None else len(self._rows)
 
-        def natural_key(text):
-            return [
-                int(chunk) if chunk.isdigit() else chunk.lower()
-                for chunk in re.split(r"(\d+)", text)
-            ]
+    @property
+    def is_identity(self):
+        """True while row r shows source index r (unsorted, unfiltered)."""
+        return self._rows is None
 
-        return natural_key(self.text()) < natural_key(other.text())
+    def source_index(self, row):
+        return row if self._rows is None else self._rows[row]
+
+    # -------------------------
+    # Qt model interface
+    # -------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def _text(self, i, column):
+        source = self.source
+        if column == 1:
+            return source.category(i)
+        if column == 2:
+            return source.old_path(i).name
+        if column == 3:
+            if getattr(source, "names_pending", False):
+                # A costly plugin placeholder runs with the conflict pass
+                return "…"
+            name = source.new_name(i)
+            # A regex that does not match leaves the name as it is
+            return source.old_path(i).name if name is None else name
+        if column == 4:
+            if self.conflict_flags is None:
+                return "…"
+            return "Yes" if self.conflict_flags[i] else ""
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or self.source is None:
+            return None
+        i = self.source_index(index.row())
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._text(i, column)
+        if role == Qt.ItemDataRole.CheckStateRole and column == 0:
+            selected = self.window.selection.is_selected(i)
+            return Qt.CheckState.Checked if selected else Qt.CheckState.Unchecked
+
+        flags = self.conflict_flags
+        if flags is not None and column > 0 and flags[i]:
+            # Highlight entire row
+            if role == Qt.ItemDataRole.BackgroundRole:
+                return QBrush(Qt.GlobalColor.yellow)
+            if role == Qt.ItemDataRole.ForegroundRole and column == 4:
+                return QBrush(Qt.GlobalColor.red)
+        return None
+
+    def flags(self, index):
+        if index.column() == 0:
+            return Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if index.column() != 0 or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        self.window.on_row_check_toggled(index.row(), Qt.CheckState(value) == Qt.CheckState.Checked)
+        return True
+
+    def _sorted_order(self, column, order):
+        keys = [_natural_key(self._text(i, column)) for i in range(len(self.source))]
+        return sorted(
+            range(len(keys)), key=keys.__getitem__,
+            reverse=order == Qt.SortOrder.DescendingOrder,
+        )
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # Column 0 (checkboxes) is never sorted
+        if column not in (1, 2, 3, 4):
+            return
+        self._sort = (column, order)
+        if self.source is None:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._order = self._sorted_order(column, order)
+        self._rebuild_rows()
+        self.layoutChanged.emit()
+
+
+class PreviewWorker(QThread):
+    """
+    Builds and validates a plan off the GUI thread.
+    generation lets the window drop results that a newer preview superseded.
+    """
+    # generation, plan, ok, errors, conflict flags, PreviewIndex
+    plan_ready = pyqtSignal(int, object, bool, object, object, object)
+
+    def __init__(self, generation, folder, config, recursive, parent=None, scan_filter=None, draft=None):
+        super().__init__(parent)
+        self.generation = generation
+        self.folder = folder
+        self.config = config
+        self.recursive = recursive
+        self.scan_filter = scan_filter
+        # With a draft (already scanned and on screen), only its second
+        # phase runs here: remaining names, collisions, existing targets
+        self.draft = draft
+
+    def run(self):
+        if self.draft is not None:
+            plan = finish_plan(self.draft)
+        else:
+            plan = build_multi_plan(
+                folder=self.folder, config=self.config, recursive=self.recursive,
+                scan_filter=self.scan_filter,
+            )
+        if plan.operations:
+            ok, errors = validate_plan(plan)
+        else:
+            ok, errors = False, list(plan.conflicts)
+        flags = _conflict_flags(plan, errors)
+        self.plan_ready.emit(self.generation, plan, ok, errors, flags, _preview_index(plan, flags))
+
+
+class RenameWorker(QThread):
+    """
+    Runs execute_plan (kind "execute"), export_copies (kind "export"),
+    undo_last_rename (kind "undo") or undo_to(level) (kind "undo_to") off
+    the GUI thread. cancel() stops between two files; the engine leaves
+    the undo stack matching what was actually renamed.
+    """
+    progress = pyqtSignal(object)
+    rename_done = pyqtSignal(str, int, object, bool)
+
+    def __init__(self, kind, plan=None, parent=None, target=None, source_root=None, level=0):
+        super().__init__(parent)
+        self.kind = kind
+        self.plan = plan
+        self.target = target
+        self.source_root = source_root
+        self.level = level
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        # Another FreshNamer (or a cli.py run) working on these folders makes this fail at once
+        import engine
+        if self.kind in ("execute", "export"):
+            levels = [self.plan]
+        elif self.kind == "undo_to":
+            levels = engine._undo_stack[self.level:]
+        else:
+            levels = engine._undo_stack[-1:]
+        try:
+            with lock_trees(plan_roots(levels), exclusive=self.kind != "export", purpose=f"FreshNamer {self.kind}"):
+                count, failures = self._run()
+        except TreeLockedError as e:
+            count, failures = 0, [str(e)]
+        self.rename_done.emit(self.kind, count, failures, self._cancel.is_set())
+
+    def _run(self):
+        if self.kind == "execute":
+            return execute_plan(self.plan, progress=self.progress.emit, cancel=self._cancel)
+        if self.kind == "export":
+            count, failures, _ = export_copies(
+                self.plan, self.target, source_root=self.source_root,
+                progress=self.progress.emit, cancel=self._cancel,
+            )
+            return count, failures
+        if self.kind == "undo_to":
+            return undo_to(self.level, progress=self.progress.emit, cancel=self._cancel)
+        return undo_last_rename(progress=self.progress.emit, cancel=self._cancel)
 
 
 class MainWindow(QWidget):
@@ -82,6 +415,18 @@ class MainWindow(QWidget):
 
         # Initial folder state (used by preview)
         self.current_folder = ""
+        self.current_plan = None
+
+        # Bumped on every preview; background results from older ones are dropped
+        self._preview_generation = 0
+        self._preview_worker = None
+
+        # Finished previews by (folder snapshot, settings); see update_preview
+        self.plan_cache = PlanCache()
+        # (scan key, config, draft) of the preview being finished in the background
+        self._pending_cache = None
+        # Plan restored from the last session while its fresh one is built
+        self._session_plan = None
 
         # Restore window geometry
         geometry = self.settings.value("window_geometry")
@@ -90,10 +435,27 @@ class MainWindow(QWidget):
 
 
         # Restore dark mode preference
+        # Restore scan pruning settings
+        self.chk_skip_hidden.blockSignals(True)
+        self.chk_follow_symlinks.blockSignals(True)
+        self.txt_exclude.setText(self.settings.value("scan_exclude", "", str))
+        self.chk_skip_hidden.setChecked(self.settings.value("scan_skip_hidden", False, bool))
+        self.chk_follow_symlinks.setChecked(self.settings.value("scan_follow_symlinks", False, bool))
+        self.chk_skip_hidden.blockSignals(False)
+        self.chk_follow_symlinks.blockSignals(False)
+
         dark_enabled = self.settings.value("dark_mode", False, bool)
         self.chk_dark_mode.setChecked(dark_enabled)
         self.apply_dark_mode(dark_enabled)
 
+        # Ctrl+A / Ctrl+I: select all / invert selection in the preview
+        self.shortcut_select_all = QShortcut(QKeySequence("Ctrl+A"), self.table_preview)
+        self.shortcut_select_all.activated.connect(lambda: self.set_all_selected(True))
+        self.shortcut_invert = QShortcut(QKeySequence("Ctrl+I"), self.table_preview)
+        self.shortcut_invert.activated.connect(self.invert_selection)
+        for shortcut in (self.shortcut_select_all, self.shortcut_invert):
+            shortcut.setContext(Qt.ShortcutContext.WidgetWithChildrenShortcut)
+
         # Ctrl+Z to trigger undo
         self.shortcut_undo = QShortcut(QKeySequence("Ctrl+Z"), self)
         self.shortcut_undo.activated.connect(self.on_undo_clicked)
@@ -105,6 +467,10 @@ class MainWindow(QWidget):
         self._status_anim = None
         self._status_timer = None
 
+        # Startup hooks (see paintEvent / _finish_startup)
+        self.on_first_paint = None
+        self._first_paint_done = False
+
 
 
 
@@ -122,8 +488,15 @@ class MainWindow(QWidget):
         self.cmb_image_padding.addItems(["1", "2", "3", "4"])
         self.spin_image_start = QSpinBox()
         self.spin_image_start.setMinimum(0)
+        self.cmb_image_order = self._number_order_combo()
+        self.cmb_image_renumber = self._renumber_combo()
         self.chk_image_advanced = QCheckBox()
         self.txt_image_advanced = QLineEdit()
+        self.chk_image_regex = QCheckBox()
+        self.txt_image_regex_find = QLineEdit()
+        self.txt_image_regex_replace = QLineEdit()
+        self.chk_image_regex_ignore_case = QCheckBox()
+        self.cmb_image_regex_case = self._regex_case_combo()
 
         # Video Widgets
         self.chk_video_enabled = QCheckBox()
@@ -133,8 +506,15 @@ class MainWindow(QWidget):
         self.cmb_video_padding.addItems(["1", "2", "3", "4"])
         self.spin_video_start = QSpinBox()
         self.spin_video_start.setMinimum(0)
+        self.cmb_video_order = self._number_order_combo()
+        self.cmb_video_renumber = self._renumber_combo()
         self.chk_video_advanced = QCheckBox()
         self.txt_video_advanced = QLineEdit()
+        self.chk_video_regex = QCheckBox()
+        self.txt_video_regex_find = QLineEdit()
+        self.txt_video_regex_replace = QLineEdit()
+        self.chk_video_regex_ignore_case = QCheckBox()
+        self.cmb_video_regex_case = self._regex_case_combo()
 
         # GIF Widgets
         self.chk_gif_enabled = QCheckBox()
@@ -144,8 +524,15 @@ class MainWindow(QWidget):
         self.cmb_gif_padding.addItems(["1", "2", "3", "4"])
         self.spin_gif_start = QSpinBox()
         self.spin_gif_start.setMinimum(0)
+        self.cmb_gif_order = self._number_order_combo()
+        self.cmb_gif_renumber = self._renumber_combo()
         self.chk_gif_advanced = QCheckBox()
         self.txt_gif_advanced = QLineEdit()
+        self.chk_gif_regex = QCheckBox()
+        self.txt_gif_regex_find = QLineEdit()
+        self.txt_gif_regex_replace = QLineEdit()
+        self.chk_gif_regex_ignore_case = QCheckBox()
+        self.cmb_gif_regex_case = self._regex_case_combo()
 
         # Audio Widgets
         self.chk_audio_enabled = QCheckBox()
@@ -155,8 +542,15 @@ class MainWindow(QWidget):
         self.cmb_audio_padding.addItems(["1", "2", "3", "4"])
         self.spin_audio_start = QSpinBox()
         self.spin_audio_start.setMinimum(0)
+        self.cmb_audio_order = self._number_order_combo()
+        self.cmb_audio_renumber = self._renumber_combo()
         self.chk_audio_advanced = QCheckBox()
         self.txt_audio_advanced = QLineEdit()
+        self.chk_audio_regex = QCheckBox()
+        self.txt_audio_regex_find = QLineEdit()
+        self.txt_audio_regex_replace = QLineEdit()
+        self.chk_audio_regex_ignore_case = QCheckBox()
+        self.cmb_audio_regex_case = self._regex_case_combo()
 
         # Document Widgets
         self.chk_document_enabled = QCheckBox()
@@ -166,14 +560,65 @@ class MainWindow(QWidget):
         self.cmb_document_padding.addItems(["1", "2", "3", "4"])
         self.spin_document_start = QSpinBox()
         self.spin_document_start.setMinimum(0)
+        self.cmb_document_order = self._number_order_combo()
+        self.cmb_document_renumber = self._renumber_combo()
         self.chk_document_advanced = QCheckBox()
         self.txt_document_advanced = QLineEdit()
+        self.chk_document_regex = QCheckBox()
+        self.txt_document_regex_find = QLineEdit()
+        self.txt_document_regex_replace = QLineEdit()
+        self.chk_document_regex_ignore_case = QCheckBox()
+        self.cmb_document_regex_case = self._regex_case_combo()
 
         # Bottom bar widgets
         self.txt_folder = QLineEdit()
         self.btn_browse = QPushButton("Browse")
         self.chk_recursive = QCheckBox("Recursive")
+        # Scan pruning (applied while walking; see scanner.ScanFilter)
+        self.txt_exclude = QLineEdit()
+        self.txt_exclude.setPlaceholderText("Exclude: .git, node_modules, *.tmp")
+        self.txt_exclude.setToolTip("Comma-separated folder/file globs skipped during the scan")
+        self.chk_skip_hidden = QCheckBox("Skip hidden folders")
+        self.chk_follow_symlinks = QCheckBox("Follow symlinks")
+        self.chk_follow_symlinks.setToolTip("Descend into symlinked folders; files reachable twice are renamed once")
         self.btn_rename = QPushButton("Rename")
+        # Output mode: rename in place, or write renamed copies elsewhere
+        self.cmb_output_mode = QComboBox()
+        self.cmb_output_mode.addItem("Rename in place", "execute")
+        self.cmb_output_mode.addItem("Export renamed copies", "export")
+
+    @staticmethod
+    def _number_order_combo():
+        combo = QComboBox()
+        combo.addItem("Name", "name")
+        combo.addItem("Date modified", "mtime")
+        combo.addItem("Size", "size")
+        combo.addItem("Date created", "ctime")
+        combo.addItem("Capture date (EXIF)", "captured")
+        combo.setToolTip("Order in which files receive their numbers")
+        return combo
+
+    @staticmethod
+    def _renumber_combo():
+        combo = QComboBox()
+        combo.addItem("Renumber all", "shift")
+        combo.addItem("Keep numbered, fill gaps", "fill")
+        combo.addItem("Keep numbered, append", "append")
+        combo.setToolTip(
+            "Files already named prefix + number + suffix can keep their number;\n"
+            "only the others are renamed (normal mode)"
+        )
+        return combo
+
+    @staticmethod
+    def _regex_case_combo():
+        combo = QComboBox()
+        combo.addItem("Keep case", "keep")
+        combo.addItem("lowercase", "lower")
+        combo.addItem("UPPERCASE", "upper")
+        combo.addItem("Title Case", "title")
+        combo.setToolTip("Case applied to the name after the replacement")
+        return combo
 
     # -------------------------
     # Widget dictionaries
@@ -186,8 +631,15 @@ class MainWindow(QWidget):
             "suffix": self.txt_image_suffix,
             "padding": self.cmb_image_padding,
             "start": self.spin_image_start,
+            "order": self.cmb_image_order,
+            "renumber": self.cmb_image_renumber,
             "advanced_mode": self.chk_image_advanced,
             "advanced_text": self.txt_image_advanced,
+            "regex_mode": self.chk_image_regex,
+            "regex_find": self.txt_image_regex_find,
+            "regex_replace": self.txt_image_regex_replace,
+            "regex_ignore_case": self.chk_image_regex_ignore_case,
+            "regex_case": self.cmb_image_regex_case,
         }
 
         self.widgets_video = {
@@ -196,8 +648,15 @@ class MainWindow(QWidget):
             "suffix": self.txt_video_suffix,
             "padding": self.cmb_video_padding,
             "start": self.spin_video_start,
+            "order": self.cmb_video_order,
+            "renumber": self.cmb_video_renumber,
             "advanced_mode": self.chk_video_advanced,
             "advanced_text": self.txt_video_advanced,
+            "regex_mode": self.chk_video_regex,
+            "regex_find": self.txt_video_regex_find,
+            "regex_replace": self.txt_video_regex_replace,
+            "regex_ignore_case": self.chk_video_regex_ignore_case,
+            "regex_case": self.cmb_video_regex_case,
         }
 
         self.widgets_gif = {
@@ -206,8 +665,15 @@ class MainWindow(QWidget):
             "suffix": self.txt_gif_suffix,
             "padding": self.cmb_gif_padding,
             "start": self.spin_gif_start,
+            "order": self.cmb_gif_order,
+            "renumber": self.cmb_gif_renumber,
             "advanced_mode": self.chk_gif_advanced,
             "advanced_text": self.txt_gif_advanced,
+            "regex_mode": self.chk_gif_regex,
+            "regex_find": self.txt_gif_regex_find,
+            "regex_replace": self.txt_gif_regex_replace,
+            "regex_ignore_case": self.chk_gif_regex_ignore_case,
+            "regex_case": self.cmb_gif_regex_case,
         }
 
         self.widgets_audio = {
@@ -216,8 +682,15 @@ class MainWindow(QWidget):
             "suffix": self.txt_audio_suffix,
             "padding": self.cmb_audio_padding,
             "start": self.spin_audio_start,
+            "order": self.cmb_audio_order,
+            "renumber": self.cmb_audio_renumber,
             "advanced_mode": self.chk_audio_advanced,
             "advanced_text": self.txt_audio_advanced,
+            "regex_mode": self.chk_audio_regex,
+            "regex_find": self.txt_audio_regex_find,
+            "regex_replace": self.txt_audio_regex_replace,
+            "regex_ignore_case": self.chk_audio_regex_ignore_case,
+            "regex_case": self.cmb_audio_regex_case,
         }
 
         self.widgets_document = {
@@ -226,8 +699,15 @@ class MainWindow(QWidget):
             "suffix": self.txt_document_suffix,
             "padding": self.cmb_document_padding,
             "start": self.spin_document_start,
+            "order": self.cmb_document_order,
+            "renumber": self.cmb_document_renumber,
             "advanced_mode": self.chk_document_advanced,
             "advanced_text": self.txt_document_advanced,
+            "regex_mode": self.chk_document_regex,
+            "regex_find": self.txt_document_regex_find,
+            "regex_replace": self.txt_document_regex_replace,
+            "regex_ignore_case": self.chk_document_regex_ignore_case,
+            "regex_case": self.cmb_document_regex_case,
         }
 
         # Unified map for preview logic
@@ -282,21 +762,32 @@ class MainWindow(QWidget):
         # -------------------------
         # Category pages (center)
         # -------------------------
+        # Only the visible page is built up front; the rest are filled
+        # into empty containers on first use or when the app is idle.
         self.pages = QStackedWidget()
-        self.pages.addWidget(self.build_category_page("image", self.widgets_image))
-        self.pages.addWidget(self.build_category_page("video", self.widgets_video))
-        self.pages.addWidget(self.build_category_page("gif", self.widgets_gif))
-        self.pages.addWidget(self.build_category_page("audio", self.widgets_audio))
-        self.pages.addWidget(self.build_category_page("document", self.widgets_document))
+        self._page_specs = [
+            ("image", self.widgets_image),
+            ("video", self.widgets_video),
+            ("gif", self.widgets_gif),
+            ("audio", self.widgets_audio),
+            ("document", self.widgets_document),
+        ]
+        self._built_pages = set()
+        for _ in self._page_specs:
+            container = QWidget()
+            container_layout = QVBoxLayout(container)
+            container_layout.setContentsMargins(0, 0, 0, 0)
+            self.pages.addWidget(container)
+        self.ensure_category_page(0)
         self.log.debug("[GUI] Creating category pages")
 
 
         # Toolbar → page switching
-        self.action_image.triggered.connect(lambda: self.pages.setCurrentIndex(0))
-        self.action_video.triggered.connect(lambda: self.pages.setCurrentIndex(1))
-        self.action_gif.triggered.connect(lambda: self.pages.setCurrentIndex(2))
-        self.action_audio.triggered.connect(lambda: self.pages.setCurrentIndex(3))
-        self.action_document.triggered.connect(lambda: self.pages.setCurrentIndex(4))
+        self.action_image.triggered.connect(lambda: self.show_category_page(0))
+        self.action_video.triggered.connect(lambda: self.show_category_page(1))
+        self.action_gif.triggered.connect(lambda: self.show_category_page(2))
+        self.action_audio.triggered.connect(lambda: self.show_category_page(3))
+        self.action_document.triggered.connect(lambda: self.show_category_page(4))
 
         # -------------------------
         # Splitter (settings | preview)
@@ -346,7 +837,23 @@ class MainWindow(QWidget):
         self.bottom_bar.addWidget(self.txt_folder)
         self.bottom_bar.addWidget(self.btn_browse)
         self.bottom_bar.addWidget(self.chk_recursive)
+        self.bottom_bar.addWidget(self.chk_skip_hidden)
+        self.bottom_bar.addWidget(self.chk_follow_symlinks)
+        self.bottom_bar.addWidget(self.txt_exclude)
         self.bottom_bar.addStretch()
+
+        # Rename/undo progress (visible only while a RenameWorker runs)
+        self.progress_rename = QProgressBar()
+        self.progress_rename.setTextVisible(True)
+        self.progress_rename.setVisible(False)
+        self.btn_cancel_rename = QPushButton("Cancel")
+        self.btn_cancel_rename.setVisible(False)
+        self.btn_cancel_rename.clicked.connect(self.on_cancel_rename_clicked)
+        self._rename_worker = None
+        self.bottom_bar.addWidget(self.progress_rename)
+        self.bottom_bar.addWidget(self.btn_cancel_rename)
+
+        self.bottom_bar.addWidget(self.cmb_output_mode)
         self.bottom_bar.addWidget(self.btn_rename)
 
         # Undo button (always present, disabled until needed)
@@ -355,6 +862,15 @@ class MainWindow(QWidget):
         self.btn_undo.setEnabled(len(_undo_stack) > 0)
         self.bottom_bar.addWidget(self.btn_undo)
 
+        # Undo several renames at once (one composed rename set)
+        self.btn_undo_to = QToolButton()
+        self.btn_undo_to.setText("Undo To…")
+        self.btn_undo_to.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
+        self.btn_undo_to.setMenu(QMenu(self.btn_undo_to))
+        self.btn_undo_to.menu().aboutToShow.connect(self._populate_undo_menu)
+        self.btn_undo_to.setEnabled(len(_undo_stack) > 1)
+        self.bottom_bar.addWidget(self.btn_undo_to)
+
         main_layout.addLayout(self.bottom_bar)
 
         # Connect folder browsing
@@ -374,6 +890,46 @@ class MainWindow(QWidget):
         self.wire_rename_button()
 
 
+    # -------------------------
+    # Lazy category pages
+    # -------------------------
+    def ensure_category_page(self, index):
+        if index in self._built_pages:
+            return
+        category_name, widget_dict = self._page_specs[index]
+        self.pages.widget(index).layout().addWidget(
+            self.build_category_page(category_name, widget_dict)
+        )
+        self._built_pages.add(index)
+
+    def show_category_page(self, index):
+        self.ensure_category_page(index)
+        self.pages.setCurrentIndex(index)
+
+    def _build_pages_when_idle(self):
+        """Build one remaining page per event-loop turn after the first paint."""
+        for index in range(len(self._page_specs)):
+            if index not in self._built_pages:
+                self.ensure_category_page(index)
+                QTimer.singleShot(0, self._build_pages_when_idle)
+                return
+
+    # -------------------------
+    # Startup: work deferred until after the first paint
+    # -------------------------
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._first_paint_done:
+            self._first_paint_done = True
+            QTimer.singleShot(0, self._finish_startup)
+
+    def _finish_startup(self):
+        self.log.debug("[GUI] First paint done; finishing deferred setup")
+        if self.on_first_paint:
+            self.on_first_paint()
+        self.restore_last_session()
+        self._build_pages_when_idle()
+
     # -------------------------
     # Category Page Builder (C3 style)
     # -------------------------
@@ -408,6 +964,8 @@ class MainWindow(QWidget):
         self.add_row(layout, "Suffix", widget_dict["suffix"])
         self.add_row(layout, "Padding", widget_dict["padding"])
         self.add_row(layout, "Start Number", widget_dict["start"])
+        self.add_row(layout, "Number By", widget_dict["order"])
+        self.add_row(layout, "Existing Numbers", widget_dict["renumber"])
 
         # -------------------------
         # Advanced Section
@@ -425,11 +983,36 @@ class MainWindow(QWidget):
         self.add_row(layout, "Advanced Text", widget_dict["advanced_text"])
 
         # Hide advanced text unless advanced mode is checked
-        widget_dict["advanced_text"].setVisible(False)
+        widget_dict["advanced_text"].setVisible(widget_dict["advanced_mode"].isChecked())
         widget_dict["advanced_mode"].stateChanged.connect(
             lambda state, w=widget_dict["advanced_text"]: w.setVisible(state == Qt.CheckState.Checked)
         )
 
+        # -------------------------
+        # Regex Section
+        # -------------------------
+        regex_label = QLabel("Regex")
+        regex_label.setStyleSheet("font-size: 14px; font-weight: bold; margin-top: 10px;")
+        layout.addWidget(regex_label)
+
+        regex_line = QFrame()
+        regex_line.setFrameShape(QFrame.Shape.HLine)
+        regex_line.setFrameShadow(QFrame.Shadow.Sunken)
+        layout.addWidget(regex_line)
+
+        self.add_row(layout, "Regex Mode", widget_dict["regex_mode"])
+        self.add_row(layout, "Find", widget_dict["regex_find"])
+        self.add_row(layout, "Replace", widget_dict["regex_replace"])
+        self.add_row(layout, "Ignore Case", widget_dict["regex_ignore_case"])
+        self.add_row(layout, "Result Case", widget_dict["regex_case"])
+
+        # Hide the regex fields unless regex mode is checked
+        for key in REGEX_FIELDS:
+            widget_dict[key].setVisible(widget_dict["regex_mode"].isChecked())
+            widget_dict["regex_mode"].stateChanged.connect(
+                lambda state, w=widget_dict[key]: w.setVisible(state == Qt.CheckState.Checked)
+            )
+
         layout.addStretch()
         return page
 
@@ -485,8 +1068,35 @@ class MainWindow(QWidget):
         filter_row.addWidget(self.btn_filter_conflicts)
         filter_row.addWidget(self.btn_filter_changed)
 
+        # Bulk selection (see SelectionModel)
+        self.btn_select = QToolButton()
+        self.btn_select.setText("Select")
+        self.btn_select.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
+        select_menu = QMenu(self.btn_select)
+        select_menu.addAction("Select all", lambda: self.set_all_selected(True))
+        select_menu.addAction("Select none", lambda: self.set_all_selected(False))
+        select_menu.addAction("Invert selection", self.invert_selection)
+        select_menu.addSeparator()
+        select_menu.addAction("Select shown only", lambda: self.select_shown(True, exclusive=True))
+        select_menu.addAction("Add shown to selection", lambda: self.select_shown(True))
+        select_menu.addAction("Remove shown from selection", lambda: self.select_shown(False))
+        self.btn_select.setMenu(select_menu)
+        self.btn_select.setToolTip("Shift+click a checkbox to apply it to every row in between")
+        filter_row.addWidget(self.btn_select)
+
+        self.lbl_selection = QLabel("")
+        self.lbl_selection.setStyleSheet("color: gray;")
+        filter_row.addWidget(self.lbl_selection)
+
         filter_row.addStretch()
 
+        self.txt_search = QLineEdit()
+        self.txt_search.setPlaceholderText("Search names…")
+        self.txt_search.setClearButtonEnabled(True)
+        self.chk_search_regex = QCheckBox("Regex")
+        filter_row.addWidget(self.txt_search)
+        filter_row.addWidget(self.chk_search_regex)
+
         filter_row.addWidget(QLabel("Category:"))
         self.cmb_filter_category = QComboBox()
         self.cmb_filter_category.addItem("All")
@@ -495,20 +1105,23 @@ class MainWindow(QWidget):
 
         self.preview_layout.addLayout(filter_row)
 
-        # Preview table
-        self.table_preview = QTableWidget()
+        # Filter state (see apply_preview_filters)
+        self.filter_mode = MODE_ALL
+        self.preview_index = None
+        # Plan indices the filter shows; None = all
+        self._visible_rows = None
+
+        # Preview table: a view over PreviewModel, which renders rows on demand
+        self.table_preview = QTableView()
+        self.preview_model = PreviewModel(self)
+        self.table_preview.setModel(self.preview_model)
         self.log.debug("[GUI] Preview table created")
-        self.table_preview.setColumnCount(5)
-        self.table_preview.setHorizontalHeaderLabels(
-            ["", "Category", "Original Name", "New Name", "Conflict"]
-        )
         self.table_preview.setSortingEnabled(False)
 
-        # Master checkbox state
-        self.master_checked = True
-
-        # Sync row checkboxes → master checkbox
-        self.table_preview.itemChanged.connect(self.on_row_checkbox_changed)
+        # Checked rows by plan index; the row checkboxes and the master
+        # checkbox read from it (see PreviewModel.data)
+        self.selection = SelectionModel()
+        self._last_check_row = None
 
         # Override header painting to draw checkbox
         header = CheckBoxHeader(self.table_preview, window=self)
@@ -537,14 +1150,23 @@ class MainWindow(QWidget):
         self.log.debug("[GUI] Master checkbox header connected")
 
 
-        # Block sorting on column 0 at the view level
-        self.table_preview.sortItems = self._sort_items_override
+        # Sorting moves rows; a Shift+click range anchor no longer applies
+        self.preview_model.layoutChanged.connect(self._on_preview_layout_changed)
+        self.preview_model.modelReset.connect(self._on_preview_layout_changed)
 
         # Enable sorting for other columns
         self.table_preview.setSortingEnabled(True)
         self.log.debug("[GUI] Sorting enabled for preview table")
 
 
+        # Banner shown while a cached preview from the last session is on screen
+        self.lbl_stale = QLabel("Showing cached preview from last session — checking for changes…")
+        self.lbl_stale.setStyleSheet(
+            "font-size: 12px; padding: 4px 6px; background-color: #FFF4CE; color: #5C4400;"
+        )
+        self.lbl_stale.setVisible(False)
+        self.preview_layout.addWidget(self.lbl_stale)
+
         self.preview_layout.addWidget(self.table_preview)
 
 
@@ -564,8 +1186,9 @@ class MainWindow(QWidget):
 
         self.preview_layout.setStretch(0, 0)  # header row
         self.preview_layout.setStretch(1, 0)  # filter row
-        self.preview_layout.setStretch(2, 1)  # table expands
-        self.preview_layout.setStretch(3, 0)  # status label keeps its height
+        self.preview_layout.setStretch(2, 0)  # stale-preview banner
+        self.preview_layout.setStretch(3, 1)  # table expands
+        self.preview_layout.setStretch(4, 0)  # status label keeps its height
 
         # Force layout recalculation for proper sizing
         self.preview_container.updateGeometry()
@@ -577,8 +1200,9 @@ class MainWindow(QWidget):
         # Stretch rules so the table doesn't crush the status bar
         self.preview_layout.setStretch(0, 0)  # header row
         self.preview_layout.setStretch(1, 0)  # filter row
-        self.preview_layout.setStretch(2, 1)  # table gets all flexible space
-        self.preview_layout.setStretch(3, 0)  # status label keeps its height
+        self.preview_layout.setStretch(2, 0)  # stale-preview banner
+        self.preview_layout.setStretch(3, 1)  # table gets all flexible space
+        self.preview_layout.setStretch(4, 0)  # status label keeps its height
 
 
         # Dark mode toggle (with persistence)
@@ -594,6 +1218,8 @@ class MainWindow(QWidget):
         self.btn_filter_conflicts.clicked.connect(self.apply_preview_filters)
         self.btn_filter_changed.clicked.connect(self.apply_preview_filters)
         self.cmb_filter_category.currentIndexChanged.connect(self.apply_preview_filters)
+        self.txt_search.textChanged.connect(self.apply_preview_filters)
+        self.chk_search_regex.stateChanged.connect(self.apply_preview_filters)
         
 
     # -------------------------
@@ -606,7 +1232,7 @@ class MainWindow(QWidget):
                 background-color: #202124;
                 color: #E8EAED;
             }
-            QLineEdit, QComboBox, QSpinBox, QTableWidget {
+            QLineEdit, QComboBox, QSpinBox, QTableView {
                 background-color: #303134;
                 color: #E8EAED;
                 border: 1px solid #5f6368;
@@ -645,7 +1271,7 @@ class MainWindow(QWidget):
                 background-color: #FFFFFF;
                 color: #000000;
             }
-            QLineEdit, QComboBox, QSpinBox, QTableWidget {
+            QLineEdit, QComboBox, QSpinBox, QTableView {
                 background-color: #FFFFFF;
                 color: #000000;
                 border: 1px solid #C0C0C0;
@@ -693,54 +1319,68 @@ class MainWindow(QWidget):
 
 
 
+    def scan_filter(self):
+        return ScanFilter(
+            exclude=split_globs(self.txt_exclude.text()),
+            skip_hidden=self.chk_skip_hidden.isChecked(),
+            follow_symlinks=self.chk_follow_symlinks.isChecked(),
+        )
+
+    def on_scan_filter_changed(self, *_):
+        self.settings.setValue("scan_exclude", self.txt_exclude.text())
+        self.settings.setValue("scan_skip_hidden", self.chk_skip_hidden.isChecked())
+        self.settings.setValue("scan_follow_symlinks", self.chk_follow_symlinks.isChecked())
+        self.update_preview()
+
     def apply_preview_filters(self):
         """
         Apply filters based on:
         - which filter button is 'active'
         - selected category in the combo box
+        - search text (substring or regex)
+
+        Membership comes from the precomputed PreviewIndex; the model
+        rebuilds its row list from it without touching any widget per row.
         """
         sender = self.sender()
-        mode = "all"
 
         if sender == self.btn_filter_conflicts:
-            mode = "conflicts"
+            self.filter_mode = MODE_CONFLICTS
         elif sender == self.btn_filter_changed:
-            mode = "changed"
-        elif sender == self.btn_filter_all or sender == self.cmb_filter_category:
-            mode = "all"
-
-        selected_category = self.cmb_filter_category.currentText()
-        self.log.debug(f"[GUI] Applying preview filters | mode={mode} category={selected_category}")
-
+            self.filter_mode = MODE_CHANGED
+        elif sender == self.btn_filter_all:
+            self.filter_mode = MODE_ALL
 
-        row_count = self.table_preview.rowCount()
-        for row in range(row_count):
-            cat_item = self.table_preview.item(row, 1)
-            orig_item = self.table_preview.item(row, 2)
-            new_item = self.table_preview.item(row, 3)
-            conflict_item = self.table_preview.item(row, 4)
-
-            if not (cat_item and orig_item and new_item and conflict_item):
-                continue
-
-            cat = cat_item.text()
-            orig = orig_item.text()
-            new = new_item.text()
-            has_conflict = conflict_item.text().strip().lower() == "yes"
+        if self.preview_index is None:
+            return
 
-            show = True
+        selected_category = self.cmb_filter_category.currentText()
+        search_text = self.txt_search.text()
+        use_regex = self.chk_search_regex.isChecked()
+        self.log.debug(
+            f"[GUI] Applying preview filters | mode={self.filter_mode} category={selected_category} "
+            f"search='{search_text}' regex={use_regex}"
+        )
 
-            # Category filter
-            if selected_category != "All" and cat != selected_category:
-                show = False
+        try:
+            visible = self.preview_index.visible(
+                mode=self.filter_mode,
+                category=None if selected_category == "All" else selected_category,
+                text=search_text,
+                regex=use_regex,
+            )
+        except re.error as e:
+            self.set_status(f"Invalid search pattern: {e}")
+            return
 
-            # Mode filter
-            if mode == "conflicts" and not has_conflict:
-                show = False
-            elif mode == "changed" and orig == new:
-                show = False
+        if visible == self._visible_rows:
+            return
+        self._visible_rows = visible
+        self.preview_model.set_visible(visible)
 
-            self.table_preview.setRowHidden(row, not show)
+    def _on_preview_layout_changed(self):
+        # Rows moved or were rebuilt: the previous Shift+click anchor is stale
+        self._last_check_row = None
 
 
     # -------------------------
@@ -762,6 +1402,10 @@ class MainWindow(QWidget):
         # Folder / recursive changes
         self.txt_folder.textChanged.connect(self.update_preview)
         self.chk_recursive.stateChanged.connect(self.update_preview)
+        # Re-scan when editing is done, not on every keystroke
+        self.txt_exclude.editingFinished.connect(self.on_scan_filter_changed)
+        self.chk_skip_hidden.stateChanged.connect(self.on_scan_filter_changed)
+        self.chk_follow_symlinks.stateChanged.connect(self.on_scan_filter_changed)
 
         # All category widgets
         for category_key, widget_dict in self.widget_dicts.items():
@@ -781,6 +1425,8 @@ class MainWindow(QWidget):
 
         # padding: QComboBox
         widget_dict["padding"].currentIndexChanged.connect(self.update_preview)
+        widget_dict["order"].currentIndexChanged.connect(self.update_preview)
+        widget_dict["renumber"].currentIndexChanged.connect(self.update_preview)
 
         # start: QSpinBox
         widget_dict["start"].valueChanged.connect(self.update_preview)
@@ -788,6 +1434,13 @@ class MainWindow(QWidget):
         # advanced_mode: QCheckBox
         widget_dict["advanced_mode"].stateChanged.connect(self.update_preview)
 
+        # regex: find / replace text, flags and result case
+        widget_dict["regex_mode"].stateChanged.connect(self.update_preview)
+        widget_dict["regex_find"].textChanged.connect(self.update_preview)
+        widget_dict["regex_replace"].textChanged.connect(self.update_preview)
+        widget_dict["regex_ignore_case"].stateChanged.connect(self.update_preview)
+        widget_dict["regex_case"].currentIndexChanged.connect(self.update_preview)
+
     # -------------------------
     # Folder browsing
     # -------------------------
@@ -826,31 +1479,51 @@ class MainWindow(QWidget):
     # -------------------------
     def extract_config(self):
         """
-        Build a config dict based on the current state of all widgets.
-        This is what renamer_core expects.
+        Build the RenameConfig for the current state of all widgets.
+        This is what the engine expects.
         """
-        config = {}
-
-        for category_key, widgets in self.widget_dicts.items():
-            enabled = widgets["enabled"].isChecked()
-            prefix = widgets["prefix"].text()
-            suffix = widgets["suffix"].text()
-            padding = int(widgets["padding"].currentText())
-            start = widgets["start"].value()
-            advanced_mode = widgets["advanced_mode"].isChecked()
-            advanced_text = widgets["advanced_text"].text()
-
-            config[category_key] = {
-                "enabled": enabled,
-                "prefix": prefix,
-                "suffix": suffix,
-                "padding": padding,
-                "start": start,
-                "advanced_mode": advanced_mode,
-                "advanced_text": advanced_text,
-            }
+        return build_config_from_gui(self)
+
+    def apply_config(self, config):
+        """
+        Set widgets from a RenameConfig (or its dict form, as stored in
+        the session) without firing a preview refresh per widget.
+        """
+        for category_key, values in RenameConfig.coerce(config).items():
+            widgets = self.widget_dicts.get(category_key)
+            if widgets is None:
+                continue
 
-        return config
+            for widget in widgets.values():
+                widget.blockSignals(True)
+
+            widgets["enabled"].setChecked(values.enabled)
+            widgets["prefix"].setText(values.prefix)
+            widgets["suffix"].setText(values.suffix)
+            padding_index = widgets["padding"].findText(str(values.padding))
+            if padding_index >= 0:
+                widgets["padding"].setCurrentIndex(padding_index)
+            widgets["start"].setValue(values.start)
+            order_index = widgets["order"].findData(values.order)
+            widgets["order"].setCurrentIndex(max(order_index, 0))
+            renumber_index = widgets["renumber"].findData(values.renumber)
+            widgets["renumber"].setCurrentIndex(max(renumber_index, 0))
+            widgets["advanced_mode"].setChecked(values.mode == MODE_ADVANCED)
+            widgets["advanced_text"].setText(values.advanced)
+            widgets["regex_mode"].setChecked(values.mode == MODE_REGEX)
+            widgets["regex_find"].setText(values.regex_pattern)
+            widgets["regex_replace"].setText(values.regex_replace)
+            widgets["regex_ignore_case"].setChecked(values.regex_ignore_case)
+            case_index = widgets["regex_case"].findData(values.regex_case)
+            widgets["regex_case"].setCurrentIndex(max(case_index, 0))
+            if widgets["advanced_text"].parent() is not None:
+                # Page already built (unbuilt pages pick this up in build_category_page)
+                widgets["advanced_text"].setVisible(widgets["advanced_mode"].isChecked())
+                for key in REGEX_FIELDS:
+                    widgets[key].setVisible(widgets["regex_mode"].isChecked())
+
+            for widget in widgets.values():
+                widget.blockSignals(False)
 
     # -------------------------
     # Preview update logic (multi-category)
@@ -863,8 +1536,13 @@ class MainWindow(QWidget):
         folder = self.txt_folder.text().strip()
         self.current_folder = folder
 
+        # Any background result for an older preview is now stale
+        self._preview_generation += 1
+        self.lbl_stale.setVisible(False)
+
         # Clear table
-        self.table_preview.setRowCount(0)
+        self._clear_preview()
+        self._drop_session_plan()
 
         if not folder:
             self.set_status("Select a folder to see preview.")
@@ -874,84 +1552,222 @@ class MainWindow(QWidget):
 
         config = self.extract_config()
         recursive = self.chk_recursive.isChecked()
+        scan_filter = self.scan_filter()
         self.log.debug(f"[GUI] Updating preview | folder='{folder}' recursive={recursive}")
 
-
-        # Build multi-category plan
-        plan = build_multi_plan(
+        # Settings already previewed on an unchanged folder: show that result
+        self._pending_cache = None
+        scan_key = None
+        if PlanCache.cacheable(config, scan_filter):
+            scan_key = PlanCache.scan_key(folder, recursive, scan_filter=scan_filter)
+            version = self.plan_cache.version(scan_key)
+            cached = self.plan_cache.get(version, config) if version is not None else None
+            if cached is not None:
+                self.log.info(f"[GUI] Preview from cache | snapshot={version}")
+                self._apply_background_plan(*cached)
+                return
+
+        # Phase 1: scan and number the files; new names are rendered
+        # only for the rows on screen (see PreviewModel)
+        draft = draft_plan(
             folder=folder,
             config=config,
             recursive=recursive,
+            scan_filter=scan_filter,
         )
 
-        # If nothing to rename and no conflicts
-        if not plan.operations and not plan.conflicts:
-            self.set_status("No files found or no changes needed.")
-            self.btn_rename.setEnabled(False)
-            self.log.info("[GUI] Preview empty | no operations and no conflicts")
-            return
-
-        # Validate plan (filesystem conflicts)
-        ok, errors = validate_plan(plan)
+        if not len(draft):
+            plan = finish_plan(draft)
 
-        # Populate preview table
-        for row_index, op in enumerate(plan.operations):
-            self.table_preview.insertRow(row_index)
-            # Checkbox item
-            check_item = QTableWidgetItem()
-            check_item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
-            check_item.setCheckState(Qt.CheckState.Checked)
-            check_item.setData(Qt.ItemDataRole.UserRole, None)
-
-            item_cat = NaturalSortItem(op.category)
-            item_orig = NaturalSortItem(op.old_path.name)
-            item_new = NaturalSortItem(op.new_path.name)
-            item_conflict = NaturalSortItem("")
-
-            # Detect internal conflicts
-            internal_conflict = any(
-                f"'{op.new_path.name}'" in msg for msg in plan.conflicts
-            )
-
-            # Detect external conflicts
-            external_conflict = any(
-                op.new_path.as_posix() in msg for msg in errors
-            )
+            # If nothing to rename and no conflicts
+            if not plan.conflicts:
+                self.set_status("No files found or no changes needed.")
+                self.btn_rename.setEnabled(False)
+                self.log.info("[GUI] Preview empty | no operations and no conflicts")
+                return
 
-            if internal_conflict or external_conflict:
-                item_conflict.setText("Yes")
-                item_conflict.setForeground(Qt.GlobalColor.red)
-
-                # Highlight entire row
-                for col_item in (item_cat, item_orig, item_new, item_conflict):
-                    col_item.setBackground(Qt.GlobalColor.yellow)
-
-            self.table_preview.setItem(row_index, 0, check_item)
-            self.table_preview.setItem(row_index, 1, item_cat)
-            self.table_preview.setItem(row_index, 2, item_orig)
-            self.table_preview.setItem(row_index, 3, item_new)
-            self.table_preview.setItem(row_index, 4, item_conflict)
-            self.log.debug(
-                f"[GUI] Row added | row={row_index}old='{op.old_path.name}' new='{op.new_path.name}' "
-                f"category='{op.category}' conflict={internal_conflict or external_conflict}"
-            )
+            # Validate plan (filesystem conflicts)
+            ok, errors = validate_plan(plan)
+            self._show_plan(plan, ok, errors)
+            return
 
+        self._show_rows(draft)
+        self.btn_rename.setEnabled(False)
+        self.set_status(f"Preview: {len(draft)} file(s) — checking for conflicts…", timeout_ms=0)
+        self.log.info(f"[GUI] Draft preview shown | rows={len(draft)}")
+
+        # Phase 2: remaining names, collisions and existing targets in the
+        # background; _on_background_plan_ready enables Rename
+        if scan_key is not None:
+            self._pending_cache = (scan_key, config, draft)
+        self._start_preview_worker(folder, config, recursive, draft)
+
+    def _start_preview_worker(self, folder, config, recursive, draft=None):
+        self._preview_worker = PreviewWorker(
+            self._preview_generation, folder, config, recursive, self,
+            scan_filter=self.scan_filter(), draft=draft,
+        )
+        self._preview_worker.plan_ready.connect(self._on_background_plan_ready)
+        self._preview_worker.finished.connect(self._preview_worker.deleteLater)
+        self._preview_worker.start()
+
+    def _clear_preview(self):
+        self.preview_model.set_source(None)
+        self.current_plan = None
+        self.preview_index = None
+        self._visible_rows = None
+        self.selection.reset(0)
+        self._last_check_row = None
+        self._update_selection_ui()
 
+    # -------------------------
+    # Preview table rows
+    # -------------------------
+    def _show_rows(self, rows, conflict_flags=None):
+        """
+        Put a draft or plan on screen. Files unchecked in the rows shown
+        before stay unchecked; everything else starts checked.
+        """
+        previous = self.preview_model.source
+        selection = SelectionModel(len(rows))
+        if previous is not None and not self.selection.all_selected:
+            index_of = {rows.old_path(i): i for i in range(len(rows))}
+            for i in self.selection.indices(selected=False):
+                j = index_of.get(previous.old_path(i))
+                if j is not None:
+                    selection.set(j, False)
+        self.selection = selection
+        self._visible_rows = None
+        self.preview_model.set_source(rows, conflict_flags)
+        self._update_selection_ui()
+
+    def _show_plan(self, plan, ok, errors, conflict_flags=None, preview_index=None):
+        """Show a finished plan (flags and index are computed here unless given)."""
+        if conflict_flags is None:
+            conflict_flags = _conflict_flags(plan, errors)
+        self._show_rows(_PlanRows(plan), conflict_flags)
+        self._finish_preview(plan, ok, errors, conflict_flags, preview_index)
+
+    def _finish_preview(self, plan, ok, errors, conflict_flags, preview_index=None):
         # Update status + rename button
         if not ok:
             self.set_status(f"Conflict: {errors[0]}")
             self.log.error(f"[GUI] Preview conflict | first_error='{errors[0]}'")
             self.btn_rename.setEnabled(False)
         else:
-            self.set_status(f"Preview ready: {len(plan.operations)} file(s) across enabled categories.")
+            avoided = plan.skipped_counts.get("renumber_avoided", 0)
+            kept = f" {avoided} rename(s) avoided by keeping existing numbers." if avoided else ""
+            self.set_status(f"Preview ready: {len(plan.operations)} file(s) across enabled categories.{kept}")
             self.log.info(f"[GUI] Preview ready | operations={len(plan.operations)} conflicts={len(plan.conflicts)}")
             self.btn_rename.setEnabled(True)
 
         # Store plan for rename button
         self.current_plan = plan
+
+        self.preview_index = preview_index or _preview_index(plan, conflict_flags)
         self.apply_preview_filters()
 
+    # -------------------------
+    # Warm start from the last session
+    # -------------------------
+    def restore_last_session(self):
+        """
+        Show the cached preview from the last session immediately (marked
+        stale), then rebuild the plan in the background and swap it in;
+        checked state carries over by path.
+        """
+        if self.txt_folder.text().strip():
+            return
+
+        session = load_session()
+        if session is None:
+            return
+
+        self.log.info(f"[GUI] Restoring last session | folder={session.folder}")
+
+        # Restore settings without triggering a preview per widget
+        try:
+            self.apply_config(session.config)
+        except ValueError as e:
+            self.log.error(f"[GUI] Ignoring saved settings: {e}")
+        self.txt_folder.blockSignals(True)
+        self.chk_recursive.blockSignals(True)
+        self.txt_folder.setText(session.folder)
+        self.chk_recursive.setChecked(session.recursive)
+        self.txt_folder.blockSignals(False)
+        self.chk_recursive.blockSignals(False)
+        self.current_folder = session.folder
+
+        self._preview_generation += 1
+        self._pending_cache = None
+        if session.plan is not None and len(session.plan.operations):
+            self._show_plan(session.plan, True, [])
+            self._session_plan = session.plan
+            self.lbl_stale.setVisible(True)
+            self.btn_rename.setEnabled(False)
+            self.set_status("Cached preview — checking folder for changes…", timeout_ms=0)
+
+        self._start_preview_worker(session.folder, self.extract_config(), session.recursive)
 
+    def _on_background_plan_ready(self, generation, plan, ok, errors, conflict_flags, preview_index):
+        self._preview_worker = None
+        if generation != self._preview_generation:
+            self.log.debug("[GUI] Dropping superseded background preview")
+            return
+
+        if self._pending_cache is not None:
+            scan_key, config, draft = self._pending_cache
+            self._pending_cache = None
+            version = self.plan_cache.record(scan_key, draft)
+            if version is not None:
+                self.plan_cache.put(version, config, (plan, ok, errors, conflict_flags, preview_index))
+
+        self._apply_background_plan(plan, ok, errors, conflict_flags, preview_index)
+
+    def _apply_background_plan(self, plan, ok, errors, conflict_flags, preview_index):
+        self.lbl_stale.setVisible(False)
+        cached = self._session_plan
+
+        if not plan.operations:
+            self._clear_preview()
+            self._drop_session_plan()
+            self.set_status(f"Conflict: {errors[0]}" if errors else "No files found or no changes needed.")
+            self.btn_rename.setEnabled(False)
+            return
+
+        # A warm start still showing the session's plan: patch it row by row
+        if cached is self.current_plan is not None and self._reconcile_plan(cached, plan, errors, conflict_flags):
+            self._finish_preview(plan, ok, errors, self.preview_model.conflict_flags, preview_index)
+        else:
+            # Replaces the draft (or cached) rows; checked state carries over by path
+            self._show_plan(plan, ok, errors, conflict_flags, preview_index)
+        self._drop_session_plan()
+
+    def _drop_session_plan(self):
+        # Nothing shows the session's plan any more: unmap its snapshot so
+        # the next save_session can replace the file
+        if self._session_plan is not None:
+            close_plan(self._session_plan)
+            self._session_plan = None
+
+    def _reconcile_plan(self, cached, plan, errors, conflict_flags):
+        """
+        Patch the cached preview in place when the fresh plan has the same
+        files in the same order; False when rows were added, removed or
+        moved and the preview must be rebuilt.
+        """
+        diff = diff_plans(cached, plan)
+        if diff.removed or diff.added or any(i != j for i, j in enumerate(diff.index_of.values())):
+            self.log.info(
+                f"[GUI] Cached preview rebuilt | removed={len(diff.removed)} added={len(diff.added)}"
+            )
+            return False
+
+        if conflict_flags is None:
+            conflict_flags = _conflict_flags(plan, errors)
+        self.preview_model.patch_source(_PlanRows(plan), conflict_flags)
+        self.log.info(f"[GUI] Cached preview reconciled | changed={len(diff.changed)}")
+        return True
 
     # -------------------------
     # Execute rename (multi-category + undo support)
@@ -963,14 +1779,12 @@ class MainWindow(QWidget):
             self.set_status("No folder selected.")
             return
 
-        # Collect checked files
+        # Collect checked files straight from the selection bitset
         selected_files = []
-        for row in range(self.table_preview.rowCount()):
-            item = self.table_preview.item(row, 0)
-            if item and item.checkState() == Qt.CheckState.Checked:
-                orig_name = self.table_preview.item(row, 2).text()
-                selected_files.append(orig_name)
-        self.log.debug(f"[GUI] Selected files for rename: {selected_files}")
+        if self.current_plan is not None:
+            operations = self.current_plan.operations
+            selected_files = [operations[i].old_path.name for i in self.selection.indices()]
+        self.log.debug(f"[GUI] Selected files for rename: {len(selected_files)}")
 
 
         if not selected_files:
@@ -983,7 +1797,8 @@ class MainWindow(QWidget):
             folder=folder,
             config=self.extract_config(),
             recursive=self.chk_recursive.isChecked(),
-            selected_files=selected_files
+            selected_files=selected_files,
+            scan_filter=self.scan_filter(),
         )
 
         # Validate before executing
@@ -1001,28 +1816,119 @@ class MainWindow(QWidget):
             self.log.info("[GUI] Rename cancelled by user")
             return
 
-        # Execute
-        renamed_count, failures = execute_plan(plan)
-        self.log.info(f"[GUI] Rename result | renamed={renamed_count} failures={len(failures)}")
+        # Export mode: leave originals alone, materialize into another folder
+        if self.cmb_output_mode.currentData() == "export":
+            target = QFileDialog.getExistingDirectory(self, "Export renamed copies to")
+            if not target:
+                self.set_status("Export canceled.")
+                return
+            self._start_rename_worker("export", plan, target=target)
+            return
 
-        if failures:
-            self.set_status(f"Renamed {renamed_count} file(s), {len(failures)} failure(s).")
-            self.btn_undo.setEnabled(False)
+        # Execute in the background; results arrive in _on_rename_done
+        self._start_rename_worker("execute", plan)
+
+    # -------------------------
+    # Background rename / undo
+    # -------------------------
+    def _start_rename_worker(self, kind, plan=None, target=None, level=0):
+        total = len(plan.operations) if plan is not None else 0
+        self.progress_rename.setRange(0, total)
+        self.progress_rename.setValue(0)
+        self.progress_rename.setFormat("%v / %m")
+        self.progress_rename.setVisible(True)
+        self.btn_cancel_rename.setEnabled(True)
+        self.btn_cancel_rename.setVisible(True)
+        self.btn_rename.setEnabled(False)
+        self.btn_undo.setEnabled(False)
+        self.btn_undo_to.setEnabled(False)
+        self.btn_browse.setEnabled(False)
+        self.cmb_output_mode.setEnabled(False)
+
+        worker = RenameWorker(kind, plan, self, target=target, source_root=self.current_folder or None, level=level)
+        worker.progress.connect(self._on_rename_progress)
+        worker.rename_done.connect(self._on_rename_done)
+        worker.finished.connect(worker.deleteLater)
+        self._rename_worker = worker
+        self.log.info(f"[GUI] {kind.capitalize()} started | operations={total}")
+        worker.start()
+
+    def on_cancel_rename_clicked(self):
+        if self._rename_worker is not None:
+            self.log.info("[GUI] Cancel requested")
+            self._rename_worker.cancel()
+            self.btn_cancel_rename.setEnabled(False)
+            self.set_status("Cancelling…", timeout_ms=0)
+
+    def _on_rename_progress(self, progress):
+        if self.progress_rename.maximum() != progress.total:
+            self.progress_rename.setRange(0, progress.total)
+        self.progress_rename.setValue(progress.done + progress.failures)
+        if progress.finished:
+            return
+        eta = progress.eta
+        eta_text = f" | ETA {eta:.0f} s" if eta is not None else ""
+        kind = self._rename_worker.kind if self._rename_worker else "execute"
+        verb = {"execute": "Renaming", "export": "Exporting", "undo": "Restoring", "undo_to": "Restoring"}[kind]
+        self.set_status(
+            f"{verb} {progress.done}/{progress.total} | {progress.rate:.0f} files/s{eta_text}",
+            timeout_ms=0,
+        )
+
+    def _on_rename_done(self, kind, count, failures, cancelled):
+        target = self._rename_worker.target if self._rename_worker else None
+        self._rename_worker = None
+        self.progress_rename.setVisible(False)
+        self.btn_cancel_rename.setVisible(False)
+        self.btn_browse.setEnabled(True)
+        self.cmb_output_mode.setEnabled(True)
+        self.log.info(
+            f"[GUI] {kind.capitalize()} result | count={count} failures={len(failures)} cancelled={cancelled}"
+        )
+
+        if failures and not count and kind in ("execute", "export"):
+            # Nothing was done: usually the folder was locked by another run
+            self.set_status(f"{'Rename' if kind == 'execute' else 'Export'} failed: {failures[0]}")
+        elif kind == "export":
+            if failures:
+                self.set_status(f"Exported {count} file(s), {len(failures)} failure(s).")
+            elif cancelled:
+                self.set_status(f"Export cancelled after {count} file(s).")
+            else:
+                self.set_status(f"Exported {count} renamed copies to {target}.")
+        elif kind == "execute":
+            if failures:
+                self.set_status(f"Renamed {count} file(s), {len(failures)} failure(s).")
+            elif cancelled:
+                self.set_status(f"Rename cancelled after {count} file(s); undo restores them.")
+            else:
+                self.set_status(f"Renamed {count} file(s) successfully.")
         else:
-            self.set_status(f"Renamed {renamed_count} file(s) successfully.")
-            self.btn_undo.setEnabled(True)
+            if failures:
+                self.set_status(f"Undo failed: {failures[0]}")
+                self.log.info("[GUI] Undo requested but no undo available")
+            elif cancelled:
+                self.set_status(f"Undo cancelled after {count} file(s); undo again to restore the rest.")
+            else:
+                self.set_status(f"Undo successful: {count} file(s) restored.")
 
-        self.update_preview()
+        # Refresh preview so GUI reflects the new filenames
+        if count or not failures:
+            self.update_preview()
+        else:
+            # Nothing changed on disk (e.g. the folder was locked): keep the preview and its message
+            self.btn_rename.setEnabled(self.current_plan is not None)
+
+        # Re-enable or disable undo button based on remaining stack
+        from engine import _undo_stack
+        self.btn_undo.setEnabled(len(_undo_stack) > 0)
+        self.btn_undo_to.setEnabled(len(_undo_stack) > 1)
 
     
     # HELPER METHOD: Show rename summary dialogue
     def show_rename_summary(self, plan):
-        total_rows = self.table_preview.rowCount()
-
-        selected_files = sum(
-            1 for r in range(total_rows)
-            if self.table_preview.item(r, 0).checkState() == Qt.CheckState.Checked
-        )
+        total_rows = len(self.selection)
+        selected_files = self.selection.count
 
         planned_ops = len(plan.operations)
 
@@ -1047,22 +1953,32 @@ class MainWindow(QWidget):
     # Undo last rename
     # -------------------------
     def on_undo_clicked(self):
-        count, errors = undo_last_rename()
-        self.log.info(f"[GUI] Undo result | restored={count} errors={errors}")
-
-        # Update status message
-        if errors:
-            self.set_status(f"Undo failed: {errors[0]}")
-            self.log.info("[GUI] Undo requested but no undo available")
-        else:
-            self.set_status(f"Undo successful: {count} file(s) restored.")
-
-        # Refresh preview so GUI reflects the new filenames
-        self.update_preview()
+        from engine import _undo_stack
+        if not _undo_stack:
+            self.set_status("Undo failed: No undo available.")
+            return
+        self._start_rename_worker("undo", _undo_stack[-1])
 
-        # Re-enable or disable undo button based on remaining stack
+    def _populate_undo_menu(self):
         from engine import _undo_stack
-        self.btn_undo.setEnabled(len(_undo_stack) > 0)
+        menu = self.btn_undo_to.menu()
+        menu.clear()
+        depth = len(_undo_stack)
+        # Level 0 restores everything; the last level is plain "Undo Last Rename"
+        for level in range(depth - 2, -1, -1):
+            undone = depth - level
+            files = sum(len(plan.operations) for plan in _undo_stack[level:])
+            label = "all" if level == 0 else "the last"
+            action = menu.addAction(f"Undo {label} {undone} renames ({files} file renames)")
+            action.triggered.connect(lambda _=False, lv=level: self.on_undo_to_clicked(lv))
+
+    def on_undo_to_clicked(self, level):
+        from engine import _undo_stack
+        if level >= len(_undo_stack):
+            self.set_status("Undo failed: No undo available.")
+            return
+        self.log.info(f"[GUI] Undo to level {level} | levels={len(_undo_stack) - level}")
+        self._start_rename_worker("undo_to", level=level)
 
 
     # -------------------------
@@ -1104,39 +2020,88 @@ class MainWindow(QWidget):
     def closeEvent(self, event):
         self.log.debug("[GUI] Saving settings and closing window")
 
+        # Stop a running rename/undo at the next consistent point
+        if self._rename_worker is not None:
+            self._rename_worker.cancel()
+            self._rename_worker.wait()
+
         # Save window geometry
         self.settings.setValue("window_geometry", self.saveGeometry())
 
         # Save splitter sizes
         self.settings.setValue("splitter_sizes", self.splitter.sizes())
 
+        # Save folder, settings and plan snapshot for the next warm start
+        if self.current_folder:
+            save_session(
+                self.current_folder,
+                self.chk_recursive.isChecked(),
+                self.extract_config().to_dict(),
+                self.current_plan,
+            )
+
         super().closeEvent(event)
 
 
     # --------------------------------
     # Master checkbox helper functions
     # --------------------------------
-    def on_row_checkbox_changed(self, item):
-        self.log.debug(f"[GUI] Row checkbox changed | row={item.row()} state={item.checkState()}")
+    def on_row_check_toggled(self, row, checked):
+        """
+        A row checkbox was clicked (see PreviewModel.setData). With Shift
+        held, every visible row between the previous click and this one
+        takes the same state.
+        """
+        model = self.preview_model
+        index = model.source_index(row)
+        anchor = self._last_check_row
+        shift = QApplication.keyboardModifiers() & Qt.KeyboardModifier.ShiftModifier
+
+        if shift and anchor is not None and anchor != row:
+            lo, hi = sorted((anchor, row))
+            if model.is_identity:
+                # Rows are plan indices: one bulk range update
+                self.selection.set_range(lo, hi + 1, checked)
+            else:
+                self.selection.set_many((model.source_index(r) for r in range(lo, hi + 1)), checked)
+            self.log.debug(f"[GUI] Range {'checked' if checked else 'unchecked'} | rows={lo}..{hi}")
+        else:
+            self.selection.set(index, checked)
 
-        if item.column() != 0:
-            return
+        self._last_check_row = row
+        self._update_selection_ui()
 
-        total = self.table_preview.rowCount()
-        checked = sum(
-            1 for r in range(total)
-            if self.table_preview.item(r, 0).checkState() == Qt.CheckState.Checked
-        )
+    def set_all_selected(self, selected):
+        self.selection.set_all(selected)
+        self.log.debug(f"[GUI] Selection set for all rows | selected={selected}")
+        self._update_selection_ui()
 
-        # Update master checkbox state
-        if checked == total:
-            self.master_checked = True
-        else:
-            self.master_checked = False
+    def invert_selection(self):
+        self.selection.invert()
+        self.log.debug(f"[GUI] Selection inverted | selected={self.selection.count}")
+        self._update_selection_ui()
 
-        # Repaint header
+    def select_shown(self, selected, exclusive=False):
+        """
+        Apply a state to the rows the current filter shows. exclusive
+        first clears every row, so only the shown rows stay selected.
+        """
+        if self._visible_rows is None:
+            self.selection.set_all(selected)
+        else:
+            if exclusive:
+                self.selection.set_all(not selected)
+            self.selection.set_many(self._visible_rows, selected)
+        self._update_selection_ui()
+
+    def _update_selection_ui(self):
+        """Repaint checkboxes and the master checkbox; O(1) in the number of rows."""
+        total = len(self.selection)
+        self.master_checked = self.selection.all_selected
+        self.lbl_selection.setText(f"{self.selection.count:,} of {total:,} selected" if total else "")
+        self.table_preview.viewport().update()
         self.table_preview.horizontalHeader().viewport().update()
-    
+
     def paint_header_section(self, painter, rect, logicalIndex):
         """
         Draw the master checkbox in the header's first column.
@@ -1149,10 +2114,12 @@ class MainWindow(QWidget):
         opt.rect = rect.adjusted(6, 6, -6, -6)
         opt.state = QStyle.StateFlag.State_Enabled
 
-        if self.master_checked:
+        if self.selection.all_selected and len(self.selection):
             opt.state |= QStyle.StateFlag.State_On
-        else:
+        elif self.selection.none_selected:
             opt.state |= QStyle.StateFlag.State_Off
+        else:
+            opt.state |= QStyle.StateFlag.State_NoChange
 
         self.table_preview.style().drawControl(
             QStyle.ControlElement.CE_CheckBox, opt, painter
@@ -1164,41 +2131,11 @@ class MainWindow(QWidget):
         if index != 0:
             return
 
-        # Toggle master state
-        self.master_checked = not self.master_checked
+        # Partial or empty selection → select all; full selection → clear
+        self.set_all_selected(not self.selection.all_selected)
         self.log.debug(f"[GUI] Master checkbox toggled | new_state={self.master_checked}")
 
 
-        # Block itemChanged signals to prevent recursion
-        self.table_preview.blockSignals(True)
-
-        # Apply the new state to all row checkboxes
-        for row in range(self.table_preview.rowCount()):
-            item = self.table_preview.item(row, 0)
-            if item:
-                item.setCheckState(
-                    Qt.CheckState.Checked if self.master_checked else Qt.CheckState.Unchecked
-                )
-
-        # Re-enable signals
-        self.table_preview.blockSignals(False)
-
-        # Repaint header
-        self.table_preview.horizontalHeader().viewport().update()
-
-
-    def _sort_items_override(self, column, order):
-        self.log.debug(f"[GUI] Sort override | column={column} order={order}")
-        # Completely block sorting on column 0
-        if column == 0:
-            return
-
-        # Allow normal sorting for other columns
-        QTableWidget.sortItems(self.table_preview, column, order)
-
-
-
-
     # --------------------------------
     # TOAST non-modal messages helper
     # --------------------------------
@@ -1271,9 +2208,18 @@ class MainWindow(QWidget):
 # ------------------------------------
 if __name__ == "__main__":
     import sys
-    from PyQt6.QtWidgets import QApplication
 
     app = QApplication(sys.argv)
     window = MainWindow()
+
+    # Used by `python bench.py startup`: report time to first interactive
+    # window (first paint + one idle event-loop turn), then exit.
+    if "--startup-benchmark" in sys.argv:
+        def _report_startup():
+            elapsed_ms = (time.perf_counter() - _STARTUP_T0) * 1000
+            print(f"time_to_interactive_ms={elapsed_ms:.1f}", flush=True)
+            app.quit()
+        window.on_first_paint = _report_startup
+
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,301 @@
+"""
+Asyncio front end to the engine, for services that embed FreshNamer
+and must not block their event loop.
+
+    async with AsyncRenamer(workers=4, fs_calls=16) as renamer:
+        plan = await renamer.plan(folder, config, recursive=True)
+        async for op in renamer.operations(plan):
+            ...
+        ok, errors = await renamer.validate(plan)
+        run = renamer.execute(plan)
+        async for p in run:                # RenameProgress snapshots
+            ...
+        renamed, failures = await run
+
+Scans, stats, renames and lock files all run on the renamer's own
+bounded thread pool, and every filesystem call of every job passes one
+shared semaphore (fsbackend.ThrottledFileSystem), so a burst of
+requests cannot flood a network share. Long results reach the loop in
+chunks with a yield in between.
+
+Cancelling the task that awaits a call cancels the call. A plan stops
+at its next filesystem call; an execute or undo stops before its next
+rename and is waited for, so the undo stack matches the disk by the
+time CancelledError reaches the caller.
+
+Calls take the same folder locks as the CLI and the service (locks.py).
+Up to lock_wait seconds (None: no limit) are spent polling from the
+loop, without holding a worker.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Tuple
+
+import engine
+from config import RenameConfig
+from engine import (
+    PROGRESS_BATCH, PlanCache, RenameOperation, RenamePlan, RenameProgress,
+    build_multi_plan, execute_plan, plan_roots, undo_last_rename, undo_to, validate_plan,
+)
+from fsbackend import FileSystem, ThrottledFileSystem, get_filesystem
+from locks import POLL_INTERVAL, TreeLockedError, lock_trees
+from logger import setup_logger
+from scanner import ScanFilter
+
+log = setup_logger().getChild("aio")
+
+DEFAULT_WORKERS = 4
+DEFAULT_FS_CALLS = 16
+# Operations materialized between two yields to the loop (a few ms each)
+DEFAULT_CHUNK = 256
+# Executed plans kept for undo; a long-running host would otherwise keep them all
+UNDO_DEPTH = 16
+# Longest pause between two tries of a busy folder lock
+MAX_LOCK_POLL = 2.0
+
+_DONE = object()
+
+
+class _Aborted(BaseException):
+    # Not an Exception: placeholder providers catch those and carry on
+    pass
+
+
+class _AbortableFileSystem(ThrottledFileSystem):
+    """Throttled backend that fails every call once its plan is cancelled."""
+
+    def __init__(self, inner: FileSystem, slots: threading.Semaphore, abort: threading.Event):
+        super().__init__(inner, slots)
+        self.abort = abort
+
+    def _enter(self, op: str) -> None:
+        if self.abort.is_set():
+            raise _Aborted(op)
+        super()._enter(op)
+
+
+# ---------------------------------------------------------
+# Renamer
+# ---------------------------------------------------------
+class AsyncRenamer:
+    """
+    Async counterparts of build_multi_plan, validate_plan, execute_plan
+    and the undo calls. workers bounds the thread pool, fs_calls the
+    filesystem calls in flight across all of them. Plans go through one
+    PlanCache kept for the renamer's lifetime.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        fs_calls: int = DEFAULT_FS_CALLS,
+        fs: FileSystem | None = None,
+        cache: PlanCache | None = None,
+        lock_wait: float | None = 0.0,
+    ):
+        self.fs = fs
+        self.cache = cache if cache is not None else PlanCache()
+        self.lock_wait = lock_wait
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="freshnamer-aio")
+        self._slots = threading.BoundedSemaphore(max(1, fs_calls))
+
+    async def __aenter__(self) -> "AsyncRenamer":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Wait for work already started, then stop the pool."""
+        await asyncio.get_running_loop().run_in_executor(None, self._pool.shutdown)
+
+    def _filesystem(self, abort: threading.Event | None = None) -> FileSystem:
+        inner = self.fs if self.fs is not None else get_filesystem()
+        if abort is not None:
+            return _AbortableFileSystem(inner, self._slots, abort)
+        return ThrottledFileSystem(inner, self._slots)
+
+    async def _call(self, fn: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    @asynccontextmanager
+    async def _locked(self, roots: Iterable[str | Path], exclusive: bool, purpose: str):
+        loop = asyncio.get_running_loop()
+        deadline = None if self.lock_wait is None else loop.time() + self.lock_wait
+        pause = POLL_INTERVAL
+        while True:
+            stack = ExitStack()
+            taking = loop.run_in_executor(
+                self._pool, stack.enter_context, lock_trees(roots, exclusive, purpose, 0.0)
+            )
+            try:
+                await asyncio.shield(taking)
+                break
+            except asyncio.CancelledError:
+                # The locks may still be granted: drop them when they are
+                taking.add_done_callback(lambda _: stack.close())
+                raise
+            except TreeLockedError:
+                if deadline is not None and loop.time() >= deadline:
+                    raise
+            if deadline is not None:
+                pause = min(pause, max(0.0, deadline - loop.time()))
+            await asyncio.sleep(pause)
+            pause = min(pause * 2, MAX_LOCK_POLL)
+        try:
+            yield
+        finally:
+            stack.close()
+
+    # -----------------------------------------------------
+    # Planning
+    # -----------------------------------------------------
+    async def plan(
+        self,
+        folder: str,
+        config: RenameConfig | Dict,
+        recursive: bool = False,
+        selected_files: List[str] | None = None,
+        name_policy: str | None = None,
+        scan_filter: ScanFilter | None = None,
+    ) -> RenamePlan:
+        """
+        build_multi_plan off the loop. The plan may come from the cache
+        and be shared: treat it as read-only.
+        """
+        config = RenameConfig.coerce(config)
+        abort = threading.Event()
+        async with self._locked([folder], False, "freshnamer async plan"):
+            try:
+                return await self._call(
+                    build_multi_plan, folder, config, recursive, selected_files,
+                    self._filesystem(abort), name_policy, scan_filter, self.cache,
+                )
+            except asyncio.CancelledError:
+                abort.set()
+                log.info(f"[AIO] Plan cancelled | folder={folder}")
+                raise
+
+    async def operations(self, plan: RenamePlan, chunk: int = DEFAULT_CHUNK) -> AsyncIterator[RenameOperation]:
+        """The plan's operations, materialized `chunk` at a time with a yield to the loop in between."""
+        ops = plan.operations
+        chunk = max(1, chunk)
+        for start in range(0, len(ops), chunk):
+            # Indexed one by one: slicing CompactOperations copies its name table
+            for i in range(start, min(start + chunk, len(ops))):
+                yield ops[i]
+            await asyncio.sleep(0)
+
+    async def validate(self, plan: RenamePlan, workers: int = DEFAULT_WORKERS) -> Tuple[bool, List[str]]:
+        roots = await self._call(plan_roots, [plan])
+        async with self._locked(roots, False, "freshnamer async validate"):
+            return await self._call(validate_plan, plan, self._filesystem(), workers)
+
+    # -----------------------------------------------------
+    # Renaming
+    # -----------------------------------------------------
+    def execute(self, plan: RenamePlan, workers: int = 4, verify: bool = False,
+                batch: int = PROGRESS_BATCH) -> "RenameRun":
+        """Start execute_plan (see RenameRun). Must be called from the loop."""
+        def work(fs, progress, cancel):
+            return execute_plan(plan, fs, progress, cancel, batch, workers, verify)
+
+        return RenameRun(self, lambda: plan_roots([plan]), work, "freshnamer async execute")
+
+    def undo(self, to: int | None = None, workers: int = 4, verify: bool = False,
+             batch: int = PROGRESS_BATCH) -> "RenameRun":
+        """Start undo_last_rename, or undo_to(to) when a level is given."""
+        def roots():
+            return plan_roots(engine._undo_stack[to:] if to is not None else engine._undo_stack[-1:])
+
+        def work(fs, progress, cancel):
+            if to is not None:
+                return undo_to(to, fs, progress, cancel, batch, workers, verify)
+            return undo_last_rename(fs, progress, cancel, batch, workers, verify)
+
+        return RenameRun(self, roots, work, "freshnamer async undo")
+
+
+# ---------------------------------------------------------
+# Running execute / undo
+# ---------------------------------------------------------
+class RenameRun:
+    """
+    An execute or undo started by AsyncRenamer, running as its own task.
+    Await it for (count, failures); iterate it for RenameProgress
+    snapshots until it ends. cancel(), or cancelling a task awaiting it,
+    stops it before the next rename.
+    """
+
+    def __init__(self, renamer: AsyncRenamer, roots: Callable[[], List[Path]], work: Callable, purpose: str):
+        self._renamer = renamer
+        self._loop = asyncio.get_running_loop()
+        self._cancel = threading.Event()
+        self._updates: asyncio.Queue = asyncio.Queue()
+        self._task = self._loop.create_task(self._run(roots, work, purpose))
+        self._task.add_done_callback(lambda _: self._updates.put_nowait(_DONE))
+
+    def _progress(self, p: RenameProgress) -> None:
+        # Called on a worker thread
+        self._loop.call_soon_threadsafe(self._updates.put_nowait, p)
+
+    async def _run(self, roots: Callable[[], List[Path]], work: Callable, purpose: str) -> Tuple[int, List[str]]:
+        renamer = self._renamer
+        locked = await renamer._call(roots)
+        while True:
+            async with renamer._locked(locked, True, purpose):
+                # The undo stack may have changed while we waited for the lock
+                current = await renamer._call(roots)
+                if set(current) <= set(locked):
+                    return await self._work(work, purpose)
+            log.info(f"[AIO] Folders to lock changed while waiting; locking again | {purpose}")
+            locked = current
+
+    async def _work(self, work: Callable, purpose: str) -> Tuple[int, List[str]]:
+        renamer = self._renamer
+        running = self._loop.run_in_executor(
+            renamer._pool, work, renamer._filesystem(), self._progress, self._cancel
+        )
+        cancelled = False
+        while True:
+            try:
+                result = await asyncio.shield(running)
+                break
+            except asyncio.CancelledError:
+                # Let it stop between two renames, so the undo stack matches the disk
+                if not cancelled:
+                    log.info(f"[AIO] Cancelling | {purpose}")
+                self._cancel.set()
+                cancelled = True
+        del engine._undo_stack[:-UNDO_DEPTH]
+        if cancelled:
+            raise asyncio.CancelledError()
+        return result
+
+    def __await__(self):
+        return self._task.__await__()
+
+    def __aiter__(self) -> AsyncIterator[RenameProgress]:
+        return self._follow()
+
+    async def _follow(self) -> AsyncIterator[RenameProgress]:
+        while True:
+            update = await self._updates.get()
+            if update is _DONE:
+                # Leave it for any other reader
+                self._updates.put_nowait(_DONE)
+                return
+            yield update
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+    def done(self) -> bool:
+        return self._task.done()
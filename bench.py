@@ -0,0 +1,284 @@
+"""
+Micro-benchmarks for the rename engine.
+
+    python bench.py latency [--files 2000] [--latency 0.002] [--workers 1 4 16]
+    python bench.py startup [--runs 5] [--offscreen]
+    python bench.py memory [--ops 100000] [--dirs 200]
+    python bench.py order [--files 1000000] [--dirs 1000]
+    python bench.py move --src /mnt/ssd/tmp --dst /mnt/archive/tmp [--files 64] [--size-mb 16] [--workers 1 4 8] [--verify]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+
+from logger import setup_logger
+
+
+def _quiet():
+    # Per-file debug logging dominates timings; keep only errors.
+    # Import the engine first: setup_logger() resets the level on each call.
+    import engine  # noqa: F401
+    import crossmove  # noqa: F401
+    import metadata  # noqa: F401
+    setup_logger().setLevel(logging.ERROR)
+
+
+def _timed(label: str, fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - t0
+    print(f"  {label:<32} {elapsed * 1000:10.1f} ms")
+    return result, elapsed
+
+
+def _image_config() -> dict:
+    return {
+        "image": {"enabled": True, "mode": "normal", "prefix": "img_", "suffix": "",
+                  "padding": 6, "start": 1, "advanced": ""},
+    }
+
+
+# ---------------------------------------------------------
+# High-latency storage
+# ---------------------------------------------------------
+def bench_latency(args) -> None:
+    from engine import build_multi_plan, validate_plan, execute_plan
+    from fsbackend import MemoryFileSystem, LatencyFileSystem
+
+    root = Path("/bench")
+    per_dir = 100
+    mem = MemoryFileSystem(
+        root / f"d{i // per_dir:04d}" / f"IMG_{i:06d}.jpg" for i in range(args.files)
+    )
+    fs = LatencyFileSystem(mem, latency=args.latency)
+
+    print(f"latency: files={args.files} per-call={args.latency * 1000:.1f} ms")
+    plan, _ = _timed("scan + plan", build_multi_plan, str(root), _image_config(), True, fs=fs)
+
+    for workers in args.workers:
+        _timed(f"validate (workers={workers})", validate_plan, plan, fs=fs, workers=workers)
+
+    (renamed, _), elapsed = _timed("execute", execute_plan, plan, fs=fs)
+    print(f"  {'renames/s':<32} {renamed / elapsed:10.0f}")
+    print(f"  calls: {fs.calls}")
+
+
+# ---------------------------------------------------------
+# GUI cold start
+# ---------------------------------------------------------
+def bench_startup(args) -> None:
+    """
+    Launch GUI.py --startup-benchmark repeatedly. Reports the in-process
+    time to first interactive window and the full process wall time
+    (interpreter start to exit).
+    """
+    gui = Path(__file__).with_name("GUI.py")
+    env = dict(os.environ)
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    tti, wall = [], []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, str(gui), "--startup-benchmark"],
+            capture_output=True, text=True, env=env, timeout=60,
+        )
+        wall.append((time.perf_counter() - t0) * 1000)
+        for line in proc.stdout.splitlines():
+            if line.startswith("time_to_interactive_ms="):
+                tti.append(float(line.split("=", 1)[1]))
+        if proc.returncode != 0:
+            print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "GUI failed", file=sys.stderr)
+            return
+
+    print(f"startup: runs={args.runs}")
+    print(f"  {'time to interactive (median)':<32} {statistics.median(tti):10.1f} ms")
+    print(f"  {'time to interactive (min)':<32} {min(tti):10.1f} ms")
+    print(f"  {'process wall time (median)':<32} {statistics.median(wall):10.1f} ms")
+
+
+# ---------------------------------------------------------
+# Plan memory per operation
+# ---------------------------------------------------------
+@dataclass
+class _DictOperation:
+    # RenameOperation as it was before __slots__ (one __dict__ per op)
+    old_path: Path
+    new_path: Path
+    category: str
+
+
+def _measured(label: str, build, count: int):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"  {label:<32} {used / count:10.1f} B/op")
+    return result
+
+
+def bench_memory(args) -> None:
+    from engine import RenameOperation, CompactOperations
+
+    root = Path("/bench")
+    categories = ("image", "video", "audio", "document")
+
+    def paths():
+        for i in range(args.ops):
+            folder = root / f"d{i % args.dirs:04d}"
+            yield folder / f"IMG_{i:08d}.jpg", folder / f"img_{i:08d}.jpg", categories[i % 4]
+
+    print(f"memory: ops={args.ops} dirs={args.dirs}")
+    _measured("list[dataclass] (no slots)", lambda: [_DictOperation(*t) for t in paths()], args.ops)
+    _measured("list[RenameOperation] (slots)", lambda: [RenameOperation(*t) for t in paths()], args.ops)
+
+    def compact():
+        ops = CompactOperations()
+        for old, new, category in paths():
+            ops.add(old, new, category)
+        return ops
+
+    ops = _measured("CompactOperations", compact, args.ops)
+    print(f"  {'CompactOperations.nbytes()':<32} {ops.nbytes() / args.ops:10.1f} B/op")
+
+
+# ---------------------------------------------------------
+# Numbering order
+# ---------------------------------------------------------
+def bench_order(args) -> None:
+    """
+    Plan an in-memory tree numbered by name, by mtime and by capture date,
+    the last with a cold and then a warm capture cache (in a scratch
+    cache directory). The files have no EXIF block, so the cold run
+    measures one failed open per file plus the cache write.
+    """
+    from engine import build_multi_plan
+    from fsbackend import MemoryFileSystem
+
+    os.environ["FRESHNAMER_CACHE_DIR"] = tempfile.mkdtemp(prefix="fn-order-cache-")
+    import metadata
+    metadata.MAX_CACHE_ENTRIES = max(metadata.MAX_CACHE_ENTRIES, args.files)
+
+    root = Path("/bench")
+    fs = MemoryFileSystem()
+    for i in range(args.files):
+        fs.add_file(root / f"d{i % args.dirs:04d}" / f"IMG_{i:07d}.jpg", 1024, 1.6e9 + (i * 7919) % args.files)
+
+    print(f"order: files={args.files} dirs={args.dirs}")
+    try:
+        for label, order in (("name", "name"), ("mtime", "mtime"),
+                             ("captured (cold cache)", "captured"), ("captured (warm cache)", "captured")):
+            config = _image_config()
+            config["image"]["order"] = order
+            _timed(f"plan by {label}", build_multi_plan, str(root), config, True, fs=fs)
+        cache = metadata.get_capture_cache()
+        print(f"  {'capture cache':<32} {cache.path.stat().st_size / args.files:10.1f} B/file")
+    finally:
+        shutil.rmtree(os.environ["FRESHNAMER_CACHE_DIR"], ignore_errors=True)
+
+
+# ---------------------------------------------------------
+# Cross-device move throughput
+# ---------------------------------------------------------
+def bench_move(args) -> None:
+    """
+    Move a generated file set between two folders (ideally on different
+    devices) and back for each worker count, reporting MB/s. The journal
+    goes to a scratch state directory.
+    """
+    from engine import RenameOperation, RenamePlan, execute_plan
+
+    src_root = Path(tempfile.mkdtemp(prefix="fn-move-src-", dir=args.src))
+    dst_root = Path(tempfile.mkdtemp(prefix="fn-move-dst-", dir=args.dst))
+    os.environ["FRESHNAMER_STATE_DIR"] = tempfile.mkdtemp(prefix="fn-move-state-")
+    size = int(args.size_mb * 1024 * 1024)
+    block = os.urandom(min(size, 1024 * 1024))
+    try:
+        for i in range(args.files):
+            with open(src_root / f"f{i:05d}.bin", "wb") as fh:
+                for offset in range(0, size, len(block)):
+                    fh.write(block[:size - offset])
+
+        cross = os.stat(src_root).st_dev != os.stat(dst_root).st_dev
+        total_mb = args.files * size / (1024 * 1024)
+        print(f"move: files={args.files} size={args.size_mb} MB total={total_mb:.0f} MB "
+              f"cross-device={cross} verify={args.verify}")
+        if not cross:
+            print("  (same device: measures rename(), not the copy pipeline)")
+
+        here, there = src_root, dst_root
+        for workers in args.workers:
+            plan = RenamePlan([
+                RenameOperation(here / f"f{i:05d}.bin", there / f"f{i:05d}.bin", "bench")
+                for i in range(args.files)
+            ], [], [])
+            (moved, failures), elapsed = _timed(
+                f"move (workers={workers})", execute_plan, plan,
+                workers=workers, verify=args.verify,
+            )
+            if failures:
+                print(f"  failures: {failures[:3]}", file=sys.stderr)
+                return
+            print(f"  {'throughput':<32} {total_mb / elapsed:10.1f} MB/s")
+            here, there = there, here
+    finally:
+        shutil.rmtree(src_root, ignore_errors=True)
+        shutil.rmtree(dst_root, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FreshNamer benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("latency", help="Scan/validate/execute against injected storage latency")
+    p.add_argument("--files", type=int, default=2000)
+    p.add_argument("--latency", type=float, default=0.002, help="Seconds per filesystem call")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    p.set_defaults(func=bench_latency)
+
+    p = sub.add_parser("startup", help="GUI time-to-interactive")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--offscreen", action="store_true", help="Use Qt's offscreen platform (CI)")
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser("memory", help="Bytes per operation for plan storage layouts")
+    p.add_argument("--ops", type=int, default=100_000)
+    p.add_argument("--dirs", type=int, default=200)
+    p.set_defaults(func=bench_memory)
+
+    p = sub.add_parser("order", help="Numbering by capture date against name and mtime order")
+    p.add_argument("--files", type=int, default=1_000_000)
+    p.add_argument("--dirs", type=int, default=1000)
+    p.set_defaults(func=bench_order)
+
+    p = sub.add_parser("move", help="Cross-device move throughput (copy, fsync, unlink)")
+    p.add_argument("--src", default=None, help="Folder on the source device (default: system temp)")
+    p.add_argument("--dst", default="/dev/shm" if os.path.isdir("/dev/shm") else None,
+                   help="Folder on the target device")
+    p.add_argument("--files", type=int, default=64)
+    p.add_argument("--size-mb", type=float, default=16)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    p.add_argument("--verify", action="store_true", help="Compare checksums before unlinking")
+    p.set_defaults(func=bench_move)
+
+    args = parser.parse_args(argv)
+    _quiet()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
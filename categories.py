@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Iterable, List, Tuple
+
+from logger import setup_logger
+from core import CATEGORY_MAP
+from paths import config_dir
+
+log = setup_logger().getChild("categories")
+
+CATEGORIES_FILE = "categories.json"
+
+
+class CategoryRegistry:
+    """
+    Extension → category lookup compiled from a category → extensions map.
+
+    Extensions are matched case-insensitively and may be compound
+    (".tar.gz"). The longest matching extension wins, so classifying a
+    name costs at most one dict probe per dot in the longest extension.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self.categories: Dict[str, frozenset] = {}
+        self._lookup: Dict[str, str] = {}
+        self._max_dots = 1
+
+        for category, exts in categories.items():
+            normalized = frozenset(self._normalize(e) for e in exts if e)
+            self.categories[category] = normalized
+            for ext in normalized:
+                if ext in self._lookup and self._lookup[ext] != category:
+                    log.warning(
+                        f"[CATEGORIES] '{ext}' listed under '{self._lookup[ext]}' and "
+                        f"'{category}'; using '{category}'"
+                    )
+                self._lookup[ext] = category
+                self._max_dots = max(self._max_dots, ext.count("."))
+
+    @staticmethod
+    def _normalize(ext: str) -> str:
+        ext = ext.strip().lower()
+        return ext if ext.startswith(".") else "." + ext
+
+    def match(self, name: str) -> Tuple[str, int] | None:
+        """
+        Return (category, extension length) for a filename, or None.
+        """
+        lower = name.lower()
+        end = len(lower)
+        candidates: List[int] = []
+        pos = end
+        for _ in range(self._max_dots):
+            pos = lower.rfind(".", 0, pos)
+            if pos <= 0:  # no dot, or a dotfile like ".bashrc"
+                break
+            candidates.append(pos)
+
+        # Longest extension first
+        for pos in reversed(candidates):
+            category = self._lookup.get(lower[pos:])
+            if category is not None:
+                return category, end - pos
+        return None
+
+    def classify(self, name: str) -> str | None:
+        found = self.match(name)
+        return found[0] if found else None
+
+    def split(self, name: str) -> Tuple[str, str]:
+        """
+        Split a filename into (stem, extension) honouring compound
+        extensions. Falls back to the last suffix for unknown names.
+        """
+        found = self.match(name)
+        if found:
+            cut = len(name) - found[1]
+        else:
+            cut = name.rfind(".")
+            if cut <= 0:
+                return name, ""
+        return name[:cut], name[cut:]
+
+
+# ---------------------------------------------------------
+# Loading
+# ---------------------------------------------------------
+def categories_path() -> str:
+    return os.environ.get("FRESHNAMER_CATEGORIES") or os.path.join(config_dir(), CATEGORIES_FILE)
+
+
+def load_categories(path: str | None = None) -> Dict[str, List[str]]:
+    """
+    Merge the user's category file over the built-in CATEGORY_MAP.
+
+    File format (JSON):
+        {
+            "image":   {"extend": [".cr3", ".arw"]},   # add to built-in list
+            "archive": [".zip", ".tar.gz", ".7z"]      # define / replace
+        }
+    """
+    merged: Dict[str, List[str]] = {k: sorted(v) for k, v in CATEGORY_MAP.items()}
+    path = path or categories_path()
+
+    if not os.path.exists(path):
+        return merged
+
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            user = json.load(fh)
+    except (OSError, json.JSONDecodeError) as e:
+        log.error(f"[CATEGORIES] Ignoring unreadable category file '{path}': {e}")
+        return merged
+
+    if not isinstance(user, dict):
+        log.error(f"[CATEGORIES] Ignoring category file '{path}': expected an object")
+        return merged
+
+    for category, spec in user.items():
+        if isinstance(spec, dict):
+            merged[category] = merged.get(category, []) + list(spec.get("extend", []))
+        elif isinstance(spec, list):
+            merged[category] = list(spec)
+        else:
+            log.error(f"[CATEGORIES] Ignoring '{category}' in '{path}': expected list or object")
+
+    log.info(f"[CATEGORIES] Loaded category file '{path}' | categories={len(merged)}")
+    return merged
+
+
+_registry: CategoryRegistry | None = None
+
+
+def get_registry() -> CategoryRegistry:
+    """Registry built from the user's category file, loaded once per process."""
+    global _registry
+    if _registry is None:
+        _registry = CategoryRegistry(load_categories())
+    return _registry
+
+
+def reload_registry(path: str | None = None) -> CategoryRegistry:
+    global _registry
+    _registry = CategoryRegistry(load_categories(path))
+    return _registry
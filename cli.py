@@ -0,0 +1,289 @@
+"""
+Headless entry point for review-then-apply workflows.
+
+    python cli.py plan  FOLDER --config rename.json --out plan.jsonl [--recursive] [--dest FOLDER]
+                        [--exclude .git,node_modules] [--skip-hidden] [--max-depth N]
+                        [--include '*.jpg'] [--min-size 1M] [--newer-than 2024-01-01]
+    python cli.py apply plan.jsonl [--undo-file undo.fnplan] [--workers 4] [--verify]
+    python cli.py undo  --undo-file undo.fnplan [--to LEVEL]
+    python cli.py export plan.jsonl OUTDIR [--no-hardlinks] [--workers 8]
+    python cli.py resume [--verify]
+    python cli.py serve --socket PATH | --http 127.0.0.1:PORT [--workers 4] [--queue 64]
+
+plan, apply, undo and export lock the folders they touch (see locks.py), so
+runs on separate folders can go in parallel; a run on an overlapping folder
+fails with the holder's pid, or waits with --wait SECONDS (--wait inf: no limit).
+
+Any command takes --metrics-file PATH (or FRESHNAMER_METRICS_FILE) to keep
+OpenMetrics counters and latency histograms in PATH for node_exporter's
+textfile collector; counters already in the file carry over between runs.
+
+The config file maps each category to its settings, e.g.
+    {"image": {"enabled": true, "mode": "normal", "prefix": "shoot_", "suffix": "",
+               "padding": 4, "start": 1, "advanced": "", "order": "captured"}}
+"order" picks how numbers are assigned: name (default), mtime, size, ctime, captured.
+"renumber" (normal mode) decides what happens to files already named prefix + number +
+suffix: shift renumbers everything (default), fill keeps them and fills the gaps,
+append keeps them and numbers new files after the highest.
+Unknown modes, orders or strategies and negative numbers are rejected before
+anything is scanned.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from config import RenameConfig
+import engine
+from engine import build_multi_plan, validate_plan, execute_plan, undo_last_rename, undo_to, export_copies, plan_roots
+from locks import lock_trees
+from scanner import ScanFilter, split_globs
+from planio import close_plan, export_plan, import_plan, export_undo_stack, import_undo_stack, PlanFormatError
+
+
+def _load_config(path: str) -> RenameConfig:
+    with open(path, "r", encoding="utf-8") as fh:
+        return RenameConfig.from_dict(json.load(fh))
+
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def _parse_size(text: str) -> int:
+    """'1500', '64K', '1.5M', '2G' → bytes"""
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ""
+    try:
+        return int(float(text[:len(text) - len(unit)]) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def _parse_time(text: str) -> float:
+    """ISO date/time ('2024-05-01', '2024-05-01T12:00') or epoch seconds"""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {text!r}")
+
+
+def _scan_filter(args) -> ScanFilter:
+    return ScanFilter(
+        include=tuple(g for text in args.include for g in split_globs(text)),
+        exclude=tuple(g for text in args.exclude for g in split_globs(text)),
+        max_depth=args.max_depth,
+        skip_hidden=args.skip_hidden,
+        min_size=args.min_size,
+        max_size=args.max_size,
+        newer_than=args.newer_than,
+        older_than=args.older_than,
+        follow_symlinks=args.follow_symlinks,
+    )
+
+
+def cmd_plan(args) -> int:
+    config = _load_config(args.config)
+    with lock_trees([args.folder], exclusive=False, purpose="freshnamer plan", timeout=args.wait):
+        plan = build_multi_plan(
+            folder=args.folder,
+            config=config,
+            recursive=args.recursive,
+            scan_filter=_scan_filter(args),
+            destination=args.dest,
+        )
+    export_plan(plan, args.out)
+    print(f"Planned {len(plan.operations)} rename(s), {len(plan.conflicts)} conflict(s) → {args.out}")
+    if plan.skipped_counts.get("duplicate"):
+        print(f"Skipped {plan.skipped_counts['duplicate']} duplicate path(s) to already planned files")
+    if plan.skipped_counts.get("unreadable_dir"):
+        print(f"Skipped {plan.skipped_counts['unreadable_dir']} folder(s) that could not be read (see the log)")
+    if plan.skipped_counts.get("renumber_avoided"):
+        print(f"Avoided {plan.skipped_counts['renumber_avoided']} rename(s) by keeping already numbered files")
+    return 1 if plan.conflicts else 0
+
+
+def cmd_apply(args) -> int:
+    if args.undo_file and Path(args.undo_file).exists():
+        import_undo_stack(args.undo_file)
+
+    plan = import_plan(args.plan)
+    try:
+        with lock_trees(plan_roots([plan]), purpose="freshnamer apply", timeout=args.wait):
+            ok, errors = validate_plan(plan)
+            if not ok:
+                for err in errors:
+                    print(f"error: {err}", file=sys.stderr)
+                return 1
+
+            renamed, failures = execute_plan(plan, workers=args.workers, verify=args.verify)
+        for msg in failures:
+            print(f"error: {msg}", file=sys.stderr)
+        print(f"Renamed {renamed}/{len(plan.operations)} file(s).")
+
+        # The undo stack may still read from the plan file
+        if args.undo_file:
+            export_undo_stack(args.undo_file)
+    finally:
+        close_plan(plan)
+    return 1 if failures else 0
+
+
+def cmd_undo(args) -> int:
+    import_undo_stack(args.undo_file)
+    levels = engine._undo_stack[args.to:] if args.to is not None else engine._undo_stack[-1:]
+    with lock_trees(plan_roots(levels), purpose="freshnamer undo", timeout=args.wait):
+        if args.to is not None:
+            restored, errors = undo_to(args.to, workers=args.workers, verify=args.verify)
+        else:
+            restored, errors = undo_last_rename(workers=args.workers, verify=args.verify)
+    for err in errors:
+        print(f"error: {err}", file=sys.stderr)
+    print(f"Restored {restored} file(s).")
+    export_undo_stack(args.undo_file)
+    return 1 if errors else 0
+
+
+def cmd_resume(args) -> int:
+    from crossmove import resume_moves
+
+    completed, failures = resume_moves(verify=args.verify)
+    for msg in failures:
+        print(f"error: {msg}", file=sys.stderr)
+    print(f"Finished {completed} interrupted move(s).")
+    return 1 if failures else 0
+
+
+def cmd_export(args) -> int:
+    plan = import_plan(args.plan)
+    try:
+        if plan.conflicts:
+            for msg in plan.conflicts:
+                print(f"error: {msg}", file=sys.stderr)
+            return 1
+
+        with lock_trees(plan_roots([plan]), exclusive=False, purpose="freshnamer export", timeout=args.wait):
+            exported, failures, methods = export_copies(
+                plan, args.out, source_root=args.root,
+                allow_hardlink=not args.no_hardlinks, workers=args.workers,
+            )
+    finally:
+        close_plan(plan)
+    for msg in failures:
+        print(f"error: {msg}", file=sys.stderr)
+    used = ", ".join(f"{name}={count}" for name, count in sorted(methods.items()))
+    print(f"Exported {exported}/{len(plan.operations)} file(s) → {args.out}" + (f" ({used})" if used else ""))
+    return 1 if failures else 0
+
+
+def cmd_serve(args) -> int:
+    from service import serve
+
+    serve(socket_path=args.socket, http=args.http, workers=args.workers, queue=args.queue)
+    return 0
+
+
+def _add_move_arguments(p) -> None:
+    p.add_argument("--workers", type=int, default=4, help="Parallel cross-device moves")
+    p.add_argument("--verify", action="store_true",
+                   help="Compare checksums of cross-device copies before removing sources")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="freshnamer", description="FreshNamer batch renamer")
+    parser.add_argument("--metrics-file", default=os.environ.get("FRESHNAMER_METRICS_FILE"),
+                        help="Write metrics here (e.g. the textfile collector's *.prom file)")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, metavar="SECONDS",
+                        help="How often the metrics file is rewritten during a run")
+    parser.add_argument("--wait", type=float, default=float(os.environ.get("FRESHNAMER_LOCK_WAIT", 0)),
+                        metavar="SECONDS",
+                        help="How long to wait for runs on overlapping folders (default: fail at once)")
+    parser.add_argument("--metrics-format", choices=("openmetrics", "prometheus"), default="openmetrics",
+                        help="Exposition format (prometheus: text format 0.0.4)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("plan", help="Build a rename plan and export it for review")
+    p.add_argument("folder")
+    p.add_argument("--config", required=True, help="JSON file with per-category settings")
+    p.add_argument("--out", required=True, help="Output plan (.jsonl or .fnplan)")
+    p.add_argument("--recursive", action="store_true")
+    p.add_argument("--dest", metavar="FOLDER",
+                   help="Move the renamed files into FOLDER (subfolders mirrored; other devices are copied, then unlinked)")
+    p.add_argument("--include", action="append", default=[], metavar="GLOBS",
+                   help="Only plan files matching these globs (repeatable, comma-separated)")
+    p.add_argument("--exclude", action="append", default=[], metavar="GLOBS",
+                   help="Skip folders/files matching these globs (repeatable, comma-separated)")
+    p.add_argument("--max-depth", type=int, help="Deepest folder level to scan (0 = FOLDER only)")
+    p.add_argument("--skip-hidden", action="store_true", help="Do not descend into dot-directories")
+    p.add_argument("--follow-symlinks", action="store_true",
+                   help="Descend into symlinked folders (loops and repeats are skipped)")
+    p.add_argument("--min-size", type=_parse_size, help="Smallest file size, e.g. 100K")
+    p.add_argument("--max-size", type=_parse_size, help="Largest file size, e.g. 2G")
+    p.add_argument("--newer-than", type=_parse_time, help="Only files modified at or after (ISO date or epoch)")
+    p.add_argument("--older-than", type=_parse_time, help="Only files modified before (ISO date or epoch)")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("apply", help="Validate and execute an exported plan")
+    p.add_argument("plan")
+    p.add_argument("--undo-file", help="Undo records to load before and save after applying")
+    _add_move_arguments(p)
+    p.set_defaults(func=cmd_apply)
+
+    p = sub.add_parser("undo", help="Undo the most recent applied plan")
+    p.add_argument("--undo-file", required=True)
+    p.add_argument("--to", type=int, metavar="LEVEL",
+                   help="Undo every level above LEVEL (0 = all) as one composed rename set")
+    _add_move_arguments(p)
+    p.set_defaults(func=cmd_undo)
+
+    p = sub.add_parser("resume", help="Finish cross-device moves interrupted by a crash")
+    p.add_argument("--verify", action="store_true", help="Compare checksums before removing sources")
+    p.set_defaults(func=cmd_resume)
+
+    p = sub.add_parser("export", help="Write renamed copies of a plan into another folder")
+    p.add_argument("plan")
+    p.add_argument("out", help="Output folder (created if missing)")
+    p.add_argument("--root", help="Source folder the plan was built for (default: common parent)")
+    p.add_argument("--no-hardlinks", action="store_true",
+                   help="Always create independent copies (reflink or kernel copy)")
+    p.add_argument("--workers", type=int, default=8)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("serve", help="Run the JSON-RPC service (see service.py)")
+    where = p.add_mutually_exclusive_group(required=True)
+    where.add_argument("--socket", help="Unix domain socket path")
+    where.add_argument("--http", metavar="HOST:PORT", help="Listen for HTTP on localhost")
+    p.add_argument("--workers", type=int, default=4, help="Jobs run at the same time")
+    p.add_argument("--queue", type=int, default=64, help="Jobs allowed to wait before calls are refused")
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    writer = None
+    if args.metrics_file:
+        from metrics import TextfileWriter
+        writer = TextfileWriter(
+            args.metrics_file, args.metrics_interval, openmetrics=args.metrics_format == "openmetrics"
+        ).start()
+    try:
+        return args.func(args)
+    except (PlanFormatError, OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if writer is not None:
+            writer.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import sys
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Set
+
+from logger import setup_logger
+from fsbackend import FileSystem
+
+log = setup_logger().getChild("collisions")
+
+
+# ---------------------------------------------------------
+# Name normalization policy
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class NamePolicy:
+    """
+    How two names are compared on a given root.
+
+    case_insensitive:    "IMG.JPG" and "img.jpg" are the same name
+    unicode_insensitive: NFC and NFD spellings ("é" vs "é") are the same name
+    """
+    case_insensitive: bool = False
+    unicode_insensitive: bool = True
+
+    def key(self, text: str) -> str:
+        if self.unicode_insensitive:
+            text = unicodedata.normalize("NFC", text)
+        if self.case_insensitive:
+            text = text.casefold()
+        return text
+
+    @property
+    def name(self) -> str:
+        parts = []
+        if self.case_insensitive:
+            parts.append("casefold")
+        if self.unicode_insensitive:
+            parts.append("nfc")
+        return "+".join(parts) or "exact"
+
+    @classmethod
+    def parse(cls, name: str) -> "NamePolicy":
+        parts = {p.strip().lower() for p in name.split("+") if p.strip()}
+        unknown = parts - {"exact", "casefold", "nfc"}
+        if unknown:
+            raise ValueError(f"Unknown name policy '{name}' (use exact, casefold, nfc or casefold+nfc)")
+        return cls(case_insensitive="casefold" in parts, unicode_insensitive="nfc" in parts)
+
+
+_policy_cache: Dict[str, NamePolicy] = {}
+
+
+def _probe_same_file(fs: FileSystem, original: Path, variant: Path) -> bool | None:
+    """True/False if the variant spelling resolves to the original file, None if unknown."""
+    try:
+        if not fs.exists(variant):
+            return False
+        a = fs.stat(original, follow_symlinks=False)
+        b = fs.stat(variant, follow_symlinks=False)
+    except OSError:
+        return None
+    return (a.st_dev, a.st_ino) == (b.st_dev, b.st_ino)
+
+
+def detect_policy(root: Path, fs: FileSystem) -> NamePolicy:
+    """
+    Probe how the filesystem under root compares names, using one entry
+    of the root listing. Falls back to the platform default (case-insensitive
+    on macOS and Windows) when no suitable entry exists.
+
+    Unicode normalization is always treated as insensitive for conflict
+    purposes: NFC/NFD twins are indistinguishable to users even where the
+    filesystem stores them separately.
+    """
+    cached = _policy_cache.get(str(root))
+    if cached is not None:
+        return cached
+
+    case_insensitive = None
+    try:
+        for entry in fs.scandir(root):
+            swapped = entry.name.swapcase()
+            if swapped != entry.name and swapped.swapcase() == entry.name:
+                case_insensitive = _probe_same_file(fs, root / entry.name, root / swapped)
+                if case_insensitive is not None:
+                    break
+    except OSError as e:
+        log.debug(f"[NAMES] Could not probe '{root}': {e}")
+
+    if case_insensitive is None:
+        case_insensitive = sys.platform in ("darwin", "win32")
+
+    policy = NamePolicy(case_insensitive=case_insensitive, unicode_insensitive=True)
+    _policy_cache[str(root)] = policy
+    log.debug(f"[NAMES] Policy for '{root}': {policy.name}")
+    return policy
+
+
+def resolve_policy(root: Path, fs: FileSystem, configured: str | None = None) -> NamePolicy:
+    """
+    Explicit setting (argument, then FRESHNAMER_NAME_POLICY) wins over detection.
+    """
+    configured = configured or os.environ.get("FRESHNAMER_NAME_POLICY")
+    if configured and configured.lower() != "auto":
+        return NamePolicy.parse(configured)
+    return detect_policy(root, fs)
+
+
+# ---------------------------------------------------------
+# Collision index
+# ---------------------------------------------------------
+class CollisionIndex:
+    """
+    Normalized-key index over one plan: the files seen by the scan,
+    the sources being renamed and the requested targets. All checks
+    are single dict/set probes.
+    """
+
+    def __init__(self, policy: NamePolicy):
+        self.policy = policy
+        # key → every scanned path with that key (twins can coexist on disk)
+        self._existing: Dict[str, List[Path]] = {}
+        self._sources: Set[Path] = set()
+        # key → [count, first target, categories]
+        self._targets: Dict[str, list] = {}
+        # Keys reported by the last conflicts() call
+        self.conflict_keys: Set[str] = set()
+
+    def _key(self, path: Path) -> str:
+        return self.policy.key(str(path))
+
+    def add_existing(self, path: Path) -> None:
+        self._existing.setdefault(self._key(path), []).append(path)
+
+    def is_noop(self, old: Path, new: Path) -> bool:
+        # Only byte-identical names are no-ops; case- or normalization-only
+        # changes are real renames. Compared as strings: PureWindowsPath
+        # equality ignores case.
+        return str(old) == str(new)
+
+    def add_rename(self, old: Path, new: Path, category: str) -> None:
+        self._sources.add(old)
+        key = self._key(new)
+        entry = self._targets.get(key)
+        if entry is None:
+            self._targets[key] = [1, new, {category}]
+        else:
+            entry[0] += 1
+            entry[2].add(category)
+
+    def conflicts(self) -> List[str]:
+        messages: List[str] = []
+        self.conflict_keys = set()
+        for key, (count, target, categories) in self._targets.items():
+            if count > 1:
+                self.conflict_keys.add(key)
+                if len(categories) == 1:
+                    (category,) = categories
+                    messages.append(f"Internal conflict in '{category}': {count} files want '{target.name}'")
+                else:
+                    messages.append(f"Cross-category conflict: {count} files want '{target.name}'")
+                continue
+
+            # Taken unless every file with that name is renamed away
+            staying = [p for p in self._existing.get(key, ()) if p not in self._sources]
+            if staying:
+                self.conflict_keys.add(key)
+                msg = f"Target already exists: {target}"
+                if str(staying[0]) != str(target):
+                    msg += f" (as '{staying[0].name}')"
+                messages.append(msg)
+
+        for msg in messages:
+            log.debug(f"[NAMES] {msg}")
+        return messages
@@ -1,74 +1,206 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Dict, Iterator, Mapping, Tuple
+
 from logger import setup_logger
 log = setup_logger()
 
-def build_config_from_gui(gui) -> dict:
+# Rename modes
+MODE_NORMAL = "normal"
+MODE_ADVANCED = "advanced"
+MODE_REGEX = "regex"
+MODES = (MODE_NORMAL, MODE_ADVANCED, MODE_REGEX)
+
+REGEX_CASES = ("keep", "lower", "upper", "title")
+
+
+# ---------------------------------------------------------
+# Per-category settings
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class CategoryConfig:
     """
-    Reads all GUI fields and builds a config dict expected by rename_files().
+    Settings of one category. Frozen and hashable; values are checked on
+    construction (ValueError). Pattern syntax (advanced format strings,
+    regexes) is checked when a plan is built, where it becomes a plan
+    message instead of an exception.
     """
-    log.debug("[CONFIG] Building config from GUI")
+    enabled: bool = False
+    mode: str = MODE_NORMAL
+    prefix: str = ""
+    suffix: str = ""
+    padding: int = 1
+    start: int = 0
+    order: str = "name"
+    renumber: str = "shift"
+    advanced: str = ""
+    regex_pattern: str = ""
+    regex_replace: str = ""
+    regex_ignore_case: bool = False
+    regex_case: str = "keep"
+
+    def __post_init__(self):
+        # Imported here: engine imports this module
+        from engine import NUMBER_ORDERS, RENUMBER_STRATEGIES
+
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown mode '{self.mode}' (expected one of {', '.join(MODES)})")
+        if self.order not in NUMBER_ORDERS:
+            raise ValueError(f"Unknown number order '{self.order}' (expected one of {', '.join(NUMBER_ORDERS)})")
+        if self.renumber not in RENUMBER_STRATEGIES:
+            raise ValueError(
+                f"Unknown renumber strategy '{self.renumber}' (expected one of {', '.join(RENUMBER_STRATEGIES)})"
+            )
+        if self.regex_case not in REGEX_CASES:
+            raise ValueError(f"Unknown case option '{self.regex_case}' (use {', '.join(REGEX_CASES)})")
+        for name in ("padding", "start"):
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise ValueError(f"'{name}' must be a non-negative integer, got {value!r}")
+        for name in ("prefix", "suffix", "advanced", "regex_pattern", "regex_replace"):
+            if not isinstance(getattr(self, name), str):
+                raise ValueError(f"'{name}' must be a string")
+
+    def to_dict(self) -> Dict:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
 
-    config = {}
-
-    def read_category(cat_key, widgets):
-        enabled = widgets["enabled"].isChecked()
-        mode = "advanced" if widgets["advanced_mode"].isChecked() else "normal"
-        log.debug(f"[CONFIG] Category '{cat_key}' enabled={enabled} mode={mode}")
-
-        # Normal mode
-        if mode == "normal":
-            prefix = widgets["prefix"].text()
-            suffix = widgets["suffix"].text()
-            padding = int(widgets["padding"].currentText())
-            start = int(widgets["start"].value())
-
-            log.debug(f"[CONFIG] Normal mode: prefix='{prefix}' suffix='{suffix}' padding={padding} start={start}")
-
-            return {
-                "enabled": enabled,
-                "mode": "normal",
-                "prefix": prefix,
-                "suffix": suffix,
-                "padding": padding,
-                "start": start,
-                "advanced": ""
-            }
-        # Advanced Mode
-        fmt = widgets["advanced_text"].text()
-        start = int(widgets["start"].value())
-
-        log.debug(f"[CONFIG] Advanced mode: pattern='{fmt}' start={start}")
-
-        # Validate advanced format string
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "CategoryConfig":
+        """
+        Accepts the canonical keys (to_dict) and the older GUI shape
+        ("advanced_mode" / "advanced_text" instead of "mode" / "advanced").
+        """
+        mode = data.get("mode")
+        if mode is None:
+            mode = MODE_ADVANCED if data.get("advanced_mode") else MODE_NORMAL
+        advanced = data.get("advanced")
+        if advanced is None:
+            advanced = data.get("advanced_text", "")
         try:
-            fmt.format(
-                original="test",
-                num=1,
-                num_padded="01",
-                prefix="",
-                suffix="",
-                category="test",
-                folder="/test"
+            return cls(
+                enabled=bool(data.get("enabled", False)),
+                mode=mode,
+                prefix=data.get("prefix", ""),
+                suffix=data.get("suffix", ""),
+                padding=int(data.get("padding", 1)),
+                start=int(data.get("start", 0)),
+                order=data.get("order") or "name",
+                renumber=data.get("renumber") or "shift",
+                advanced=advanced or "",
+                regex_pattern=data.get("regex_pattern", ""),
+                regex_replace=data.get("regex_replace", ""),
+                regex_ignore_case=bool(data.get("regex_ignore_case", False)),
+                regex_case=data.get("regex_case") or "keep",
             )
-        except Exception as e:
-            log.error(f"[CONFIG] Invalid format string for '{cat_key}': {e}")
-            raise ValueError(f"Invalid format string for '{cat_key}': {e}")
-        
-        return {
-            "enabled": enabled,
-            "mode": "advanced",
-            "prefix": "",
-            "suffix": "",
-            "padding": 0,
-            "start": start,
-            "advanced": fmt
-        }
-    
-    # Build config for each category
-    config["image"] = read_category("image", gui.widgets_image)
-    config["video"] = read_category("video", gui.widgets_video)
-    config["gif"] = read_category("gif", gui.widgets_gif)
-    config["audio"] = read_category("audio", gui.widgets_audio)
-    config["document"] = read_category("document", gui.widgets_document)
-
-    return config
-        
\ No newline at end of file
+        except TypeError as e:
+            raise ValueError(str(e))
+
+
+# ---------------------------------------------------------
+# Whole configuration
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class RenameConfig:
+    """
+    Settings of every category, as one immutable value shared by the GUI,
+    the CLI and the engine. Hashable, so it can key caches; reads like a
+    read-only mapping of category → CategoryConfig.
+    """
+    categories: Tuple[Tuple[str, CategoryConfig], ...] = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, "categories", tuple(self.categories))
+        seen = set()
+        for key, cfg in self.categories:
+            if key in seen:
+                raise ValueError(f"Category '{key}' configured twice")
+            if not isinstance(cfg, CategoryConfig):
+                raise ValueError(f"Settings for '{key}' must be a CategoryConfig")
+            seen.add(key)
+
+    def __getitem__(self, key: str) -> CategoryConfig:
+        for name, cfg in self.categories:
+            if name == key:
+                return cfg
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, _ in self.categories)
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def items(self):
+        return iter(self.categories)
+
+    @property
+    def enabled(self) -> Tuple[str, ...]:
+        return tuple(name for name, cfg in self.categories if cfg.enabled)
+
+    def to_dict(self) -> Dict:
+        return {name: cfg.to_dict() for name, cfg in self.categories}
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "RenameConfig":
+        if not isinstance(data, Mapping):
+            raise ValueError("Config must map category names to settings")
+        categories = []
+        for key, values in data.items():
+            if not isinstance(values, Mapping):
+                raise ValueError(f"Settings for '{key}' must be an object")
+            try:
+                categories.append((key, CategoryConfig.from_dict(values)))
+            except ValueError as e:
+                raise ValueError(f"Invalid settings for '{key}': {e}")
+        return cls(tuple(categories))
+
+    @classmethod
+    def coerce(cls, config) -> "RenameConfig":
+        """A RenameConfig as is, or one built from a plain dict."""
+        return config if isinstance(config, cls) else cls.from_dict(config)
+
+
+# ---------------------------------------------------------
+# GUI → config
+# ---------------------------------------------------------
+def build_config_from_gui(gui) -> RenameConfig:
+    """
+    Reads the category widgets of the GUI (gui.widget_dicts) into a
+    RenameConfig.
+    """
+    log.debug("[CONFIG] Building config from GUI")
+
+    categories = []
+    for cat_key, widgets in gui.widget_dicts.items():
+        if widgets["regex_mode"].isChecked():
+            mode = MODE_REGEX
+        elif widgets["advanced_mode"].isChecked():
+            mode = MODE_ADVANCED
+        else:
+            mode = MODE_NORMAL
+        cfg = CategoryConfig(
+            enabled=widgets["enabled"].isChecked(),
+            mode=mode,
+            prefix=widgets["prefix"].text(),
+            suffix=widgets["suffix"].text(),
+            padding=int(widgets["padding"].currentText()),
+            start=int(widgets["start"].value()),
+            order=widgets["order"].currentData(),
+            renumber=widgets["renumber"].currentData(),
+            advanced=widgets["advanced_text"].text(),
+            regex_pattern=widgets["regex_find"].text(),
+            regex_replace=widgets["regex_replace"].text(),
+            regex_ignore_case=widgets["regex_ignore_case"].isChecked(),
+            regex_case=widgets["regex_case"].currentData(),
+        )
+        log.debug(f"[CONFIG] Category '{cat_key}' enabled={cfg.enabled} mode={mode}")
+        categories.append((cat_key, cfg))
+
+    return RenameConfig(tuple(categories))
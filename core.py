@@ -1,3 +1,7 @@
+from __future__ import annotations
+
+import os
+import re
 from pathlib import Path
 from logger import setup_logger
 log = setup_logger()
@@ -60,6 +64,7 @@ def build_name_advanced(
     suffix: str,
     category: str,
     folder: str,
+    extra=None,
 ):
     """
     Advanced Mode: user-defined pattern with variables.
@@ -72,6 +77,9 @@ def build_name_advanced(
         {suffix}        → suffix text
         {category}      → category key (image, video, etc.)
         {folder}        → parent folder path
+
+    extra maps plugin placeholders to this file's values
+    (see placeholders.py).
     """
     # Build padded index
     if padding > 0:
@@ -89,4 +97,127 @@ def build_name_advanced(
         suffix=suffix,
         category=category,
         folder=folder,
+        **(extra or {}),
     )
+
+
+# ---------------------------------------------------------
+# Name Validation
+# ---------------------------------------------------------
+
+# Characters that would turn a generated name into a path
+NAME_SEPARATORS = tuple({"/", os.sep, os.altsep or "/"})
+
+
+def invalid_name(name: str, ext: str) -> str | None:
+    """
+    Why a generated file name cannot be used, or None if it can. ext is
+    the extension the name was built with: a name that is nothing but
+    that extension (an empty stem), ".", ".." or anything holding a path
+    separator would hide or move the file instead of renaming it.
+    """
+    if any(sep in name for sep in NAME_SEPARATORS):
+        return "contains a path separator"
+    stem = name[: len(name) - len(ext)] if ext and name.endswith(ext) else name
+    if stem.strip() in ("", ".", ".."):
+        return "has an empty name"
+    return None
+
+
+# ---------------------------------------------------------
+# Regex Mode
+# ---------------------------------------------------------
+
+REGEX_CASE_TRANSFORMS = {
+    "keep": None,
+    "lower": str.lower,
+    "upper": str.upper,
+    "title": str.title,
+}
+
+# Group references in a replacement template: \g<name>, \g<1>, \1 .. \99
+_GROUP_REF = re.compile(r"\\(?:g<([^>]*)>|(\d{1,2})|(.))", re.DOTALL)
+
+
+class RegexRule:
+    """
+    A compiled find-and-replace rule, built once per plan by
+    compile_regex_rule() and applied to every stem in the batch.
+    """
+
+    __slots__ = ("pattern", "replacement", "count", "transform")
+
+    def __init__(self, pattern, replacement: str, count: int, transform):
+        self.pattern = pattern
+        self.replacement = replacement
+        self.count = count
+        self.transform = transform
+
+
+def compile_regex_rule(
+    pattern: str,
+    replacement: str,
+    ignore_case: bool = False,
+    case: str = "keep",
+    count: int = 0,
+) -> RegexRule:
+    """
+    Compile and validate a regex rule. Raises ValueError for an invalid
+    pattern, an unknown group reference in the replacement, or an
+    unknown case option.
+
+    case: "keep", "lower", "upper" or "title", applied to the result.
+    count: maximum substitutions per name (0 = all).
+    """
+    if not pattern:
+        raise ValueError("Regex pattern is empty")
+    if case not in REGEX_CASE_TRANSFORMS:
+        raise ValueError(f"Unknown case option '{case}' (use {', '.join(REGEX_CASE_TRANSFORMS)})")
+
+    try:
+        compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        raise ValueError(f"Invalid regex '{pattern}': {e}")
+
+    for m in _GROUP_REF.finditer(replacement):
+        name, number, escape = m.groups()
+        if name is not None:
+            if name.isdigit():
+                if int(name) > compiled.groups:
+                    raise ValueError(f"Replacement refers to missing group {name}")
+            elif name not in compiled.groupindex:
+                raise ValueError(f"Replacement refers to unknown group '{name}'")
+        elif number is not None:
+            if int(number) > compiled.groups:
+                raise ValueError(f"Replacement refers to missing group {number}")
+        elif escape.isascii() and escape.isalpha() and escape not in "abfnrtv":
+            raise ValueError(f"Bad escape '\\{escape}' in replacement")
+
+    log.debug(f"[NAME_REGEX] Compiled pattern='{pattern}' replacement='{replacement}' case={case}")
+    return RegexRule(compiled, replacement, count, REGEX_CASE_TRANSFORMS[case])
+
+
+def build_names_regex(rule: RegexRule, stems):
+    """
+    Regex Mode: apply a compiled rule to a batch of stems.
+
+    Returns (new_stems, skipped) where new_stems[i] is None for stems
+    the pattern did not match, and skipped is how many those were.
+    """
+    subn = rule.pattern.subn
+    replacement = rule.replacement
+    count = rule.count
+    transform = rule.transform
+
+    results = []
+    skipped = 0
+    for stem in stems:
+        new_stem, n = subn(replacement, stem, count)
+        if n == 0:
+            results.append(None)
+            skipped += 1
+            continue
+        results.append(transform(new_stem) if transform else new_stem)
+
+    log.debug(f"[NAME_REGEX] Batch of {len(results)} | matched={len(results) - skipped} skipped={skipped}")
+    return results, skipped
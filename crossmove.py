@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import itertools
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Tuple
+
+from logger import setup_logger
+from fastcopy import copy_data
+from locks import lock_handle
+from paths import state_dir
+
+log = setup_logger().getChild("crossmove")
+
+JOURNAL_FILE = "move-journal.jsonl"
+JOURNAL_GLOB = "move-journal*.jsonl"
+
+# Journal states, in the order a move passes through them
+STATE_BEGIN = "begin"      # copy started; dst may be partial
+STATE_COPIED = "copied"    # dst complete and on disk; src still present (or its unlink failed)
+STATE_DONE = "done"        # src unlinked
+STATE_FAILED = "failed"    # move reported as failed; dst removed, src left as it was
+
+_CHUNK = 1024 * 1024
+
+_journal_ids = itertools.count(1)
+
+
+def journal_path() -> Path:
+    """A journal file of its own for one run (runs in parallel never share one)."""
+    return Path(state_dir()) / f"move-journal-{os.getpid()}-{next(_journal_ids)}.jsonl"
+
+
+def journal_paths() -> List[Path]:
+    """Every journal in the state folder, including the single file older versions wrote."""
+    return sorted(Path(state_dir()).glob(JOURNAL_GLOB))
+
+
+class MoveJournal:
+    """
+    Append-only JSON Lines record of cross-device moves:
+        {"state": "begin" | "copied" | "done" | "failed", "src": "...", "dst": "..."}
+
+    "copied" is fsynced before the source is unlinked, so after a crash
+    every move can be finished or redone (see resume_moves). The file is
+    OS-locked while open, so resume_moves leaves journals of running
+    processes alone.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path is not None else journal_path()
+        self._lock = threading.Lock()
+        self._fh = None
+
+    def _open(self, blocking: bool) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.path, "a", encoding="utf-8")
+        try:
+            lock_handle(fh.fileno(), blocking)
+        except BaseException:
+            fh.close()
+            raise
+        self._fh = fh
+
+    def claim(self) -> bool:
+        """Take an existing journal over; False while its run is still going."""
+        with self._lock:
+            if self._fh is None:
+                try:
+                    self._open(blocking=False)
+                except BlockingIOError:
+                    return False
+            return True
+
+    def record(self, state: str, src: Path, dst: Path, sync: bool = False) -> None:
+        line = json.dumps({"state": state, "src": str(src), "dst": str(dst)}, ensure_ascii=False)
+        with self._lock:
+            if self._fh is None:
+                self._open(blocking=True)
+            self._fh.write(line + "\n")
+            self._fh.flush()
+            if sync:
+                os.fsync(self._fh.fileno())
+
+    def pending(self) -> List[Tuple[str, Path, Path]]:
+        """(last state, src, dst) for every move that neither finished nor failed."""
+        last = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn final line from a crash mid-write
+                        continue
+                    last[(entry["src"], entry["dst"])] = entry["state"]
+        except FileNotFoundError:
+            return []
+        return [
+            (state, Path(src), Path(dst))
+            for (src, dst), state in last.items()
+            if state not in (STATE_DONE, STATE_FAILED)
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def clear(self) -> None:
+        """Drop the journal once no move is pending."""
+        with self._lock:
+            # Removed while still locked, so no resume can claim it in between
+            try:
+                os.unlink(self.path)
+                removed = True
+            except FileNotFoundError:
+                removed = True
+            except OSError:
+                # Windows cannot remove an open file
+                removed = False
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if not removed:
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+
+
+# ---------------------------------------------------------
+# One move
+# ---------------------------------------------------------
+def file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fsync_dir(folder: Path) -> None:
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return  # not supported (Windows)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def move_file(src: Path, dst: Path, verify: bool = False, journal: MoveJournal | None = None) -> str:
+    """
+    Move src to dst on another device: kernel-side copy, optional
+    checksum comparison, fsync of the data and the target folder, then
+    unlink of the source. Never overwrites dst. Returns the copy method.
+
+    A failed copy is rolled back and journaled as failed. If only the
+    unlink fails, dst is kept and the entry stays "copied", so
+    resume_moves() can finish the move; the error is still raised.
+    """
+    src, dst = Path(src), Path(dst)
+    devs = (os.stat(src).st_dev, os.stat(dst.parent).st_dev)
+    # Checked before journaling: resume may delete a "begin" target
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, "File exists", str(dst))
+
+    if journal is not None:
+        journal.record(STATE_BEGIN, src, dst)
+    created = False
+    try:
+        method = copy_data(src, dst, devs, fsync=True)
+        created = True
+
+        # Cheap last check even without verify: the source is deleted next
+        copied, expected = os.stat(dst).st_size, os.stat(src).st_size
+        if copied != expected:
+            raise OSError(errno.EIO, f"Copy has {copied} of {expected} bytes", str(dst))
+
+        if verify and file_digest(src) != file_digest(dst):
+            raise OSError(errno.EIO, "Checksum mismatch after copy", str(dst))
+
+        _fsync_dir(dst.parent)
+        if journal is not None:
+            journal.record(STATE_COPIED, src, dst, sync=True)
+    except Exception:
+        # Reported as failed: back to the source alone, and resume must not redo it
+        # (copy_data removes a target it did not finish itself)
+        if created:
+            try:
+                os.unlink(dst)
+            except OSError:
+                pass
+        if journal is not None:
+            journal.record(STATE_FAILED, src, dst, sync=True)
+        raise
+
+    # The copy is durable from here on: a failed unlink leaves the entry at
+    # "copied" for resume_moves() rather than throwing the copy away
+    os.unlink(src)
+    if journal is not None:
+        journal.record(STATE_DONE, src, dst)
+    return method
+
+
+# ---------------------------------------------------------
+# Crash recovery
+# ---------------------------------------------------------
+def resume_moves(journal: MoveJournal | None = None, verify: bool = False) -> Tuple[int, List[str]]:
+    """
+    Finish the moves interrupted runs left behind:
+      - "copied": the copy is durable, only the source unlink is missing
+      - "begin":  the copy may be partial; it is discarded and redone
+    Without a journal, every journal in the state folder whose run is no
+    longer going is resumed. Returns (completed, failures). A journal is
+    removed when nothing in it remains pending.
+    """
+    if journal is not None:
+        return _resume_journal(journal, verify)
+
+    completed = 0
+    failures: List[str] = []
+    for path in journal_paths():
+        journal = MoveJournal(path)
+        if not journal.claim():
+            log.info(f"[MOVE] Skipping {path.name}: its run is still going")
+            continue
+        done, failed = _resume_journal(journal, verify)
+        completed += done
+        failures.extend(failed)
+    return completed, failures
+
+
+def _resume_journal(journal: MoveJournal, verify: bool) -> Tuple[int, List[str]]:
+    completed = 0
+    failures: List[str] = []
+
+    for state, src, dst in journal.pending():
+        try:
+            if not os.path.lexists(src):
+                # Source already gone: the move finished after the last record
+                if os.path.lexists(dst):
+                    journal.record(STATE_DONE, src, dst)
+                    completed += 1
+                    continue
+                raise FileNotFoundError(errno.ENOENT, "Source and target both missing", str(src))
+
+            if state == STATE_COPIED:
+                os.unlink(src)
+                journal.record(STATE_DONE, src, dst)
+            else:
+                if os.path.lexists(dst):
+                    os.unlink(dst)
+                move_file(src, dst, verify=verify, journal=journal)
+            completed += 1
+            log.info(f"[MOVE] Resumed {src} → {dst} (from '{state}')")
+        except OSError as e:
+            msg = f"Failed: {src} → {dst}: {e}"
+            failures.append(msg)
+            log.error(f"[MOVE] {msg}")
+
+    if failures:
+        journal.close()
+    else:
+        journal.clear()
+    return completed, failures
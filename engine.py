@@ -13,261 +13,1462 @@ def _log(msg: str):
 
 _undo_stack = []
 
-from dataclasses import dataclass
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Tuple
-
-from core import CATEGORY_MAP, build_name_normal, build_name_advanced
+from typing import Callable, List, Dict, Iterable, Iterator, Tuple
+
+from core import (
+    NAME_SEPARATORS,
+    build_name_normal,
+    build_name_advanced,
+    build_names_regex,
+    compile_regex_rule,
+    invalid_name,
+)
+from categories import get_registry
+from fsbackend import FileSystem, get_filesystem
+from collisions import CollisionIndex, NamePolicy, resolve_policy
+from scanner import NO_FILTER, ScanFilter, mtime_ns, walk
+import metrics
+from config import MODE_ADVANCED, MODE_NORMAL, MODE_REGEX, CategoryConfig, RenameConfig
+from placeholders import (
+    BUILTIN_PLACEHOLDERS, PlaceholderBatch, PlaceholderRegistry, get_placeholder_registry, placeholder_fields,
+)
 
 
 @dataclass
 class RenameOperation:
+    __slots__ = ("old_path", "new_path", "category")
     old_path: Path
     new_path: Path
     category: str
 
 
+# Per-operation status flags (CompactOperations.flags)
+FLAG_CONFLICT = 1   # target collides with another target or an existing file (plan time)
+FLAG_EXISTS = 2     # target found on disk by validate_plan
+
+
+class CompactOperations:
+    """
+    Column-oriented storage for rename operations.
+
+    Per operation it keeps two directory ids, one slot into a shared
+    UTF-8 name blob (old and new name), a category code and status
+    flags. Directories and categories are interned. Behaves like the
+    list of RenameOperation it replaces: len(), iteration, indexing,
+    append/extend and sort(key=...); indexing materializes a
+    RenameOperation on demand.
+    """
+
+    __slots__ = (
+        "_dirs", "_dir_ids", "_categories", "_category_ids",
+        "_old_dir", "_new_dir", "_slot", "_category", "_flags",
+        "_names", "_name_ends",
+    )
+
+    def __init__(self, operations: Iterable[RenameOperation] = ()):
+        self._dirs: List[Path] = []
+        self._dir_ids: Dict[Path, int] = {}
+        self._categories: List[str] = []
+        self._category_ids: Dict[str, int] = {}
+
+        self._old_dir = array("I")
+        self._new_dir = array("I")
+        self._slot = array("I")        # name slot: old name = 2*slot, new name = 2*slot + 1
+        self._category = array("H")
+        self._flags = array("B")
+
+        self._names = bytearray()
+        self._name_ends = array("Q")
+
+        self.extend(operations)
+
+    # -----------------------------------------------------
+    # Interning
+    # -----------------------------------------------------
+    def _dir_id(self, path: Path) -> int:
+        idx = self._dir_ids.get(path)
+        if idx is None:
+            idx = self._dir_ids[path] = len(self._dirs)
+            self._dirs.append(path)
+        return idx
+
+    def _category_id(self, category: str) -> int:
+        idx = self._category_ids.get(category)
+        if idx is None:
+            idx = self._category_ids[category] = len(self._categories)
+            self._categories.append(category)
+        return idx
+
+    def _add_name(self, name: str) -> None:
+        self._names += name.encode("utf-8", "surrogateescape")
+        self._name_ends.append(len(self._names))
+
+    def _name(self, k: int) -> str:
+        start = self._name_ends[k - 1] if k else 0
+        return self._names[start:self._name_ends[k]].decode("utf-8", "surrogateescape")
+
+    # -----------------------------------------------------
+    # Building
+    # -----------------------------------------------------
+    def add(self, old_path: Path, new_path: Path, category: str, flags: int = 0) -> None:
+        """Append one operation without creating a RenameOperation."""
+        self._old_dir.append(self._dir_id(old_path.parent))
+        self._new_dir.append(self._dir_id(new_path.parent))
+        self._slot.append(len(self._name_ends) // 2)
+        self._add_name(old_path.name)
+        self._add_name(new_path.name)
+        self._category.append(self._category_id(category))
+        self._flags.append(flags)
+
+    def append(self, op: RenameOperation) -> None:
+        self.add(op.old_path, op.new_path, op.category)
+
+    def extend(self, operations: Iterable[RenameOperation]) -> None:
+        if isinstance(operations, CompactOperations) and operations is not self:
+            # Column-wise copy: remap interned ids, append the name blob as is
+            dir_map = [self._dir_id(d) for d in operations._dirs]
+            category_map = [self._category_id(c) for c in operations._categories]
+            base_slot = len(self._name_ends) // 2
+            base_offset = len(self._names)
+            self._old_dir.extend(dir_map[d] for d in operations._old_dir)
+            self._new_dir.extend(dir_map[d] for d in operations._new_dir)
+            self._slot.extend(base_slot + slot for slot in operations._slot)
+            self._category.extend(category_map[c] for c in operations._category)
+            self._flags.extend(operations._flags)
+            self._names += operations._names
+            self._name_ends.extend(base_offset + end for end in operations._name_ends)
+            return
+        for op in operations:
+            self.add(op.old_path, op.new_path, op.category)
+
+    # -----------------------------------------------------
+    # Column accessors
+    # -----------------------------------------------------
+    def old_name(self, i: int) -> str:
+        return self._name(2 * self._slot[i])
+
+    def new_name(self, i: int) -> str:
+        return self._name(2 * self._slot[i] + 1)
+
+    def old_path(self, i: int) -> Path:
+        return self._dirs[self._old_dir[i]] / self.old_name(i)
+
+    def new_path(self, i: int) -> Path:
+        return self._dirs[self._new_dir[i]] / self.new_name(i)
+
+    def category(self, i: int) -> str:
+        return self._categories[self._category[i]]
+
+    def flags(self, i: int) -> int:
+        return self._flags[i]
+
+    def set_flag(self, i: int, flag: int) -> None:
+        self._flags[i] |= flag
+
+    def clear_flag(self, flag: int) -> None:
+        if any(self._flags):
+            mask = 0xFF ^ flag
+            self._flags = array("B", (f & mask for f in self._flags))
+
+    def nbytes(self) -> int:
+        """Memory held by the columns, the name blob and the intern tables."""
+        columns = (self._old_dir, self._new_dir, self._slot, self._category, self._flags, self._name_ends)
+        tables = (self._names, self._dirs, self._dir_ids, self._categories, self._category_ids)
+        return (
+            sum(sys.getsizeof(c) for c in columns)
+            + sum(sys.getsizeof(t) for t in tables)
+            + sum(sys.getsizeof(d) + sys.getsizeof(str(d)) for d in self._dirs)
+            + sum(sys.getsizeof(c) for c in self._categories)
+        )
+
+    # -----------------------------------------------------
+    # Sequence protocol
+    # -----------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._subset(range(len(self))[i])
+        if i < 0:
+            i += len(self)
+        return RenameOperation(self.old_path(i), self.new_path(i), self.category(i))
+
+    def __iter__(self) -> Iterator[RenameOperation]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"CompactOperations({len(self)} operations)"
+
+    _ROW_COLUMNS = ("_old_dir", "_new_dir", "_slot", "_category", "_flags")
+
+    def _subset(self, rows: Iterable[int]) -> "CompactOperations":
+        """Copy of the selected operations (in the given order)."""
+        rows = list(rows)
+        sub = CompactOperations()
+        sub._dirs = list(self._dirs)
+        sub._dir_ids = dict(self._dir_ids)
+        sub._categories = list(self._categories)
+        sub._category_ids = dict(self._category_ids)
+        for name in ("_old_dir", "_new_dir", "_category", "_flags"):
+            column = getattr(self, name)
+            setattr(sub, name, array(column.typecode, [column[r] for r in rows]))
+
+        # Only the names of the selected rows; a slot's old and new name
+        # are adjacent in the blob, so each row is one slice
+        names, ends, slot = self._names, self._name_ends, self._slot
+        sub_names, sub_ends = sub._names, sub._name_ends
+        for r in rows:
+            k = 2 * slot[r]
+            start, middle, stop = ends[k - 1] if k else 0, ends[k], ends[k + 1]
+            sub_names += names[start:stop]
+            sub_ends.append(len(sub_names) - (stop - middle))
+            sub_ends.append(len(sub_names))
+        sub._slot = array("I", range(len(rows)))
+        return sub
+
+    def sort(self, key=None, reverse: bool = False) -> None:
+        if key is None:
+            raise TypeError("CompactOperations.sort() requires a key")
+        keys = [key(op) for op in self]
+        perm = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        for name in self._ROW_COLUMNS:
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[p] for p in perm]))
+
+
 @dataclass
 class RenamePlan:
     operations: List[RenameOperation]
     conflicts: List[str]
     skipped: List[str]
+    # Bulk skip reasons → file count (e.g. {"no_match": 1200} in regex mode)
+    skipped_counts: Dict[str, int] = field(default_factory=dict)
+    # Name comparison policy the plan was built under (see collisions.NamePolicy)
+    name_policy: str = "exact"
+
+    def __post_init__(self):
+        # Plain lists are stored column-wise; lazy sequences (e.g. memory-
+        # mapped plans from planio) are kept as they are.
+        if isinstance(self.operations, list):
+            self.operations = CompactOperations(self.operations)
 
 
 # ---------------------------------------------------------
-# Helper: find files for a single category
+# Counter order
 # ---------------------------------------------------------
-def _find_category_files(folder: Path, category_key: str, recursive: bool) -> List[Path]:
-    log.debug(f"[SCAN] Category={category_key} | recursive={recursive}")
+# CategoryConfig.order: which file gets which number within a category
+ORDER_NAME = "name"
+ORDER_MTIME = "mtime"
+ORDER_SIZE = "size"
+ORDER_CTIME = "ctime"        # creation time where the OS records it, else ctime
+ORDER_CAPTURED = "captured"  # EXIF capture date, else mtime
+NUMBER_ORDERS = (ORDER_NAME, ORDER_MTIME, ORDER_SIZE, ORDER_CTIME, ORDER_CAPTURED)
 
-    exts = CATEGORY_MAP.get(category_key, [])
-    exts = [e.lower() for e in exts]
 
-    matched: List[Path] = []
+def _creation_key(st: os.stat_result):
+    birth = getattr(st, "st_birthtime_ns", None)
+    if birth is None:
+        birth = getattr(st, "st_birthtime", None)
+    return birth if birth is not None else st.st_ctime_ns
 
-    if recursive:
-        for path in sorted(folder.rglob("*")):
-            if path.is_file() and path.suffix.lower() in exts:
-                matched.append(path)
+
+_STAT_KEYS = {
+    ORDER_MTIME: lambda st: st.st_mtime_ns,
+    ORDER_SIZE: lambda st: st.st_size,
+    ORDER_CTIME: _creation_key,
+}
+
+
+def _order_files(
+    files: List[Path], order: str, stats: Dict[Path, os.stat_result], fs: FileSystem
+) -> List[Path]:
+    """
+    Reorder path-sorted files by a stat or metadata key. Keys come from
+    the stats the scan already gathered (fs.stat only for a file the scan
+    could not stat). sorted() is stable, so equal keys keep path order.
+    """
+    if order == ORDER_NAME or len(files) < 2:
+        return files
+    if order not in NUMBER_ORDERS:
+        raise ValueError(f"Unknown number order '{order}' (expected one of {', '.join(NUMBER_ORDERS)})")
+
+    sts = []
+    for f in files:
+        st = stats.get(f)
+        if st is None:
+            try:
+                st = fs.stat(f)
+            except OSError:
+                pass
+        sts.append(st)
+
+    if order == ORDER_CAPTURED:
+        from metadata import capture_times
+        keys = capture_times(files, sts)
     else:
-        for path in sorted(folder.iterdir()):
-            if path.is_file() and path.suffix.lower() in exts:
-                matched.append(path)
+        key = _STAT_KEYS[order]
+        keys = [key(st) if st is not None else 0 for st in sts]
+
+    perm = sorted(range(len(files)), key=keys.__getitem__)
+    return [files[i] for i in perm]
+
+
+# ---------------------------------------------------------
+# Renumbering strategy
+# ---------------------------------------------------------
+# CategoryConfig.renumber: what happens to files that already carry a number
+RENUMBER_SHIFT = "shift"    # every file gets start + its position (default)
+RENUMBER_FILL = "fill"      # correctly numbered files stay; the rest fill the gaps
+RENUMBER_APPEND = "append"  # correctly numbered files stay; the rest follow the highest
+RENUMBER_STRATEGIES = (RENUMBER_SHIFT, RENUMBER_FILL, RENUMBER_APPEND)
 
-    log.debug(f"[SCAN] Found {len(matched)} files for category '{category_key}'")
-    return matched
+
+def _minimal_numbers(files: List[Path], cfg: CategoryConfig, strategy: str) -> Tuple[List[int], int]:
+    """
+    Numbers for ordered files that keep every correctly named file as it
+    is: a file whose stem is already prefix + formatted number + suffix
+    (number >= start, each number claimed once) keeps its number, so its
+    rename becomes a no-op. The other files take the free numbers in
+    order, lowest gaps first (fill) or after the highest kept number
+    (append).
+
+    Returns (numbers, avoided), avoided being how many kept files the
+    shift strategy would have renamed.
+    """
+    if strategy not in RENUMBER_STRATEGIES:
+        raise ValueError(f"Unknown renumber strategy '{strategy}' (expected one of {', '.join(RENUMBER_STRATEGIES)})")
+
+    start, padding = cfg.start, cfg.padding
+    prefix, suffix = cfg.prefix, cfg.suffix
+    fixed = len(prefix) + len(suffix)
+    split_name = get_registry().split
+
+    numbers: List[int | None] = [None] * len(files)
+    taken = set()
+    for k, f in enumerate(files):
+        stem = split_name(f.name)[0]
+        if len(stem) <= fixed or not (stem.startswith(prefix) and stem.endswith(suffix)):
+            continue
+        digits = stem[len(prefix):len(stem) - len(suffix)]
+        if not (digits.isascii() and digits.isdigit()):
+            continue
+        n = int(digits)
+        # "7" under padding 3 is not correctly numbered: it becomes "007"
+        if n < start or n in taken or digits != (f"{n:0{padding}d}" if padding > 0 else str(n)):
+            continue
+        numbers[k] = n
+        taken.add(n)
+
+    avoided = sum(1 for k, n in enumerate(numbers) if n is not None and n != start + k)
+
+    candidate = start if strategy == RENUMBER_FILL else max(taken, default=start - 1) + 1
+    for k, n in enumerate(numbers):
+        if n is None:
+            while candidate in taken:
+                candidate += 1
+            numbers[k] = candidate
+            candidate += 1
+    return numbers, avoided
 
 
 # ---------------------------------------------------------
-# Build plan for a single category
+# Helper: walk a folder through the filesystem backend
 # ---------------------------------------------------------
-def _build_single_category_plan(
+def _walk_files(fs: FileSystem, folder: Path, recursive: bool) -> List[Path]:
+    """
+    Return all files under folder, sorted by path.
+    Symlinked directories are not descended into (matches Path.rglob).
+    """
+    return walk(fs, folder, recursive).files
+
+
+# ---------------------------------------------------------
+# Helper: classify files for the wanted categories in one scan
+# ---------------------------------------------------------
+def _scan_categories(
     folder: Path,
-    category_key: str,
-    cfg: Dict,
+    categories: List[str],
     recursive: bool,
-    selected_files: List[str] | None = None,
-) -> RenamePlan:
+    fs: FileSystem | None = None,
+    occupied: List[Path] | None = None,
+    scan_filter: ScanFilter | None = None,
+    skipped_counts: Dict[str, int] | None = None,
+    stats: Dict[Path, os.stat_result] | None = None,
+    dirs: Dict[Path, int] | None = None,
+) -> Dict[str, List[Path]]:
+    """
+    Bucket the scanned files by category. Every name the scan found is
+    added to occupied (when given), every kept file's stat from the walk
+    to stats, and every scanned folder's mtime to dirs.
+    """
+    log.debug(f"[SCAN] Categories={categories} | recursive={recursive}")
+
+    classify = get_registry().classify
+    matched: Dict[str, List[Path]] = {key: [] for key in categories}
+
+    with metrics.PHASE_SECONDS.time(phase="scan"):
+        scan = walk(fs or get_filesystem(), folder, recursive, scan_filter, with_stats=stats is not None)
+    metrics.FILES_SCANNED.inc(len(scan.files))
+    if stats is not None:
+        stats.update(scan.stats)
+    if dirs is not None:
+        dirs.update(scan.dirs)
+    if occupied is not None:
+        # Filtered-out files and second names of one file still occupy names
+        occupied.extend(scan.filtered)
+        occupied.extend(scan.files)
+    if skipped_counts is not None and scan.duplicates:
+        skipped_counts["duplicate"] = skipped_counts.get("duplicate", 0) + len(scan.duplicates)
+    if skipped_counts is not None and scan.unreadable_dirs:
+        skipped_counts["unreadable_dir"] = skipped_counts.get("unreadable_dir", 0) + len(scan.unreadable_dirs)
+
+    for path in scan.files:
+        bucket = matched.get(classify(path.name))
+        if bucket is not None:
+            bucket.append(path)
+
+    for key, files in matched.items():
+        log.debug(f"[SCAN] Found {len(files)} files for category '{key}'")
+    return matched
 
-    conflicts: List[str] = []
-    skipped: List[str] = []
-    ops: List[RenameOperation] = []
-
-    files = _find_category_files(folder, category_key, recursive)
-    log.debug(f"[PLAN] Building plan for category='{category_key}' | files={len(files)}")
-
-    if not files:
-        return RenamePlan([], [f"No '{category_key}' files found."], [])
-
-    # If selective renaming is enabled, filter files
-    if selected_files:
-        files = [f for f in files if f.name in selected_files]
-
-    counter = cfg["start"]
-    new_path_counts: Dict[Path, int] = {}
-
-    for file_path in files:
-        base_name = file_path.stem
-        ext = file_path.suffix
-
-        # Build new base name
-        if cfg["mode"] == "advanced" and cfg["advanced"]:
-            new_base = build_name_advanced(
-                pattern=cfg["advanced"],
-                original_name=base_name,
-                index=counter,
-                padding=cfg["padding"],
-                prefix=cfg["prefix"],
-                suffix=cfg["suffix"],
-                category=category_key,
-                folder=str(file_path.parent),
-            )
-        else:
-            new_base = build_name_normal(
-                original_name=base_name,
-                index=counter,
-                padding=cfg["padding"],
-                prefix=cfg["prefix"],
-                suffix=cfg["suffix"],
-                category=category_key,
-                folder=str(file_path.parent),
-            )
 
-        new_path = file_path.parent / (new_base + ext)
+# ---------------------------------------------------------
+# Name rendering for one category
+# ---------------------------------------------------------
+class _SampleValue:
+    """Stands in for a plugin placeholder's value in a trial render: accepts any spec, attribute or index."""
+
+    def __format__(self, spec: str) -> str:
+        return "x"
 
-        # Skip pure no-op renames
-        old_norm = str(file_path).lower()
-        new_norm = str(new_path).lower()
+    def __getattr__(self, name: str) -> "_SampleValue":
+        return self
+
+    def __getitem__(self, key) -> "_SampleValue":
+        return self
 
-        if old_norm == new_norm:
-            skipped.append(f"No-op (unchanged): {file_path.name}")
-            log.debug(f"[PLAN] Skipped no-op: {file_path.name}")
-        else:
-            ops.append(RenameOperation(file_path, new_path, category_key))
-            new_path_counts[new_path] = new_path_counts.get(new_path, 0) + 1
-            log.debug(f"[PLAN] New name: {file_path.name} → {new_path.name}")
 
-        counter += 1
+class _CategoryNamer:
+    """
+    Renders new file names for one category. The file at position k of
+    the category gets number cfg.start + k (or numbers[k] when a
+    renumber strategy assigned them), so any slice of the category can
+    be rendered on its own.
+    """
 
-    # Internal conflicts (same category)
-    for target, count in new_path_counts.items():
-        if count > 1:
-            conflicts.append(
-                f"Internal conflict in '{category_key}': {count} files want '{target.name}'"
+    def __init__(self, category_key: str, cfg: CategoryConfig, registry: PlaceholderRegistry | None = None):
+        self.category = category_key
+        self.cfg = cfg
+        self.rule = None
+        # Plugin placeholders the advanced pattern uses (values come from a PlaceholderBatch)
+        self.plugins: List[str] = []
+        # Per-file numbers from _minimal_numbers; None = positional
+        self.numbers: List[int] | None = None
+        if cfg.mode == MODE_ADVANCED and cfg.advanced:
+            # Unknown placeholders fail here rather than on every file
+            fields = placeholder_fields(cfg.advanced) - BUILTIN_PLACEHOLDERS
+            registry = registry or get_placeholder_registry()
+            unknown = sorted(f for f in fields if registry.get(f) is None)
+            if unknown:
+                raise ValueError("Unknown placeholder " + ", ".join(f"{{{f}}}" for f in unknown))
+            self.plugins = sorted(fields)
+            # Trial render with sample values: bad format specs, conversions
+            # and indexing ("{num:abc}", "{original!z}", "{original[5]}")
+            # fail here too, instead of when a name is first shown
+            sample = _SampleValue()
+            try:
+                build_name_advanced(
+                    pattern=cfg.advanced,
+                    original_name="test",
+                    index=1,
+                    padding=cfg.padding,
+                    prefix=cfg.prefix,
+                    suffix=cfg.suffix,
+                    category=category_key,
+                    folder="/test",
+                    extra={name: sample for name in self.plugins},
+                )
+            except (ValueError, IndexError, KeyError, AttributeError, TypeError) as e:
+                raise ValueError(f"Invalid format string: {e}")
+        elif cfg.mode == MODE_REGEX:
+            # Compiled once; raises ValueError for an invalid pattern
+            self.rule = compile_regex_rule(
+                pattern=cfg.regex_pattern,
+                replacement=cfg.regex_replace,
+                ignore_case=cfg.regex_ignore_case,
+                case=cfg.regex_case,
             )
-            log.debug(f"[PLAN] Internal conflict: {count} files want '{target.name}'")
 
-    return RenamePlan(ops, conflicts, skipped)
+    def render(self, files: List[Path], first: int, extras: Dict[str, List] | None = None) -> List[str | None]:
+        """
+        New names for files, the first of which sits at position first in
+        the category. extras holds each plugin placeholder's values,
+        aligned with files. None where a regex did not match or a plugin
+        had no value (file left alone).
+        """
+        cfg = self.cfg
+        split_name = get_registry().split
+        names = [split_name(f.name) for f in files]
+
+        if self.rule is not None:
+            stems, _ = build_names_regex(self.rule, [stem for stem, _ in names])
+            return [None if stem is None else stem + ext for stem, (_, ext) in zip(stems, names)]
+
+        advanced = cfg.mode == MODE_ADVANCED and cfg.advanced
+        numbers = self.numbers
+        counter = cfg.start + first
+        rendered: List[str | None] = []
+        for k, (file_path, (base_name, ext)) in enumerate(zip(files, names)):
+            if numbers is not None:
+                counter = numbers[first + k]
+            if advanced:
+                extra = {name: values[k] for name, values in extras.items()} if extras else None
+                if extra and any(value is None for value in extra.values()):
+                    rendered.append(None)
+                    counter += 1
+                    continue
+                new_base = build_name_advanced(
+                    pattern=cfg.advanced,
+                    original_name=base_name,
+                    index=counter,
+                    padding=cfg.padding,
+                    prefix=cfg.prefix,
+                    suffix=cfg.suffix,
+                    category=self.category,
+                    folder=str(file_path.parent),
+                    extra=extra,
+                )
+            else:
+                new_base = build_name_normal(
+                    original_name=base_name,
+                    index=counter,
+                    padding=cfg.padding,
+                    prefix=cfg.prefix,
+                    suffix=cfg.suffix,
+                    category=self.category,
+                    folder=str(file_path.parent),
+                )
+            rendered.append(new_base + ext)
+            counter += 1
+        return rendered
+
+
+# Placeholder for a draft row whose name has not been rendered yet
+_UNRENDERED = object()
+# Rows rendered together when one is asked for (a screenful or so)
+_RENDER_BLOCK = 64
+
+
+class PlanDraft:
+    """
+    First phase of a plan: the folder is scanned and the files classified,
+    filtered and numbered, but new names are only rendered when asked for
+    (new_name), so a preview can show its first rows straight away.
+
+    finish_plan() renders the rest and runs the collision checks. Its
+    operations keep the draft's row order, minus rows that turn out to be
+    no-ops or regex non-matches.
+    """
+
+    def __init__(self, folder: Path, policy: NamePolicy | None, placeholders: PlaceholderBatch | None = None):
+        self.folder = folder
+        self.policy = policy
+        self.paths: List[Path] = []
+        # Plugin placeholder values, one provider call per plan
+        self.placeholders = placeholders
+        # Every name the scan found (kept or not); occupied for the collision index
+        self.occupied: List[Path] = []
+        # Category-level problems (no files, invalid regex or order), reported as conflicts
+        self.messages: List[str] = []
+        self.skipped_counts: Dict[str, int] = {}
+        self._namers: List[_CategoryNamer] = []
+        self._starts: List[int] = []
+        # Seconds spent drafting; finish_plan reports draft + finish as the plan phase
+        self.elapsed = 0.0
+        # mtime_ns of every scanned folder: the folder snapshot the plan was built from
+        self.snapshot: Dict[Path, int] = {}
+        # Wall clock (ns) when the scan started; see PlanCache.record
+        self.scanned_at = 0
+        # Folder the renamed files go to (subfolders mirrored); None = in place
+        self.destination: Path | None = None
+        self._names: list = []
+
+    def _add_category(self, namer: _CategoryNamer, files: List[Path]) -> None:
+        start = len(self.paths)
+        for name in namer.plugins:
+            self.placeholders.require(name, start, start + len(files))
+        self._starts.append(start)
+        self._namers.append(namer)
+        self.paths.extend(files)
+        self._names.extend([_UNRENDERED] * len(files))
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def names_pending(self) -> bool:
+        """
+        True while a costly plugin placeholder has not run; new_name would
+        block on it. finish_plan runs it in the worker pool.
+        """
+        return self.placeholders is not None and self.placeholders.pending
+
+    def spans(self) -> Iterator[Tuple[str, int, int]]:
+        """(category, first row, end row) for each category, in row order."""
+        ends = self._starts[1:] + [len(self.paths)]
+        for namer, start, end in zip(self._namers, self._starts, ends):
+            yield namer.category, start, end
+
+    def _span_of(self, i: int) -> int:
+        return bisect_right(self._starts, i) - 1
+
+    def category(self, i: int) -> str:
+        return self._namers[self._span_of(i)].category
+
+    def old_path(self, i: int) -> Path:
+        return self.paths[i]
+
+    def target_dir(self, path: Path) -> Path:
+        """Folder a file's new name goes to."""
+        if self.destination is None:
+            return path.parent
+        return self.destination / path.parent.relative_to(self.folder)
+
+    def new_name(self, i: int) -> str | None:
+        """New name of row i, rendered on first use (None: regex did not match)."""
+        name = self._names[i]
+        if name is _UNRENDERED:
+            block = i - i % _RENDER_BLOCK
+            self.render_range(block, block + _RENDER_BLOCK)
+            name = self._names[i]
+        return name
+
+    def render_range(self, start: int, stop: int) -> None:
+        """
+        Render rows start..stop-1. Safe to call from a worker while the GUI
+        renders visible rows: both write the same names.
+        """
+        stop = min(stop, len(self.paths))
+        while start < stop:
+            span = self._span_of(start)
+            span_start = self._starts[span]
+            span_end = self._starts[span + 1] if span + 1 < len(self._starts) else len(self.paths)
+            end = min(stop, span_end)
+            namer = self._namers[span]
+            extras = {name: self.placeholders.values(name)[start:end] for name in namer.plugins}
+            self._names[start:end] = namer.render(self.paths[start:end], start - span_start, extras)
+            start = end
+
+
+def _flag_conflicts(ops: CompactOperations, index: CollisionIndex) -> None:
+    """Mark operations whose target is one of the index's conflicting names."""
+    bad = index.conflict_keys
+    if not bad:
+        return
+    key = index.policy.key
+    for i in range(len(ops)):
+        if key(str(ops.new_path(i))) in bad:
+            ops.set_flag(i, FLAG_CONFLICT)
 
 
 # ---------------------------------------------------------
 # Build a unified multi-category plan
 # ---------------------------------------------------------
-def build_multi_plan(
+def draft_plan(
     folder: str,
-    config: Dict,
+    config: RenameConfig | Dict,
     recursive: bool,
     selected_files: List[str] | None = None,
-) -> RenamePlan:
+    fs: FileSystem | None = None,
+    name_policy: str | None = None,
+    scan_filter: ScanFilter | None = None,
+    destination: str | None = None,
+) -> PlanDraft:
+    """
+    Scan once and number the files of all enabled categories, without
+    rendering names (see PlanDraft). Arguments as for build_multi_plan.
+    """
 
     log.info(f"[PLAN] Building multi-category plan | folder={folder} | recursive={recursive}")
 
+    started = time.perf_counter()
+    config = RenameConfig.coerce(config)
+    fs = fs or get_filesystem()
     base_folder = Path(folder)
-    if not base_folder.is_dir():
-        return RenamePlan([], [f"Folder does not exist: {folder}"], [])
+    if not fs.is_dir(base_folder):
+        draft = PlanDraft(base_folder, None)
+        draft.messages.append(f"Folder does not exist: {folder}")
+        return draft
 
-    all_ops: List[RenameOperation] = []
-    all_conflicts: List[str] = []
-    all_skipped: List[str] = []
+    enabled = []
+    for category_key, cfg in config.items():
+        # Log category state BEFORE skipping
+        log.debug(f"[PLAN] Category '{category_key}' enabled={cfg.enabled}")
+        if cfg.enabled:
+            enabled.append(category_key)
+
+    # One normalized-key policy for the whole plan
+    draft = PlanDraft(base_folder, resolve_policy(base_folder, fs, name_policy))
+    draft.scanned_at = time.time_ns()
+    draft.destination = Path(destination) if destination else None
+    registry = get_placeholder_registry()
 
     # -----------------------------------------------------
-    # Per-category processing
+    # Single scan, bucketed by category
     # -----------------------------------------------------
-    for category_key, cfg in config.items():
+    # Stats are kept from the walk only if some category numbers by them
+    wants_stats = any(config[key].order != ORDER_NAME for key in enabled)
+    stats: Dict[Path, os.stat_result] | None = {} if wants_stats else None
+    scanned = _scan_categories(
+        base_folder, enabled, recursive, fs, draft.occupied, scan_filter, draft.skipped_counts, stats,
+        draft.snapshot,
+    )
 
-        # Log category state BEFORE skipping
-        log.debug(f"[PLAN] Category '{category_key}' enabled={cfg.get('enabled')}")
+    # -----------------------------------------------------
+    # Per-category filtering and numbering order
+    # -----------------------------------------------------
+    wanted = set(selected_files) if selected_files else None
+    for category_key in enabled:
+        cfg = config[category_key]
+        files = scanned[category_key]
+        if not files:
+            draft.messages.append(f"No '{category_key}' files found.")
+            continue
 
-        if not cfg.get("enabled", False):
+        try:
+            namer = _CategoryNamer(category_key, cfg, registry)
+        except ValueError as e:
+            what = "regex" if cfg.mode == MODE_REGEX else "pattern"
+            log.error(f"[PLAN] Invalid {what} for '{category_key}': {e}")
+            draft.messages.append(f"Invalid {what} for '{category_key}': {e}")
+            continue
+        try:
+            files = _order_files(files, cfg.order, stats or {}, fs)
+            strategy = cfg.renumber
+            if strategy != RENUMBER_SHIFT:
+                # Names are only parsed back into numbers in normal mode
+                if cfg.mode == MODE_NORMAL:
+                    namer.numbers, avoided = _minimal_numbers(files, cfg, strategy)
+                    draft.skipped_counts["renumber_avoided"] = (
+                        draft.skipped_counts.get("renumber_avoided", 0) + avoided
+                    )
+                    log.info(f"[PLAN] Renumber '{strategy}' for '{category_key}' | renames avoided={avoided}")
+                else:
+                    log.debug(f"[PLAN] Renumber '{strategy}' ignored for '{category_key}' (mode={cfg.mode})")
+        except ValueError as e:
+            log.error(f"[PLAN] {e}")
+            draft.messages.append(f"Invalid settings for '{category_key}': {e}")
             continue
 
-        subplan = _build_single_category_plan(
-            base_folder, category_key, cfg, recursive, selected_files
-        )
+        # Selective renaming: numbered above over the whole category, so the
+        # selected files get the numbers the full preview showed and files
+        # left out still hold theirs
+        if wanted is not None:
+            keep = [k for k, f in enumerate(files) if f.name in wanted]
+            if namer.numbers is None:
+                namer.numbers = [cfg.start + k for k in keep]
+            else:
+                namer.numbers = [namer.numbers[k] for k in keep]
+            files = [files[k] for k in keep]
 
-        # Log subplan details
-        log.debug(
-            f"[PLAN] Subplan for '{category_key}': "
-            f"ops={len(subplan.operations)} "
-            f"conflicts={len(subplan.conflicts)} "
-            f"skipped={len(subplan.skipped)}"
-        )
+        log.debug(f"[PLAN] Drafted category='{category_key}' | files={len(files)}")
+        if files:
+            if namer.plugins and draft.placeholders is None:
+                draft.placeholders = PlaceholderBatch(draft.paths, registry, fs.stat, stats)
+            draft._add_category(namer, files)
+
+    draft.elapsed = time.perf_counter() - started
+    return draft
 
-        all_ops.extend(subplan.operations)
-        all_conflicts.extend(subplan.conflicts)
-        all_skipped.extend(subplan.skipped)
+
+def finish_plan(draft: PlanDraft) -> RenamePlan:
+    """
+    Second planning phase: render every new name of the draft, skip
+    no-ops, and check targets against each other and every scanned name.
+    """
+    started = time.perf_counter()
+    if draft.policy is None:
+        metrics.PLAN_CONFLICTS.inc(len(draft.messages))
+        metrics.PHASE_SECONDS.observe(draft.elapsed, phase="plan")
+        return RenamePlan([], list(draft.messages), [])
+
+    index = CollisionIndex(draft.policy)
+    for path in draft.occupied:
+        index.add_existing(path)
+    if draft.placeholders is not None:
+        # Every provider once, for all its rows, costly ones in parallel
+        draft.placeholders.prefetch()
+    draft.render_range(0, len(draft))
+
+    ops = CompactOperations()
+    skipped_counts = dict(draft.skipped_counts)
+    paths, names = draft.paths, draft._names
+    split_name = get_registry().split
+    rejected: List[str] = []
+
+    for category_key, start, end in draft.spans():
+        no_match = 0
+        before = len(ops)
+        for i in range(start, end):
+            file_path = paths[i]
+            name = names[i]
+            if name is None:
+                no_match += 1
+                continue
+            # Only a name starting with the extension's dot, or holding a
+            # separator, can be unusable: skip the split for the rest
+            if name[:1] in ("", ".") or any(sep in name for sep in NAME_SEPARATORS):
+                problem = invalid_name(name, split_name(file_path.name)[1])
+                if problem:
+                    rejected.append(f"New name '{name}' for '{file_path.name}' {problem}")
+                    continue
+            new_path = draft.target_dir(file_path) / name
+
+            # Skip pure no-op renames (case-only renames are kept)
+            if index.is_noop(file_path, new_path):
+                skipped_counts["unchanged"] = skipped_counts.get("unchanged", 0) + 1
+                log.debug(f"[PLAN] Skipped no-op: {file_path.name}")
+            else:
+                ops.add(file_path, new_path, category_key)
+                index.add_rename(file_path, new_path, category_key)
+                log.debug(f"[PLAN] New name: {file_path.name} → {new_path.name}")
+
+        if no_match:
+            skipped_counts["no_match"] = skipped_counts.get("no_match", 0) + no_match
+            log.debug(f"[PLAN] No new name for {no_match} file(s) in '{category_key}'")
+        log.debug(f"[PLAN] Category '{category_key}': ops={len(ops) - before}")
 
     # -----------------------------------------------------
-    # Cross-category conflict detection
+    # Internal, cross-category and existing-file conflicts
     # -----------------------------------------------------
-    target_counts: Dict[Path, int] = {}
-    for op in all_ops:
-        target_counts[op.new_path] = target_counts.get(op.new_path, 0) + 1
-
-    for target, count in target_counts.items():
-        if count > 1:
-            log.error(f"[PLAN] Cross-category conflict: {count} files want '{target.name}'")
-            all_conflicts.append(
-                f"Cross-category conflict: {count} files want '{target.name}'"
-            )
+    conflicts = list(draft.messages)
+    if draft.placeholders is not None:
+        conflicts.extend(draft.placeholders.errors)
+    for msg in rejected:
+        log.error(f"[PLAN] {msg}")
+        conflicts.append(msg)
+    for msg in index.conflicts():
+        log.error(f"[PLAN] {msg}")
+        conflicts.append(msg)
+    _flag_conflicts(ops, index)
+
+    metrics.OPERATIONS_PLANNED.inc(len(ops))
+    metrics.PLAN_CONFLICTS.inc(len(conflicts))
+    metrics.PHASE_SECONDS.observe(draft.elapsed + time.perf_counter() - started, phase="plan")
+    return RenamePlan(ops, conflicts, [], skipped_counts, index.policy.name)
+
+
+def build_multi_plan(
+    folder: str,
+    config: RenameConfig | Dict,
+    recursive: bool,
+    selected_files: List[str] | None = None,
+    fs: FileSystem | None = None,
+    name_policy: str | None = None,
+    scan_filter: ScanFilter | None = None,
+    cache: "PlanCache | None" = None,
+    destination: str | None = None,
+) -> RenamePlan:
+    """
+    Plan all enabled categories from a single scan.
+    name_policy: "exact", "casefold", "nfc", "casefold+nfc" or None/"auto"
+    to detect how the filesystem under folder compares names.
+    scan_filter: include/exclude globs, depth, hidden-dir and size/mtime
+    rules applied while walking (see scanner.ScanFilter).
+    selected_files: names of the files to rename; numbers are still
+    assigned over the whole category, as in the plan without them.
+    destination: move the renamed files into this folder instead,
+    mirroring the subfolders of folder (targets on another device are
+    moved by execute_plan with a copy, fsync and unlink).
+
+    Same as finish_plan(draft_plan(...)); previews that want rows before
+    every name is rendered call the two phases separately.
+
+    cache: a PlanCache; a plan built earlier from the same folder state
+    and settings is returned as is (shared, so treat it as read-only).
+    """
+    config = RenameConfig.coerce(config)
+    key = version = None
+    if cache is not None and destination is None and PlanCache.cacheable(config, scan_filter):
+        key = PlanCache.scan_key(folder, recursive, selected_files, name_policy, scan_filter)
+        version = cache.version(key, fs)
+        plan = cache.get(version, config) if version is not None else None
+        if plan is not None:
+            log.info(f"[PLAN] Reusing cached plan | folder={folder} | snapshot={version}")
+            return plan
+
+    draft = draft_plan(folder, config, recursive, selected_files, fs, name_policy, scan_filter, destination)
+    plan = finish_plan(draft)
+    if key is not None:
+        version = cache.record(key, draft)
+        if version is not None:
+            cache.put(version, config, plan)
+    return plan
 
-    return RenamePlan(all_ops, all_conflicts, all_skipped)
+
+# ---------------------------------------------------------
+# Plan cache
+# ---------------------------------------------------------
+# Folder mtimes this close to the scan may still move without changing
+# (coarse timestamps: 2 s on FAT, 1 s on some network shares)
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+class PlanCache:
+    """
+    Finished plans (or any value derived from one) by (snapshot version,
+    config), least recently used dropped first, so switching back to
+    earlier settings shows the earlier plan without a rescan.
+
+    A snapshot version names one state of a scanned tree: the mtime of
+    every folder the scan listed. Adding, removing or renaming a file
+    moves its folder's mtime, which retires the version and everything
+    cached under it. Changes that leave folder mtimes alone (a file's
+    own size or time) are not seen, so settings that read them are never
+    cached; see cacheable().
+    """
+
+    def __init__(self, max_plans: int = 32, max_snapshots: int = 8):
+        self.max_plans = max_plans
+        self.max_snapshots = max_snapshots
+        self._plans: OrderedDict = OrderedDict()
+        # scan key → (version, {folder: mtime_ns})
+        self._snapshots: OrderedDict = OrderedDict()
+        self._next_version = 1
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def scan_key(
+        folder: str,
+        recursive: bool,
+        selected_files: List[str] | None = None,
+        name_policy: str | None = None,
+        scan_filter: ScanFilter | None = None,
+    ) -> tuple:
+        """Everything besides the config that decides what a scan sees."""
+        selected = tuple(sorted(selected_files)) if selected_files else None
+        return (str(Path(folder)), bool(recursive), selected, name_policy or "auto", scan_filter or NO_FILTER)
+
+    @staticmethod
+    def cacheable(config: RenameConfig | Dict, scan_filter: ScanFilter | None = None) -> bool:
+        """
+        False when the plan depends on more than folder contents: numbering
+        by file time or size, plugin placeholders, or size/mtime filters.
+        """
+        if scan_filter is not None and scan_filter.needs_stat:
+            return False
+        for _, cfg in RenameConfig.coerce(config).items():
+            if not cfg.enabled:
+                continue
+            if cfg.order != ORDER_NAME:
+                return False
+            if cfg.mode == MODE_ADVANCED and placeholder_fields(cfg.advanced) - BUILTIN_PLACEHOLDERS:
+                return False
+        return True
+
+    def version(self, scan_key: tuple, fs: FileSystem | None = None) -> int | None:
+        """
+        Snapshot version of the last scan recorded for scan_key, if every
+        folder it listed is unchanged (one stat per folder); else None.
+        """
+        with self._lock:
+            entry = self._snapshots.get(scan_key)
+        if entry is None:
+            return None
+        version, dirs = entry
+        fs = fs or get_filesystem()
+        for folder, recorded in dirs.items():
+            try:
+                if mtime_ns(fs.stat(folder)) != recorded:
+                    break
+            except OSError:
+                break
+        else:
+            return version
+        log.debug(f"[PLAN] Folder snapshot {version} is out of date")
+        with self._lock:
+            if self._snapshots.get(scan_key) is entry:
+                del self._snapshots[scan_key]
+        return None
+
+    def record(self, scan_key: tuple, draft: PlanDraft) -> int | None:
+        """
+        Version for the folder state the draft was scanned from: the
+        current one if nothing changed since, else a new one. None if a
+        folder changed too close to the scan for its mtime to be trusted.
+        """
+        dirs = draft.snapshot
+        if not dirs or max(dirs.values()) >= draft.scanned_at - _RACY_WINDOW_NS:
+            return None
+        with self._lock:
+            entry = self._snapshots.get(scan_key)
+            if entry is None or entry[1] != dirs:
+                entry = (self._next_version, dict(dirs))
+                self._next_version += 1
+                self._snapshots[scan_key] = entry
+            self._snapshots.move_to_end(scan_key)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return entry[0]
+
+    def get(self, version: int, config: RenameConfig):
+        with self._lock:
+            value = self._plans.get((version, config))
+            if value is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end((version, config))
+            self.hits += 1
+            return value
+
+    def put(self, version: int, config: RenameConfig, value) -> None:
+        with self._lock:
+            self._plans[(version, config)] = value
+            self._plans.move_to_end((version, config))
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self._snapshots.clear()
 
 
 # ---------------------------------------------------------
 # Validate plan against filesystem
 # ---------------------------------------------------------
-def validate_plan(plan: RenamePlan) -> Tuple[bool, List[str]]:
-    errors: List[str] = []
+def validate_plan(
+    plan: RenamePlan, fs: FileSystem | None = None, workers: int = 1
+) -> Tuple[bool, List[str]]:
+    """
+    Check the plan against the filesystem.
+    workers > 1 runs the existence checks concurrently, which pays off
+    on high-latency storage (network shares).
+    """
     log.debug(f"[VALIDATE] Validating plan with {len(plan.operations)} operations")
 
     if not plan.operations:
+        metrics.VALIDATION_ERRORS.inc()
         return False, ["No rename operations in plan."]
 
-    old_paths = {op.old_path for op in plan.operations}
+    with metrics.PHASE_SECONDS.time(phase="validate"):
+        ok, errors = _validate_operations(plan, fs, workers)
+    metrics.VALIDATION_ERRORS.inc(len(errors))
+    return ok, errors
 
-    for op in plan.operations:
-        if op.new_path.exists() and op.new_path not in old_paths:
-            log.error(f"[VALIDATE] Target exists: {op.new_path}")
-            errors.append(f"Target already exists: {op.new_path}")
+
+def _validate_operations(
+    plan: RenamePlan, fs: FileSystem | None, workers: int
+) -> Tuple[bool, List[str]]:
+    errors: List[str] = []
+
+    fs = fs or get_filesystem()
+    # A target that names one of the sources (including case-only renames
+    # on case-insensitive filesystems) is freed by the plan itself.
+    key = NamePolicy.parse(plan.name_policy).key
+    old_keys = {key(str(op.old_path)) for op in plan.operations}
+    indexed_targets = [
+        (i, op.new_path) for i, op in enumerate(plan.operations)
+        if key(str(op.new_path)) not in old_keys
+    ]
+    targets = [t for _, t in indexed_targets]
+
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            exists = list(pool.map(fs.exists, targets, chunksize=64))
+    else:
+        exists = [fs.exists(t) for t in targets]
+
+    flag_ops = plan.operations if isinstance(plan.operations, CompactOperations) else None
+    if flag_ops is not None:
+        flag_ops.clear_flag(FLAG_EXISTS)
+
+    for (i, target), found in zip(indexed_targets, exists):
+        if found:
+            log.error(f"[VALIDATE] Target exists: {target}")
+            errors.append(f"Target already exists: {target}")
+            if flag_ops is not None:
+                flag_ops.set_flag(i, FLAG_EXISTS)
 
     # Log conflicts explicitly
     for conflict in plan.conflicts:
         log.error(f"[VALIDATE] Conflict: {conflict}")
 
-    errors.extend(plan.conflicts)
+    # Plan-time conflicts may repeat a filesystem error found above
+    seen = set(errors)
+    errors.extend(c for c in plan.conflicts if c not in seen)
 
     return (len(errors) == 0), errors
 
 
+# ---------------------------------------------------------
+# Progress and cancellation
+# ---------------------------------------------------------
+# Progress callbacks fire once per this many renames (and once at the end)
+PROGRESS_BATCH = 256
+
+
+@dataclass
+class RenameProgress:
+    """Snapshot passed to progress callbacks of execute_plan / undo_last_rename."""
+    done: int
+    total: int
+    failures: int
+    elapsed: float
+    cancelled: bool = False
+    finished: bool = False
+
+    @property
+    def rate(self) -> float:
+        """Renames per second so far."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """Estimated seconds remaining, or None before the first batch."""
+        rate = self.rate
+        if rate <= 0:
+            return None
+        return (self.total - self.done) / rate
+
+
+ProgressCallback = Callable[[RenameProgress], None]
+
+
+def _select_operations(operations, rows: Iterable[int]):
+    if isinstance(operations, CompactOperations):
+        return operations._subset(rows)
+    return [operations[i] for i in rows]
+
+
+def _phase_progress(
+    progress: ProgressCallback | None,
+    total: int,
+    done: int = 0,
+    failures: int = 0,
+    elapsed: float = 0.0,
+    last: bool = True,
+) -> ProgressCallback | None:
+    """Wrap progress so one phase of a multi-phase run reports overall numbers."""
+    if progress is None:
+        return None
+
+    def report(p: RenameProgress) -> None:
+        progress(RenameProgress(
+            p.done + done, total, p.failures + failures, p.elapsed + elapsed,
+            cancelled=p.cancelled, finished=p.finished and (last or p.cancelled),
+        ))
+
+    return report
+
+
+def _run_renames(
+    fs: FileSystem,
+    operations,
+    tag: str,
+    progress: ProgressCallback | None,
+    cancel: threading.Event | None,
+    batch: int,
+) -> Tuple[List[int], List[str], int]:
+    """
+    Rename every operation in order, stopping between two renames when
+    cancel is set. Returns (done, failures, attempted): the rows that were
+    renamed and the number of operations processed before stopping.
+    """
+    total = len(operations)
+    done: List[int] = []
+    failures: List[str] = []
+    t0 = time.perf_counter()
+    attempted = 0
+
+    def report(finished: bool = False, cancelled: bool = False):
+        if progress is not None:
+            progress(RenameProgress(
+                len(done), total, len(failures), time.perf_counter() - t0,
+                cancelled=cancelled, finished=finished,
+            ))
+
+    for attempted, op in enumerate(operations):
+        if cancel is not None and cancel.is_set():
+            log.info(f"[{tag}] Cancelled | done={attempted}/{total}")
+            report(finished=True, cancelled=True)
+            return done, failures, attempted
+        try:
+            fs.rename(op.old_path, op.new_path)
+            done.append(attempted)
+            log.debug(f"[{tag}] {op.old_path} → {op.new_path}")
+        except OSError as e:
+            msg = f"Failed: {op.old_path} → {op.new_path}: {e}"
+            failures.append(msg)
+            log.error(f"[{tag}] {msg}")
+        if (attempted + 1) % batch == 0:
+            report()
+
+    report(finished=True)
+    return done, failures, total
+
+
+def _run_parallel(
+    operations,
+    fn: Callable,
+    workers: int,
+    tag: str,
+    progress: ProgressCallback | None,
+    cancel: threading.Event | None,
+    batch: int,
+) -> Tuple[List[int], List[str], Dict[str, int], int]:
+    """
+    Apply fn(op) → method name to every operation on a thread pool with a
+    bounded number of operations in flight. Cancel stops submitting; work
+    already submitted finishes. Returns (done rows, failures, method
+    counts, submitted), where the first `submitted` operations were processed.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    total = len(operations)
+    done: List[int] = []
+    processed = 0
+    failures: List[str] = []
+    methods: Dict[str, int] = {}
+    t0 = time.perf_counter()
+    limit = max(1, workers) * 4
+    in_flight: Dict = {}
+    cancelled = False
+
+    def report(finished: bool = False):
+        if progress is not None:
+            progress(RenameProgress(
+                len(done), total, len(failures), time.perf_counter() - t0,
+                cancelled=cancelled, finished=finished,
+            ))
+
+    def collect(finished_futures):
+        nonlocal processed
+        for fut in finished_futures:
+            i, op = in_flight.pop(fut)
+            try:
+                method = fut.result()
+            except OSError as e:
+                msg = f"Failed: {op.old_path} → {op.new_path}: {e}"
+                failures.append(msg)
+                log.error(f"[{tag}] {msg}")
+            else:
+                done.append(i)
+                methods[method] = methods.get(method, 0) + 1
+            processed += 1
+            if processed % batch == 0:
+                report()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for i, op in enumerate(operations):
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                log.info(f"[{tag}] Cancelled | submitted={processed + len(in_flight)}/{total}")
+                break
+            if len(in_flight) >= limit:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+            in_flight[pool.submit(fn, op)] = (i, op)
+        collect(wait(in_flight).done)
+
+    report(finished=True)
+    return done, failures, methods, processed
+
+
+# ---------------------------------------------------------
+# Cross-device operations
+# ---------------------------------------------------------
+def _make_target_dirs(fs: FileSystem, operations) -> None:
+    """Create missing target folders of a plan into another folder (see build_multi_plan destination)."""
+    if isinstance(operations, CompactOperations):
+        if operations._old_dir == operations._new_dir:
+            return
+        folders = {operations._dirs[d] for d in set(operations._new_dir)}
+        folders -= {operations._dirs[d] for d in set(operations._old_dir)}
+    else:
+        folders = {op.new_path.parent for op in operations} - {op.old_path.parent for op in operations}
+    for folder in sorted(folders):
+        try:
+            if not fs.is_dir(folder):
+                fs.makedirs(folder)
+                log.info(f"[EXECUTE] Created target folder {folder}")
+        except OSError as e:
+            # Its renames fail one by one and are reported as failures
+            log.error(f"[EXECUTE] Cannot create target folder {folder}: {e}")
+
+
+def _split_cross_device(fs: FileSystem, operations) -> Tuple[List[int], List[int]]:
+    """
+    Rows that can be renamed in place and rows whose target folder is on
+    another device (where rename() fails with EXDEV). One stat per folder.
+    """
+    if isinstance(operations, CompactOperations) and operations._old_dir == operations._new_dir:
+        return list(range(len(operations))), []
+
+    devices: Dict[Path, int | None] = {}
+
+    def device(folder: Path) -> int | None:
+        if folder not in devices:
+            try:
+                devices[folder] = fs.stat(folder).st_dev
+            except OSError:
+                devices[folder] = None
+        return devices[folder]
+
+    local: List[int] = []
+    cross: List[int] = []
+    for i, op in enumerate(operations):
+        src_dir, dst_dir = op.old_path.parent, op.new_path.parent
+        if src_dir != dst_dir:
+            a, b = device(src_dir), device(dst_dir)
+            if a is not None and b is not None and a != b:
+                cross.append(i)
+                continue
+        local.append(i)
+    return local, cross
+
+
+def _apply_operations(
+    fs: FileSystem,
+    operations,
+    tag: str,
+    progress: ProgressCallback | None,
+    cancel: threading.Event | None,
+    batch: int,
+    workers: int,
+    verify: bool,
+) -> Tuple[List[int], List[str], List[int]]:
+    """
+    Rename operations in order. Operations that cross devices are moved
+    afterwards through the crossmove pipeline (kernel copy, optional
+    checksum verify, fsync, unlink) on `workers` threads (in order when
+    they form a chain), journaled so an interrupted run can be resumed
+    with crossmove.resume_moves().
+    Returns (done rows, failures, processed rows); done rows are the ones
+    that were renamed or moved.
+    """
+    local, cross = _split_cross_device(fs, operations)
+    if not cross:
+        done, failures, attempted = _run_renames(fs, operations, tag, progress, cancel, batch)
+        return done, failures, list(range(attempted))
+
+    from crossmove import MoveJournal, move_file
+
+    total = len(operations)
+    log.info(f"[{tag}] Cross-device operations | count={len(cross)} workers={workers} verify={verify}")
+    t0 = time.perf_counter()
+
+    done, failures, attempted = _run_renames(
+        fs, _select_operations(operations, local), tag,
+        _phase_progress(progress, total, last=False), cancel, batch,
+    )
+    done = [local[i] for i in done]
+    processed = local[:attempted]
+    if attempted < len(local):
+        return done, failures, processed
+
+    journal = MoveJournal()
+    moves = _select_operations(operations, cross)
+    # A move onto a name another move still has to free (an ordered undo
+    # chain) must wait for it: keep the given order, one file at a time
+    sources = {op.old_path for op in moves}
+    if workers > 1 and any(op.new_path in sources for op in moves):
+        log.info(f"[{tag}] Cross-device moves are chained; moving in order")
+        workers = 1
+
+    def move(op):
+        method = move_file(op.old_path, op.new_path, verify=verify, journal=journal)
+        log.debug(f"[{tag}] {op.old_path} → {op.new_path} (moved, {method})")
+        return method
+
+    moved, move_failures, methods, submitted = _run_parallel(
+        moves, move, workers, tag,
+        _phase_progress(progress, total, len(done), len(failures), time.perf_counter() - t0),
+        cancel, batch,
+    )
+    # Failed moves are rolled back in-process, except a failed source
+    # unlink; keep the journal so resume_moves() can finish those.
+    if move_failures:
+        journal.close()
+    else:
+        journal.clear()
+    log.info(f"[{tag}] Cross-device moves | moved={len(moved)} failures={len(move_failures)} methods={methods}")
+
+    done.extend(cross[i] for i in moved)
+    processed.extend(cross[:submitted])
+    return done, failures + move_failures, processed
+
+
 # ---------------------------------------------------------
 # Execute plan
 # ---------------------------------------------------------
-def execute_plan(plan: RenamePlan) -> Tuple[int, List[str]]:
+def execute_plan(
+    plan: RenamePlan,
+    fs: FileSystem | None = None,
+    progress: ProgressCallback | None = None,
+    cancel: threading.Event | None = None,
+    batch: int = PROGRESS_BATCH,
+    workers: int = 4,
+    verify: bool = False,
+) -> Tuple[int, List[str]]:
     """
     Execute the rename plan.
     - Performs all renames in order
     - Returns (count, failures)
-    - Pushes the plan onto the undo stack ONLY if all renames succeed
+    - Pushes the plan onto the undo stack when every rename succeeded;
+      otherwise the renames that were done (before a failure or a cancel)
+      are pushed as their own plan, so they can still be undone
+    - progress(RenameProgress) is called every `batch` renames and at the end
+    - Setting `cancel` stops before the next rename
+    - Targets on another device are moved (copy, fsync, unlink) on
+      `workers` threads after the in-place renames; verify=True compares
+      checksums before each source is removed
     """
-    import os
     global _undo_stack
 
+    fs = fs or get_filesystem()
+
     # Stable ordering
     plan.operations.sort(key=lambda op: op.old_path.name.lower())
+    _make_target_dirs(fs, plan.operations)
     log.info(f"[EXECUTE] Starting rename | operations={len(plan.operations)}")
 
-    renamed_count = 0
-    failures: List[str] = []
-
-    for op in plan.operations:
-        try:
-            os.rename(op.old_path, op.new_path)
-            renamed_count += 1
-            log.debug(f"[EXECUTE] {op.old_path} → {op.new_path}")
-        except OSError as e:
-            msg = f"Failed: {op.old_path} → {op.new_path}: {e}"
-            failures.append(msg)
-            log.error(f"[EXECUTE] {msg}")
+    with metrics.PHASE_SECONDS.time(phase="execute"):
+        done, failures, processed = _apply_operations(
+            fs, plan.operations, "EXECUTE", progress, cancel, batch, workers, verify
+        )
+    renamed_count = len(done)
+    metrics.FILES_RENAMED.inc(renamed_count, phase="execute")
+    metrics.RENAME_FAILURES.inc(len(failures), phase="execute")
 
     _log(f"Renamed {renamed_count}/{len(plan.operations)} files.")
 
-    # Only push to undo stack if everything succeeded
+    # Whatever moved must be undoable: the whole plan, or only the rows done
     if renamed_count == len(plan.operations):
         _undo_stack.append(plan)
         log.debug(f"[EXECUTE] Undo stack size after push: {len(_undo_stack)}")
-    else:
-        _log("Not pushing to undo stack due to failures.")
+    elif done:
+        _undo_stack.append(RenamePlan(
+            operations=_select_operations(plan.operations, sorted(done)),
+            conflicts=[],
+            skipped=[],
+            name_policy=plan.name_policy,
+        ))
+        log.debug(f"[EXECUTE] Pushed partial plan | operations={len(done)} undo_stack={len(_undo_stack)}")
 
     log.info(f"[EXECUTE] Completed | renamed={renamed_count} | failures={len(failures)}")
     return renamed_count, failures
@@ -276,14 +1477,24 @@ def execute_plan(plan: RenamePlan) -> Tuple[int, List[str]]:
 # ---------------------------------------------------------
 # Undo last successful rename (multi-level undo)
 # ---------------------------------------------------------
-def undo_last_rename() -> Tuple[int, List[str]]:
+def undo_last_rename(
+    fs: FileSystem | None = None,
+    progress: ProgressCallback | None = None,
+    cancel: threading.Event | None = None,
+    batch: int = PROGRESS_BATCH,
+    workers: int = 4,
+    verify: bool = False,
+) -> Tuple[int, List[str]]:
     """
     Undo the last rename operation if possible.
     Supports multi-level undo via the undo stack.
+    progress / cancel behave as in execute_plan; a cancelled undo puts the
+    operations it did not reach back onto the undo stack.
     """
-    import os
     global _undo_stack
 
+    fs = fs or get_filesystem()
+
     if not _undo_stack:
         return 0, ["No undo available."]
 
@@ -308,10 +1519,11 @@ def undo_last_rename() -> Tuple[int, List[str]]:
         operations=reversed_ops,
         conflicts=[],
         skipped=[],
+        name_policy=last_plan.name_policy,
     )
 
     # Validate undo plan
-    ok, errors = validate_plan(undo_plan)
+    ok, errors = validate_plan(undo_plan, fs)
 
     if not ok:
         _log("Undo validation failed:")
@@ -321,20 +1533,311 @@ def undo_last_rename() -> Tuple[int, List[str]]:
         return 0, errors
 
     # Execute undo
-    renamed_count = 0
-    failures: List[str] = []
-
-    for op in undo_plan.operations:
-        try:
-            os.rename(op.old_path, op.new_path)
-            renamed_count += 1
-        except OSError as e:
-            msg = f"Failed: {op.old_path} → {op.new_path}: {e}"
-            _log(f"Undo failed: {msg}")
-            log.error(f"[UNDO] {msg}")
-            failures.append(msg)
+    with metrics.PHASE_SECONDS.time(phase="undo"):
+        done, failures, _ = _apply_operations(
+            fs, undo_plan.operations, "UNDO", progress, cancel, batch, workers, verify
+        )
+    renamed_count = len(done)
+    metrics.FILES_RENAMED.inc(renamed_count, phase="undo")
+    metrics.RENAME_FAILURES.inc(len(failures), phase="undo")
+
+    if renamed_count < len(undo_plan.operations):
+        # Not reached or failed: those files still carry the new names
+        done = set(done)
+        remaining = [i for i in range(len(undo_plan.operations)) if i not in done]
+        _undo_stack.append(RenamePlan(
+            operations=_select_operations(last_plan.operations, remaining),
+            conflicts=[],
+            skipped=[],
+            name_policy=last_plan.name_policy,
+        ))
+        log.debug(f"[UNDO] Re-pushed remaining operations | operations={len(remaining)}")
 
     _log(f"Undo restored {renamed_count}/{len(undo_plan.operations)} files.")
     log.info(f"[UNDO] Restored {renamed_count}/{len(undo_plan.operations)} files")
 
     return renamed_count, failures
+
+
+# ---------------------------------------------------------
+# Undo several levels at once
+# ---------------------------------------------------------
+def compose_undo(plans: List[RenamePlan]) -> List[RenameOperation]:
+    """
+    Net renames that undo plans (oldest first, as on the undo stack):
+    each file goes straight from its current name to its name before the
+    first plan. Files renamed back and forth are dropped, so a file
+    renamed a → b → c → d yields one operation d → a.
+
+    Each plan counts as one simultaneous mapping, so chains within a plan
+    (b → c and a → b) compose correctly whatever their execution order.
+    """
+    # current path → path before the first plan (and its category)
+    origin: Dict[Path, Tuple[Path, str]] = {}
+    for plan in plans:
+        moved = [
+            (op.new_path, origin.pop(op.old_path, (op.old_path, op.category)))
+            for op in plan.operations
+        ]
+        origin.update(moved)
+
+    return [
+        RenameOperation(old_path=current, new_path=original, category=category)
+        for current, (original, category) in origin.items()
+        if current != original
+    ]
+
+
+def _order_renames(
+    operations: List[RenameOperation], key: Callable[[str], str], fs: FileSystem
+) -> Tuple[List[RenameOperation], int]:
+    """
+    Order a set of renames so no rename lands on a name another one still
+    has to move away from: every chain starts at its free end, and every
+    cycle (a → b → a, including case-only renames on case-insensitive
+    filesystems) goes through a temporary name in the same folder.
+    Returns (ordered operations, cycles broken).
+    """
+    by_source = {key(str(op.old_path)): op for op in operations}
+    # source key of the operation whose target is this source
+    feeds = {key(str(op.new_path)): src for src, op in by_source.items()}
+
+    ordered: List[RenameOperation] = []
+    done = set()
+
+    def unwind(src: str | None) -> None:
+        while src is not None and src not in done:
+            done.add(src)
+            ordered.append(by_source[src])
+            src = feeds.get(src)
+
+    # Chains: start with the operations whose target nothing else occupies
+    for src, op in by_source.items():
+        if key(str(op.new_path)) not in by_source:
+            unwind(src)
+
+    # What is left are cycles
+    cycles = 0
+    for src, op in by_source.items():
+        if src in done:
+            continue
+        cycles += 1
+        n = 0
+        while True:
+            temp = op.old_path.with_name(f".{op.old_path.name}.fnundo-{os.getpid()}-{n}")
+            if not fs.exists(temp):
+                break
+            n += 1
+        ordered.append(RenameOperation(op.old_path, temp, op.category))
+        done.add(src)
+        unwind(feeds.get(src))
+        ordered.append(RenameOperation(temp, op.new_path, op.category))
+    return ordered, cycles
+
+
+def _rename_landed(fs: FileSystem, old: Path, new: Path) -> bool:
+    """
+    Whether old now lives at new. A case-only rename on a case-insensitive
+    filesystem leaves both spellings "existing" as the same file; the
+    folder listings tell which spelling is on disk.
+    """
+    try:
+        if not fs.exists(new):
+            return False
+        if not fs.exists(old):
+            return True
+        a = fs.stat(old, follow_symlinks=False)
+        b = fs.stat(new, follow_symlinks=False)
+        if (a.st_dev, a.st_ino) != (b.st_dev, b.st_ino):
+            return False
+        return (
+            new.name in {e.name for e in fs.scandir(new.parent)}
+            and old.name not in {e.name for e in fs.scandir(old.parent)}
+        )
+    except OSError:
+        return False
+
+
+def undo_to(
+    level: int,
+    fs: FileSystem | None = None,
+    progress: ProgressCallback | None = None,
+    cancel: threading.Event | None = None,
+    batch: int = PROGRESS_BATCH,
+    workers: int = 4,
+    verify: bool = False,
+) -> Tuple[int, List[str]]:
+    """
+    Undo every level above `level` (0 = everything) as one composed set of
+    renames: one validation and one rename per file that actually has to
+    move, instead of one full undo per level.
+
+    Levels are dropped from the undo stack only if everything succeeded.
+    Otherwise the renames that were done are pushed as a new level, so
+    undo_to(level) again finishes the job and undo_last_rename() reverts
+    the partial undo.
+    """
+    global _undo_stack
+
+    fs = fs or get_filesystem()
+
+    if not 0 <= level < len(_undo_stack):
+        return 0, [f"No undo level {level} (stack has {len(_undo_stack)})."]
+
+    plans = _undo_stack[level:]
+    log.info(f"[UNDO] Undo to level {level} | levels={len(plans)}")
+    operations = compose_undo(plans)
+    levels_ops = sum(len(p.operations) for p in plans)
+    if not operations:
+        del _undo_stack[level:]
+        log.info(f"[UNDO] Levels cancel out | operations avoided={levels_ops}")
+        return 0, []
+
+    name_policy = plans[-1].name_policy
+    ordered, cycles = _order_renames(operations, NamePolicy.parse(name_policy).key, fs)
+
+    # Moves across devices run after the in-place renames, which would break
+    # the chain order; undo such stacks level by level instead
+    local, cross = _split_cross_device(fs, ordered)
+    if cross and local:
+        log.info("[UNDO] Composed undo mixes devices; undoing level by level")
+        restored, failures = 0, []
+        while len(_undo_stack) > level and not failures and not (cancel is not None and cancel.is_set()):
+            count, failures = undo_last_rename(fs, progress, cancel, batch, workers, verify)
+            restored += count
+        return restored, failures
+
+    undo_plan = RenamePlan(operations=operations, conflicts=[], skipped=[], name_policy=name_policy)
+    ok, errors = validate_plan(undo_plan, fs)
+    if not ok:
+        for err in errors:
+            log.error(f"[UNDO] Validation failed: {err}")
+        return 0, errors
+
+    log.info(
+        f"[UNDO] Composed | operations={len(operations)} cycles={cycles} "
+        f"(level by level: {levels_ops})"
+    )
+    with metrics.PHASE_SECONDS.time(phase="undo"):
+        done, failures, processed = _apply_operations(
+            fs, ordered, "UNDO", progress, cancel, batch, workers, verify
+        )
+    renamed_count = len(done)
+    metrics.FILES_RENAMED.inc(renamed_count, phase="undo")
+    metrics.RENAME_FAILURES.inc(len(failures), phase="undo")
+
+    if not failures and len(processed) == len(ordered):
+        del _undo_stack[level:]
+    else:
+        # Record what moved as its own level, with the hops through temporary
+        # names folded into net renames (a failed rename left its source in place)
+        steps = [RenamePlan(operations=[ordered[i]], conflicts=[], skipped=[]) for i in sorted(processed)]
+        landed = [
+            RenameOperation(old_path=op.new_path, new_path=op.old_path, category=op.category)
+            for op in compose_undo(steps)
+            if _rename_landed(fs, op.new_path, op.old_path)
+        ]
+        if landed:
+            _undo_stack.append(RenamePlan(operations=landed, conflicts=[], skipped=[], name_policy=name_policy))
+        log.debug(f"[UNDO] Pushed partial composed undo | operations={len(landed)}")
+
+    log.info(f"[UNDO] Restored {renamed_count}/{len(ordered)} renames")
+    return renamed_count, failures
+
+
+# ---------------------------------------------------------
+# Export renamed copies (originals untouched)
+# ---------------------------------------------------------
+def _common_root(operations) -> Path:
+    if isinstance(operations, CompactOperations):
+        parents = {operations._dirs[d] for d in set(operations._old_dir)}
+    else:
+        parents = {op.old_path.parent for op in operations}
+    return Path(os.path.commonpath([str(p) for p in parents]))
+
+
+def plan_roots(plans: Iterable[RenamePlan]) -> List[Path]:
+    """
+    Folders to lock (see locks.lock_trees) before running the plans: the
+    common folder of their sources and that of their targets, which only
+    differ for moves to another device.
+    """
+    sources, targets = set(), set()
+    for plan in plans:
+        ops = plan.operations
+        if not len(ops):
+            continue
+        if isinstance(ops, CompactOperations):
+            sources.update(ops._dirs[d] for d in set(ops._old_dir))
+            targets.update(ops._dirs[d] for d in set(ops._new_dir))
+        else:
+            sources.update(op.old_path.parent for op in ops)
+            targets.update(op.new_path.parent for op in ops)
+    roots = []
+    for parents in (sources, targets):
+        if parents:
+            try:
+                roots.append(Path(os.path.commonpath([str(p) for p in parents])))
+            except ValueError:
+                # Different drives: every folder on its own
+                roots.extend(parents)
+    return roots
+
+
+def export_copies(
+    plan: RenamePlan,
+    target: str | Path,
+    source_root: str | Path | None = None,
+    allow_hardlink: bool = True,
+    workers: int = 8,
+    fs: FileSystem | None = None,
+    progress: ProgressCallback | None = None,
+    cancel: threading.Event | None = None,
+    batch: int = PROGRESS_BATCH,
+) -> Tuple[int, List[str], Dict[str, int]]:
+    """
+    Materialize the renamed set under target instead of renaming in place.
+    Each new path is placed at the same position relative to source_root
+    (default: the deepest folder containing every source).
+
+    Files are hardlinked where possible (allow_hardlink=False keeps the
+    copies independent of the originals), otherwise reflinked or copied
+    in the kernel; see fastcopy. Existing files in target are never
+    overwritten. Nothing is pushed onto the undo stack.
+
+    Returns (count, failures, method → file count).
+    """
+    fs = fs or get_filesystem()
+    target = Path(target)
+
+    if not plan.operations:
+        return 0, [], {}
+
+    root = Path(source_root) if source_root is not None else _common_root(plan.operations)
+    log.info(
+        f"[EXPORT] Starting | operations={len(plan.operations)} root={root} target={target} "
+        f"hardlinks={allow_hardlink} workers={workers}"
+    )
+
+    destinations: Dict[Path, Path] = {}
+    for op in plan.operations:
+        try:
+            destinations[op.new_path] = target / op.new_path.relative_to(root)
+        except ValueError:
+            return 0, [f"{op.new_path} is outside the source folder {root}"], {}
+
+    for folder in sorted({d.parent for d in destinations.values()}):
+        fs.makedirs(folder)
+
+    def materialize(op):
+        dst = destinations[op.new_path]
+        method = fs.clone(op.old_path, dst, allow_hardlink)
+        log.debug(f"[EXPORT] {op.old_path} → {dst} ({method})")
+        return method
+
+    done, failures, methods, _ = _run_parallel(
+        plan.operations, materialize, workers, "EXPORT", progress, cancel, batch
+    )
+    count = len(done)
+    log.info(f"[EXPORT] Completed | exported={count} failures={len(failures)} methods={methods}")
+    return count, failures, methods
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import Set, Tuple
+
+from logger import setup_logger
+
+log = setup_logger().getChild("fastcopy")
+
+# Materialization methods, cheapest first
+METHOD_HARDLINK = "hardlink"
+METHOD_REFLINK = "reflink"
+METHOD_COPY_FILE_RANGE = "copy_file_range"
+METHOD_SENDFILE = "sendfile"
+METHOD_COPY = "copy"
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# errno values meaning "this method does not work here", as opposed to a
+# real failure of this particular file (missing source, existing target)
+_UNSUPPORTED = {
+    errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EINVAL, errno.ENOSYS,
+    errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY, errno.EBADF,
+}
+
+_CHUNK = 8 * 1024 * 1024
+
+# (method, source device, target device) pairs known not to work; checked
+# before trying so large batches do not repeat a failing syscall per file
+_unsupported: Set[Tuple[str, int, int]] = set()
+_unsupported_lock = threading.Lock()
+
+
+def _known_unsupported(method: str, devs: Tuple[int, int]) -> bool:
+    return (method, *devs) in _unsupported
+
+
+def _mark_unsupported(method: str, devs: Tuple[int, int], err: OSError) -> None:
+    with _unsupported_lock:
+        if (method, *devs) not in _unsupported:
+            _unsupported.add((method, *devs))
+            log.info(f"[COPY] {method} unavailable for devices {devs[0]}→{devs[1]}: {err}")
+
+
+class ShortCopyError(OSError):
+    """A kernel copy stopped before the end of the file (FUSE, virtual files, a shrinking source)."""
+
+    def __init__(self, method: str, copied: int, size: int):
+        super().__init__(errno.EIO, f"{method} stopped after {copied} of {size} bytes")
+
+
+def _reflink(src_fd: int, dst_fd: int) -> None:
+    import fcntl
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int) -> None:
+    offset = 0
+    while offset < size:
+        sent = os.copy_file_range(src_fd, dst_fd, min(_CHUNK, size - offset))
+        if sent == 0:
+            raise ShortCopyError(METHOD_COPY_FILE_RANGE, offset, size)
+        offset += sent
+
+
+def _sendfile(src_fd: int, dst_fd: int, size: int) -> None:
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, min(_CHUNK, size - offset))
+        if sent == 0:
+            raise ShortCopyError(METHOD_SENDFILE, offset, size)
+        offset += sent
+
+
+def _data_methods():
+    if sys.platform.startswith("linux"):
+        yield METHOD_REFLINK, lambda s, d, size: _reflink(s, d)
+    if hasattr(os, "copy_file_range"):
+        yield METHOD_COPY_FILE_RANGE, _copy_file_range
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        yield METHOD_SENDFILE, _sendfile
+
+
+def copy_data(src: Path, dst: Path, devs: Tuple[int, int] | None = None, fsync: bool = False) -> str:
+    """
+    Create dst (which must not exist) with the contents of src, letting the
+    kernel move the data: FICLONE reflink, then copy_file_range, then
+    sendfile, then a userspace copy. Timestamps and mode are copied.
+    Returns the method used.
+    """
+    with open(src, "rb") as fin:
+        st = os.fstat(fin.fileno())
+        devs = devs or (st.st_dev, st.st_dev)
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with open(fd, "wb", closefd=True) as fout:
+                used = None
+                for method, fn in _data_methods():
+                    if _known_unsupported(method, devs):
+                        continue
+                    try:
+                        fn(fin.fileno(), fout.fileno(), st.st_size)
+                        used = method
+                        break
+                    except ShortCopyError as e:
+                        # This file, not the devices: the next method gets a try
+                        log.info(f"[COPY] {e} for {src}; trying the next method")
+                    except OSError as e:
+                        if e.errno not in _UNSUPPORTED:
+                            raise
+                        _mark_unsupported(method, devs, e)
+                    # A partial kernel copy is discarded before the next try
+                    os.ftruncate(fout.fileno(), 0)
+                    os.lseek(fout.fileno(), 0, os.SEEK_SET)
+                    fin.seek(0)
+                if used is None:
+                    shutil.copyfileobj(fin, fout, _CHUNK)
+                    used = METHOD_COPY
+                fout.flush()
+                copied = os.fstat(fout.fileno()).st_size
+                if copied != st.st_size:
+                    # Never report a truncated copy as done: callers delete the source
+                    raise ShortCopyError(used, copied, st.st_size)
+                if fsync:
+                    os.fsync(fout.fileno())
+        except BaseException:
+            try:
+                os.unlink(dst)
+            except OSError:
+                pass
+            raise
+    shutil.copystat(src, dst)
+    return used
+
+
+def clone_file(src: Path, dst: Path, allow_hardlink: bool = True) -> str:
+    """
+    Materialize src at dst as cheaply as possible: a hardlink (same inode,
+    metadata only) when allowed, otherwise an independent copy via
+    copy_data(). Never overwrites dst. Returns the method used.
+    """
+    src_dev = os.stat(src).st_dev
+    dst_dev = os.stat(Path(dst).parent).st_dev
+    devs = (src_dev, dst_dev)
+
+    if allow_hardlink and src_dev == dst_dev and not _known_unsupported(METHOD_HARDLINK, devs):
+        try:
+            os.link(src, dst)
+            return METHOD_HARDLINK
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            _mark_unsupported(METHOD_HARDLINK, devs, e)
+
+    return copy_data(src, dst, devs)
@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import errno
+import os
+import random
+import stat as stat_mod
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Set
+
+from logger import setup_logger
+
+log = setup_logger().getChild("fs")
+
+
+# ---------------------------------------------------------
+# Backend interface
+# ---------------------------------------------------------
+class FileSystem(ABC):
+    """
+    Minimal filesystem surface used by the engine.
+
+    scandir() yields os.DirEntry-compatible objects (name, path,
+    is_dir(), is_file(), is_symlink(), stat(), inode()).
+    """
+
+    @abstractmethod
+    def scandir(self, path: Path) -> Iterator:
+        ...
+
+    @abstractmethod
+    def stat(self, path: Path, follow_symlinks: bool = True) -> os.stat_result:
+        ...
+
+    @abstractmethod
+    def is_dir(self, path: Path) -> bool:
+        ...
+
+    @abstractmethod
+    def exists(self, path: Path) -> bool:
+        ...
+
+    @abstractmethod
+    def rename(self, src: Path, dst: Path) -> None:
+        ...
+
+    @abstractmethod
+    def makedirs(self, path: Path) -> None:
+        ...
+
+    @abstractmethod
+    def clone(self, src: Path, dst: Path, allow_hardlink: bool = True) -> str:
+        """
+        Create dst with the contents of src (never overwriting dst) and
+        return the method used (see fastcopy).
+        """
+
+
+# ---------------------------------------------------------
+# Real filesystem
+# ---------------------------------------------------------
+class OsFileSystem(FileSystem):
+    def scandir(self, path: Path) -> Iterator[os.DirEntry]:
+        with os.scandir(path) as it:
+            yield from it
+
+    def stat(self, path: Path, follow_symlinks: bool = True) -> os.stat_result:
+        return os.stat(path, follow_symlinks=follow_symlinks)
+
+    def is_dir(self, path: Path) -> bool:
+        return os.path.isdir(path)
+
+    def exists(self, path: Path) -> bool:
+        return os.path.lexists(path)
+
+    def rename(self, src: Path, dst: Path) -> None:
+        os.rename(src, dst)
+
+    def makedirs(self, path: Path) -> None:
+        os.makedirs(path, exist_ok=True)
+
+    def clone(self, src: Path, dst: Path, allow_hardlink: bool = True) -> str:
+        from fastcopy import clone_file
+        return clone_file(src, dst, allow_hardlink)
+
+
+# ---------------------------------------------------------
+# In-memory fake
+# ---------------------------------------------------------
+class _MemoryNode:
+    __slots__ = ("is_dir", "size", "mtime", "ino")
+
+    def __init__(self, is_dir: bool, size: int, mtime: float, ino: int):
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+        self.ino = ino
+
+
+class MemoryDirEntry:
+    """os.DirEntry look-alike returned by MemoryFileSystem.scandir()."""
+
+    __slots__ = ("name", "path", "_node")
+
+    def __init__(self, parent: Path, name: str, node: _MemoryNode):
+        self.name = name
+        self.path = str(parent / name)
+        self._node = node
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self._node.is_dir
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return not self._node.is_dir
+
+    def is_symlink(self) -> bool:
+        return False
+
+    def inode(self) -> int:
+        return self._node.ino
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        return MemoryFileSystem._stat_of(self._node)
+
+
+class MemoryFileSystem(FileSystem):
+    """
+    Dictionary-backed filesystem for tests and benchmarks.
+    Paths are stored as given; no case folding is applied.
+    """
+
+    DEVICE = 0xF5
+
+    def __init__(self, files: Iterable[str | Path] = ()):
+        self._lock = threading.Lock()
+        self._children: Dict[Path, Dict[str, _MemoryNode]] = {}
+        # mtime of root folders, which have no parent entry to hold a node
+        self._root_mtimes: Dict[Path, float] = {}
+        self._next_ino = 1
+        for f in files:
+            self.add_file(f)
+
+    @staticmethod
+    def _stat_of(node: _MemoryNode) -> os.stat_result:
+        mode = (stat_mod.S_IFDIR | 0o755) if node.is_dir else (stat_mod.S_IFREG | 0o644)
+        mtime_ns = int(node.mtime * 1e9)
+        # The *_ns fields are only filled in when passed explicitly
+        return os.stat_result((
+            mode, node.ino, MemoryFileSystem.DEVICE, 1, 0, 0,
+            node.size, node.mtime, node.mtime, node.mtime,
+        ), {"st_atime_ns": mtime_ns, "st_mtime_ns": mtime_ns, "st_ctime_ns": mtime_ns})
+
+    def _new_node(self, is_dir: bool, size: int = 0, mtime: float | None = None) -> _MemoryNode:
+        node = _MemoryNode(is_dir, size, time.time() if mtime is None else mtime, self._next_ino)
+        self._next_ino += 1
+        return node
+
+    def _touch_locked(self, folder: Path) -> None:
+        # Like a real folder, its mtime moves whenever an entry is added or removed
+        node = self._lookup(folder)
+        if node is not None:
+            node.mtime = time.time()
+        else:
+            self._root_mtimes[folder] = time.time()
+
+    def mkdir(self, path: str | Path) -> None:
+        path = Path(path)
+        with self._lock:
+            self._mkdir_locked(path)
+
+    def _mkdir_locked(self, path: Path) -> None:
+        if path in self._children:
+            return
+        parent = path.parent
+        if parent != path:
+            self._mkdir_locked(parent)
+            self._children[parent][path.name] = self._new_node(True)
+            self._touch_locked(parent)
+        self._children[path] = {}
+
+    def add_file(self, path: str | Path, size: int = 0, mtime: float | None = None) -> None:
+        path = Path(path)
+        with self._lock:
+            self._mkdir_locked(path.parent)
+            self._children[path.parent][path.name] = self._new_node(False, size, mtime)
+            self._touch_locked(path.parent)
+
+    def files(self) -> List[Path]:
+        """All file paths currently stored, sorted."""
+        return sorted(
+            parent / name
+            for parent, entries in self._children.items()
+            for name, node in entries.items()
+            if not node.is_dir
+        )
+
+    def _lookup(self, path: Path) -> _MemoryNode | None:
+        entries = self._children.get(path.parent)
+        if entries is None:
+            return None
+        return entries.get(path.name)
+
+    def scandir(self, path: Path) -> Iterator[MemoryDirEntry]:
+        path = Path(path)
+        with self._lock:
+            entries = self._children.get(path)
+            if entries is None:
+                raise FileNotFoundError(errno.ENOENT, "No such directory", str(path))
+            snapshot = list(entries.items())
+        for name, node in snapshot:
+            yield MemoryDirEntry(path, name, node)
+
+    def stat(self, path: Path, follow_symlinks: bool = True) -> os.stat_result:
+        path = Path(path)
+        node = self._lookup(path)
+        if node is None and path in self._children:
+            # Filesystem root: has children but no parent entry
+            node = _MemoryNode(True, 0, self._root_mtimes.get(path, 0.0), 0)
+        if node is None:
+            raise FileNotFoundError(errno.ENOENT, "No such file", str(path))
+        return self._stat_of(node)
+
+    def is_dir(self, path: Path) -> bool:
+        return Path(path) in self._children
+
+    def exists(self, path: Path) -> bool:
+        path = Path(path)
+        return path in self._children or self._lookup(path) is not None
+
+    def rename(self, src: Path, dst: Path) -> None:
+        src, dst = Path(src), Path(dst)
+        with self._lock:
+            node = self._lookup(src)
+            if node is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file", str(src))
+            if dst.parent not in self._children:
+                raise FileNotFoundError(errno.ENOENT, "No such directory", str(dst.parent))
+            if node.is_dir:
+                raise IsADirectoryError(errno.EISDIR, "Directory renames not supported", str(src))
+            del self._children[src.parent][src.name]
+            self._children[dst.parent][dst.name] = node
+            self._touch_locked(src.parent)
+            self._touch_locked(dst.parent)
+
+    def makedirs(self, path: Path) -> None:
+        self.mkdir(path)
+
+    def clone(self, src: Path, dst: Path, allow_hardlink: bool = True) -> str:
+        src, dst = Path(src), Path(dst)
+        with self._lock:
+            node = self._lookup(src)
+            if node is None or node.is_dir:
+                raise FileNotFoundError(errno.ENOENT, "No such file", str(src))
+            if dst.parent not in self._children:
+                raise FileNotFoundError(errno.ENOENT, "No such directory", str(dst.parent))
+            if dst.name in self._children[dst.parent]:
+                raise FileExistsError(errno.EEXIST, "File exists", str(dst))
+            self._touch_locked(dst.parent)
+            if allow_hardlink:
+                self._children[dst.parent][dst.name] = node
+                return "hardlink"
+            self._children[dst.parent][dst.name] = self._new_node(False, node.size, node.mtime)
+            return "copy"
+
+
+# ---------------------------------------------------------
+# Latency / failure injection
+# ---------------------------------------------------------
+class LatencyFileSystem(FileSystem):
+    """
+    Wraps another backend and adds a fixed (plus optional random) delay
+    to every call. failure_rate injects EIO errors into the operations
+    listed in fail_ops, for exercising error paths.
+    """
+
+    def __init__(
+        self,
+        inner: FileSystem,
+        latency: float = 0.005,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        fail_ops: Set[str] | None = None,
+        seed: int | None = None,
+    ):
+        self.inner = inner
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.fail_ops = set(fail_ops) if fail_ops is not None else {"rename"}
+        self.calls: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self, op: str, target) -> None:
+        with self._lock:
+            self.calls[op] = self.calls.get(op, 0) + 1
+            extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+            fail = op in self.fail_ops and self._rng.random() < self.failure_rate
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+        if fail:
+            log.debug(f"[FS] Injected failure | op={op} path={target}")
+            raise OSError(errno.EIO, "Injected I/O error", str(target))
+
+    def scandir(self, path: Path) -> Iterator:
+        self._delay("scandir", path)
+        # One round trip per directory listing, as on a network share
+        return iter(list(self.inner.scandir(path)))
+
+    def stat(self, path: Path, follow_symlinks: bool = True) -> os.stat_result:
+        self._delay("stat", path)
+        return self.inner.stat(path, follow_symlinks)
+
+    def is_dir(self, path: Path) -> bool:
+        self._delay("is_dir", path)
+        return self.inner.is_dir(path)
+
+    def exists(self, path: Path) -> bool:
+        self._delay("exists", path)
+        return self.inner.exists(path)
+
+    def rename(self, src: Path, dst: Path) -> None:
+        self._delay("rename", src)
+        self.inner.rename(src, dst)
+
+    def makedirs(self, path: Path) -> None:
+        self._delay("makedirs", path)
+        self.inner.makedirs(path)
+
+    def clone(self, src: Path, dst: Path, allow_hardlink: bool = True) -> str:
+        self._delay("clone", src)
+        return self.inner.clone(src, dst, allow_hardlink)
+
+
+# ---------------------------------------------------------
+# Concurrency limit
+# ---------------------------------------------------------
+class ThrottledFileSystem(FileSystem):
+    """
+    Wraps another backend and lets at most `slots` calls run at once,
+    however many threads share it. Pass a threading semaphore to share
+    one limit between several wrappers.
+    """
+
+    def __init__(self, inner: FileSystem, slots: int | threading.Semaphore = 8):
+        self.inner = inner
+        self.slots = threading.BoundedSemaphore(slots) if isinstance(slots, int) else slots
+
+    def _enter(self, op: str) -> None:
+        if not self.slots.acquire(blocking=False):
+            log.debug(f"[FS] {op} waiting for a free slot")
+            self.slots.acquire()
+
+    def scandir(self, path: Path) -> Iterator:
+        self._enter("scandir")
+        try:
+            # Listed while holding the slot, not while the caller walks it
+            return iter(list(self.inner.scandir(path)))
+        finally:
+            self.slots.release()
+
+    def stat(self, path: Path, follow_symlinks: bool = True) -> os.stat_result:
+        self._enter("stat")
+        try:
+            return self.inner.stat(path, follow_symlinks)
+        finally:
+            self.slots.release()
+
+    def is_dir(self, path: Path) -> bool:
+        self._enter("is_dir")
+        try:
+            return self.inner.is_dir(path)
+        finally:
+            self.slots.release()
+
+    def exists(self, path: Path) -> bool:
+        self._enter("exists")
+        try:
+            return self.inner.exists(path)
+        finally:
+            self.slots.release()
+
+    def rename(self, src: Path, dst: Path) -> None:
+        self._enter("rename")
+        try:
+            self.inner.rename(src, dst)
+        finally:
+            self.slots.release()
+
+    def makedirs(self, path: Path) -> None:
+        self._enter("makedirs")
+        try:
+            self.inner.makedirs(path)
+        finally:
+            self.slots.release()
+
+    def clone(self, src: Path, dst: Path, allow_hardlink: bool = True) -> str:
+        self._enter("clone")
+        try:
+            return self.inner.clone(src, dst, allow_hardlink)
+        finally:
+            self.slots.release()
+
+
+# ---------------------------------------------------------
+# Default backend
+# ---------------------------------------------------------
+_default_fs: FileSystem = OsFileSystem()
+
+
+def get_filesystem() -> FileSystem:
+    return _default_fs
+
+
+def set_filesystem(fs: FileSystem) -> FileSystem:
+    """Replace the process-wide default backend. Returns the previous one."""
+    global _default_fs
+    previous, _default_fs = _default_fs, fs
+    return previous
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from logger import setup_logger
+from paths import state_dir
+
+log = setup_logger().getChild("locks")
+
+LOCK_SUFFIX = ".lock"
+# Guards the check-then-create step of every acquire
+_REGISTRY = ".registry"
+# msvcrt locks byte ranges that reads then cannot touch: lock one far past the data
+_WIN_LOCK_OFFSET = 1 << 30
+POLL_INTERVAL = 0.25
+
+_counter = itertools.count(1)
+
+
+def lock_dir() -> Path:
+    """
+    Folder holding the lock files. Processes only see each other's locks
+    through the same folder: point FRESHNAMER_LOCK_DIR at a shared,
+    group-writable folder when several users rename the same trees.
+    """
+    override = os.environ.get("FRESHNAMER_LOCK_DIR")
+    if override:
+        return Path(override)
+    return Path(state_dir()) / "locks"
+
+
+# ---------------------------------------------------------
+# OS file locks (released by the kernel when the holder dies)
+# ---------------------------------------------------------
+def lock_handle(fd: int, blocking: bool = True) -> None:
+    """Exclusive OS lock on an open file. BlockingIOError if held elsewhere and not blocking."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        return
+    os.lseek(fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            if not blocking:
+                raise BlockingIOError("File is locked by another process")
+            time.sleep(0.05)
+
+
+def unlock_handle(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return
+    os.lseek(fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _normalize(root: str | Path) -> str:
+    # One spelling per folder: symlinks resolved, case folded where the OS ignores case
+    return os.path.normcase(os.path.realpath(str(root)))
+
+
+def _overlaps(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    try:
+        return os.path.commonpath([a, b]) in (a, b)
+    except ValueError:
+        # Different drives
+        return False
+
+
+# ---------------------------------------------------------
+# Lock records
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class LockInfo:
+    """Who holds a folder, as written in its lock file."""
+    root: str
+    exclusive: bool
+    pid: int
+    host: str
+    purpose: str
+    since: float
+
+    def describe(self) -> str:
+        what = self.purpose or "another FreshNamer process"
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.since))
+        return f"{what} (pid {self.pid} on {self.host}, since {started})"
+
+
+class TreeLockedError(OSError):
+    """Raised when an overlapping folder is held by another process or job."""
+
+    def __init__(self, root: str, holder: LockInfo):
+        self.root = root
+        self.holder = holder
+        kind = "renaming files in" if holder.exclusive else "reading"
+        super().__init__(f"'{root}' is locked: {holder.describe()} is {kind} '{holder.root}'")
+
+
+def _read_info(path: Path) -> LockInfo | None:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return LockInfo(**json.load(fh))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _is_stale(path: Path) -> bool:
+    """True when nobody holds the file's OS lock: its process has exited."""
+    try:
+        # Read-only is enough to take the lock, and works on lock files
+        # this user may not write to
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        lock_handle(fd, blocking=False)
+    except OSError:
+        return False
+    else:
+        unlock_handle(fd)
+        return True
+    finally:
+        os.close(fd)
+
+
+def held_locks(directory: str | Path | None = None) -> List[LockInfo]:
+    """Live locks in the lock folder (stale ones are left for the next acquire to remove)."""
+    folder = Path(directory) if directory is not None else lock_dir()
+    result = []
+    for path in sorted(folder.glob("*" + LOCK_SUFFIX)):
+        info = _read_info(path)
+        if info is not None and not _is_stale(path):
+            result.append(info)
+    return result
+
+
+# ---------------------------------------------------------
+# Subtree lock
+# ---------------------------------------------------------
+class SubtreeLock:
+    """
+    Advisory lock on a folder and everything below it, shared between
+    processes through lock files (see lock_dir).
+
+    An exclusive lock (executing, undoing) excludes any other lock on
+    the same folder, an ancestor or a descendant; shared locks (planning,
+    reading) only exclude exclusive ones. Separate subtrees never block
+    each other.
+
+    Each lock file stays OS-locked by its process, so a crash leaves a
+    file whose lock is free: it is removed as stale by the next acquire.
+
+        with SubtreeLock(folder, purpose="cli apply").acquire(timeout=30):
+            execute_plan(plan)
+    """
+
+    def __init__(self, root: str | Path, exclusive: bool = True, purpose: str = "",
+                 directory: str | Path | None = None):
+        self.root = str(root)
+        self.exclusive = exclusive
+        self.purpose = purpose
+        self.directory = Path(directory) if directory is not None else lock_dir()
+        self._fd: int | None = None
+        self._path: Path | None = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, timeout: float | None = 0.0) -> "SubtreeLock":
+        """
+        Take the lock. timeout=0 fails at once with TreeLockedError when
+        an overlapping folder is held; a number of seconds waits that
+        long; None waits until the holders are done.
+        """
+        if self.held:
+            raise RuntimeError("Lock already held")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        normalized = _normalize(self.root)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        while True:
+            holder = self._try_acquire(normalized)
+            if holder is None:
+                if waited:
+                    log.info(f"[LOCK] Acquired after waiting | root={normalized}")
+                return self
+            if deadline is not None and time.monotonic() >= deadline:
+                log.info(f"[LOCK] Busy | root={normalized} holder={holder.root} pid={holder.pid}")
+                raise TreeLockedError(self.root, holder)
+            if not waited:
+                log.info(f"[LOCK] Waiting | root={normalized} holder={holder.root} pid={holder.pid}")
+                waited = True
+            pause = POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, max(0.0, deadline - time.monotonic()))
+            time.sleep(pause)
+
+    def _try_acquire(self, normalized: str) -> LockInfo | None:
+        """Create our lock file unless a live conflicting one exists; returns that holder."""
+        registry = os.open(self.directory / _REGISTRY, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            lock_handle(registry)
+            for path in self.directory.glob("*" + LOCK_SUFFIX):
+                info = _read_info(path)
+                if info is not None and not (
+                    (self.exclusive or info.exclusive) and _overlaps(normalized, info.root)
+                ):
+                    continue
+                if _is_stale(path):
+                    log.info(f"[LOCK] Removing stale lock {path.name}" + (f" | root={info.root}" if info else ""))
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                    continue
+                if info is not None:
+                    return info
+
+            info = LockInfo(normalized, self.exclusive, os.getpid(), socket.gethostname(), self.purpose, time.time())
+            path = self.directory / f"{os.getpid()}-{threading.get_ident()}-{next(_counter)}{LOCK_SUFFIX}"
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o666)
+            try:
+                lock_handle(fd)
+                os.write(fd, json.dumps(asdict(info)).encode("utf-8"))
+            except BaseException:
+                os.close(fd)
+                os.unlink(path)
+                raise
+            self._fd, self._path = fd, path
+            log.debug(f"[LOCK] Acquired | root={normalized} exclusive={self.exclusive} file={path.name}")
+            return None
+        finally:
+            os.close(registry)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fd, path = self._fd, self._path
+        self._fd = self._path = None
+        # Unlink first: once unlocked, another process could take the file for stale
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        unlock_handle(fd)
+        os.close(fd)
+        log.debug(f"[LOCK] Released | root={self.root}")
+
+    def __enter__(self) -> "SubtreeLock":
+        if not self.held:
+            self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+@contextmanager
+def lock_trees(
+    roots: Iterable[str | Path],
+    exclusive: bool = True,
+    purpose: str = "",
+    timeout: float | None = 0.0,
+) -> Iterator[List[SubtreeLock]]:
+    """
+    Hold SubtreeLocks on several folders (e.g. engine.plan_roots) for a
+    with-block. Folders inside another one of the set are covered by it;
+    the rest are taken in sorted order, so two waiting processes cannot
+    each hold what the other wants.
+    """
+    normalized = sorted({_normalize(r) for r in roots})
+    top = [r for r in normalized if not any(o != r and _overlaps(o, r) and len(o) < len(r) for o in normalized)]
+    held: List[SubtreeLock] = []
+    try:
+        for root in top:
+            held.append(SubtreeLock(root, exclusive, purpose).acquire(timeout))
+        yield held
+    finally:
+        for lock in reversed(held):
+            lock.release()
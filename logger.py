@@ -1,35 +1,74 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-def setup_logger():
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-
-    log_path = os.path.join(log_dir, "app.log")
+from paths import log_dir
 
-    logger = logging.getLogger("renamer")
-    logger.setLevel(logging.DEBUG)
+_listener = None
+_setup_thread = None
 
-    if logger.handlers:
-        return logger
 
-    # Rotating file: 5 MB per file, keep 5 backups
-    handler = RotatingFileHandler(
-        log_path, maxBytes=5_000_000, backupCount=5, encoding="utf-8"
-    )
+def _start_listener(log_queue):
+    """
+    Runs on a background thread so creating the log directory and
+    opening the log file never delay startup. Records logged before
+    the listener starts wait in the queue.
+    """
+    global _listener
 
     formatter = logging.Formatter(
         fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
+    handlers = []
 
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    # Rotating file: 5 MB per file, keep 5 backups
+    try:
+        directory = log_dir()
+        os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(
+            os.path.join(directory, "app.log"),
+            maxBytes=5_000_000, backupCount=5, encoding="utf-8", delay=True,
+        )
+        handler.setFormatter(formatter)
+        handlers.append(handler)
+    except OSError:
+        pass  # fall back to console only
 
     # Optional: also log to console during development
     console = logging.StreamHandler()
     console.setFormatter(formatter)
-    logger.addHandler(console)
+    handlers.append(console)
+
+    _listener = QueueListener(log_queue, *handlers)
+    _listener.start()
+
+
+def _flush_on_exit():
+    if _setup_thread is not None:
+        _setup_thread.join(timeout=2)
+    if _listener is not None:
+        _listener.stop()
+
+
+def setup_logger():
+    logger = logging.getLogger("renamer")
+    logger.setLevel(logging.DEBUG)
+
+    if logger.handlers:
+        return logger
+
+    global _setup_thread
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+
+    _setup_thread = threading.Thread(
+        target=_start_listener, args=(log_queue,), name="log-setup", daemon=True
+    )
+    _setup_thread.start()
+    atexit.register(_flush_on_exit)
 
     return logger
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from logger import setup_logger
+from paths import cache_dir
+
+log = setup_logger().getChild("metadata")
+
+CAPTURE_CACHE_FILE = "capture-times.json"
+# About 70 bytes each on disk
+MAX_CACHE_ENTRIES = 200_000
+
+# EXIF tags (TIFF 6.0 / EXIF 2.3)
+_TAG_DATETIME = 0x0132
+_TAG_EXIF_IFD = 0x8769
+_TAG_DATETIME_ORIGINAL = 0x9003
+
+# Enough for the EXIF block of JPEGs and the IFDs of TIFF-based raws
+_HEAD_BYTES = 128 * 1024
+
+
+# ---------------------------------------------------------
+# EXIF capture date (stdlib only)
+# ---------------------------------------------------------
+def _parse_exif_time(text: bytes) -> float | None:
+    try:
+        value = text.split(b"\0", 1)[0].decode("ascii").strip()
+        return time.mktime(time.strptime(value, "%Y:%m:%d %H:%M:%S"))
+    except (UnicodeDecodeError, ValueError, OverflowError):
+        return None
+
+
+def _tiff_capture_time(data: bytes, base: int) -> float | None:
+    """DateTimeOriginal (or DateTime) from a TIFF structure at data[base:]."""
+    order = data[base:base + 2]
+    if order == b"II":
+        endian = "<"
+    elif order == b"MM":
+        endian = ">"
+    else:
+        return None
+
+    def entries(offset: int):
+        start = base + offset
+        if start + 2 > len(data):
+            return
+        (count,) = struct.unpack_from(endian + "H", data, start)
+        for k in range(count):
+            pos = start + 2 + 12 * k
+            if pos + 12 > len(data):
+                return
+            yield struct.unpack_from(endian + "HHII", data, pos)
+
+    def ascii_value(count: int, value: int) -> bytes:
+        start = base + value
+        return data[start:start + count]
+
+    (ifd0,) = struct.unpack_from(endian + "I", data, base + 4)
+    fallback = None
+    for tag, typ, count, value in entries(ifd0):
+        if tag == _TAG_DATETIME and typ == 2:
+            fallback = _parse_exif_time(ascii_value(count, value))
+        elif tag == _TAG_EXIF_IFD:
+            for sub_tag, sub_typ, sub_count, sub_value in entries(value):
+                if sub_tag == _TAG_DATETIME_ORIGINAL and sub_typ == 2:
+                    found = _parse_exif_time(ascii_value(sub_count, sub_value))
+                    if found is not None:
+                        return found
+    return fallback
+
+
+def read_capture_time(path: Path) -> float | None:
+    """
+    Capture time from the EXIF block of a JPEG or a TIFF-based raw file
+    (DNG, NEF, CR2, ARW, ...), in local epoch seconds. None if the file
+    carries no readable date.
+    """
+    with open(path, "rb") as fh:
+        data = fh.read(_HEAD_BYTES)
+
+    if data[:2] in (b"II", b"MM"):
+        return _tiff_capture_time(data, 0)
+    if data[:2] != b"\xff\xd8":
+        return None
+
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        (length,) = struct.unpack_from(">H", data, pos + 2)
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b"Exif\0\0":
+            return _tiff_capture_time(data, pos + 10)
+        if marker == 0xDA:  # start of scan: no metadata past this point
+            return None
+        pos += 2 + length
+    return None
+
+
+# ---------------------------------------------------------
+# Persistent cache
+# ---------------------------------------------------------
+class CaptureTimeCache:
+    """
+    Capture times keyed by (device, inode, mtime_ns, size), so a file is
+    only opened again after it changed, and a renamed or moved file
+    keeps its entry. Stored as one JSON file in the cache directory:
+        {"2049:1234:1700000000000000000:4096": [capture_time | null, day_used], ...}
+    At most max_entries are kept; the least recently used go first.
+    """
+
+    def __init__(self, path: str | Path | None = None, max_entries: int | None = None):
+        self.path = Path(path) if path is not None else Path(cache_dir()) / CAPTURE_CACHE_FILE
+        self.max_entries = MAX_CACHE_ENTRIES if max_entries is None else max_entries
+        self._entries: Dict[str, list] | None = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(st: os.stat_result | None) -> str | None:
+        # Some filesystems report no inode numbers: such files are not cached
+        if st is None or not st.st_ino:
+            return None
+        return f"{st.st_dev}:{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+
+    def _load(self) -> Dict[str, list]:
+        if self._entries is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                data = {}
+            except (OSError, ValueError) as e:
+                log.error(f"[META] Ignoring unreadable capture cache: {e}")
+                data = {}
+            if not isinstance(data, dict):
+                data = {}
+            # Drops entries of older layouts (keyed by path) too
+            self._entries = {k: v for k, v in data.items() if isinstance(v, list) and len(v) == 2}
+            self._dirty = len(self._entries) != len(data)
+        return self._entries
+
+    def lookup(self, paths: Sequence[Path], stats: Sequence[os.stat_result | None],
+               workers: int = 8) -> List[float | None]:
+        """Capture time per path; files missing from the cache are read in parallel."""
+        today = int(time.time() // 86400)
+        keys = [self._key(st) for st in stats]
+        with self._lock:
+            entries = self._load()
+            result: List[float | None] = [None] * len(paths)
+            missing: List[int] = []
+            for i, key in enumerate(keys):
+                cached = entries.get(key) if key is not None else None
+                if cached is None:
+                    missing.append(i)
+                    continue
+                result[i] = cached[0]
+                if cached[1] != today:
+                    cached[1] = today
+                    self._dirty = True
+
+        if missing:
+            def read(i: int) -> float | None:
+                try:
+                    return read_capture_time(paths[i])
+                except (OSError, struct.error) as e:
+                    log.debug(f"[META] No capture time for {paths[i]}: {e}")
+                    return None
+
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                found = list(pool.map(read, missing))
+
+            with self._lock:
+                for i, captured in zip(missing, found):
+                    result[i] = captured
+                    if keys[i] is not None:
+                        entries[keys[i]] = [captured, today]
+                        self._dirty = True
+            log.debug(f"[META] Read capture times | files={len(missing)} cached={len(paths) - len(missing)}")
+        return result
+
+    def _prune(self) -> None:
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        # Least recently used first; ties (same day) in insertion order
+        oldest = sorted(self._entries, key=lambda k: self._entries[k][1])[:excess]
+        for key in oldest:
+            del self._entries[key]
+        log.debug(f"[META] Pruned capture cache | dropped={excess} kept={len(self._entries)}")
+
+    def save(self) -> None:
+        """Write the cache if it changed. Failures are logged, never raised."""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            self._prune()
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                tmp.write_text(json.dumps(self._entries), encoding="utf-8")
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except (OSError, TypeError, ValueError) as e:
+                log.error(f"[META] Could not save capture cache: {e}")
+
+
+_default_cache: CaptureTimeCache | None = None
+_default_lock = threading.Lock()
+
+
+def get_capture_cache() -> CaptureTimeCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = CaptureTimeCache()
+        return _default_cache
+
+
+def capture_times(paths: Sequence[Path], stats: Sequence[os.stat_result | None]) -> List[float]:
+    """
+    Capture time for each path, falling back to the file's mtime when the
+    file has no EXIF date (or could not be stat'ed: 0).
+    """
+    cache = get_capture_cache()
+    found = cache.lookup(paths, stats)
+    cache.save()
+    return [
+        t if t is not None else (st.st_mtime if st is not None else 0.0)
+        for t, st in zip(found, stats)
+    ]
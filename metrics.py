@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from logger import setup_logger
+
+log = setup_logger().getChild("metrics")
+
+# Seconds; covers a small folder's validate up to a large cross-device move
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+DEFAULT_INTERVAL = 15.0
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [
+        n + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for n, v in zip(names, values)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ---------------------------------------------------------
+# Metric types
+# ---------------------------------------------------------
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, labelnames: Sequence[str]):
+        self._registry = registry
+        self._lock = registry._lock
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. files renamed."""
+
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        # An unlabelled counter is exported as 0 before its first increment
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._registry.version += 1
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, value in sorted(self._values.items()):
+            yield "_total", _format_labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies) in fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+        # label values → [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def _slot(self, key: Tuple[str, ...]) -> list:
+        slot = self._values.get(key)
+        if slot is None:
+            slot = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        return slot
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        # Non-cumulative per-bucket counts here; render() accumulates them
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            slot = self._slot(key)
+            slot[0][i] += 1
+            slot[1] += value
+            self._registry.version += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of a with-block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        slot = self._values.get(self._key(labels))
+        return sum(slot[0]) if slot else 0
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, (counts, total) in sorted(self._values.items()):
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = 'le="' + ("+Inf" if bound == float("inf") else repr(float(bound))) + '"'
+                yield "_bucket", _format_labels(self.labelnames, key, le), running
+            yield "_count", _format_labels(self.labelnames, key), running
+            yield "_sum", _format_labels(self.labelnames, key), total
+
+
+# ---------------------------------------------------------
+# Registry
+# ---------------------------------------------------------
+class MetricsRegistry:
+    """
+    The process's metrics. Updates take one lock and touch one dict slot,
+    so phases record a handful of updates per call, never per file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        # Bumped on every update; the writer skips unchanged snapshots
+        self.version = 0
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(self, name, help_text, labelnames, buckets=buckets))
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self, openmetrics: bool = True) -> str:
+        """
+        Text exposition of every metric. OpenMetrics by default; with
+        openmetrics=False the Prometheus 0.0.4 text format (counter TYPE
+        lines name the _total series, no "# EOF").
+        """
+        lines: List[str] = []
+        with self._lock:
+            for metric in self._metrics.values():
+                family = metric.name
+                if metric.kind == "counter" and not openmetrics:
+                    family += "_total"
+                lines.append(f"# HELP {family} {metric.help}")
+                lines.append(f"# TYPE {family} {metric.kind}")
+                for suffix, labels, value in metric.samples():
+                    lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def restore(self, text: str) -> int:
+        """
+        Add the samples of a previous render() to the current values, so
+        counters stay cumulative across short-lived runs writing the same
+        file. Unknown series are ignored; returns how many were read.
+        """
+        # Histogram buckets are cumulative on disk: track the previous bucket per series
+        previous: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+        restored = 0
+        with self._lock:
+            for line in text.splitlines():
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    series, raw = line.rsplit(" ", 1)
+                    value = float(raw)
+                    name, labels = self._parse_series(series)
+                except ValueError:
+                    continue
+                for suffix in ("_total", "_bucket", "_count", "_sum"):
+                    if name.endswith(suffix) and name[:-len(suffix)] in self._metrics:
+                        metric = self._metrics[name[:-len(suffix)]]
+                        break
+                else:
+                    continue
+                le = labels.pop("le", None)
+                try:
+                    key = metric._key(labels)
+                except ValueError:
+                    continue
+                if suffix == "_bucket":
+                    cumulative = value
+                    value -= previous.get((metric.name, key), 0)
+                    previous[(metric.name, key)] = cumulative
+                    if le is None:
+                        continue
+                    bound = float(le.replace("+Inf", "inf"))
+                    if bound != float("inf") and bound not in metric.buckets:
+                        continue
+                    slot = metric._slot(key)
+                    slot[0][len(metric.buckets) if bound == float("inf") else metric.buckets.index(bound)] += value
+                elif suffix == "_sum" and isinstance(metric, Histogram):
+                    metric._slot(key)[1] += value
+                elif suffix == "_total" and isinstance(metric, Counter):
+                    metric._values[key] = metric._values.get(key, 0) + value
+                else:
+                    continue
+                restored += 1
+            self.version += 1
+        return restored
+
+    @staticmethod
+    def _parse_series(series: str) -> Tuple[str, Dict[str, str]]:
+        if "{" not in series:
+            return series, {}
+        name, _, rest = series.partition("{")
+        labels = {}
+        for part in rest.rstrip("}").split(","):
+            if part:
+                k, _, v = part.partition("=")
+                labels[k] = v.strip('"')
+        return name, labels
+
+
+REGISTRY = MetricsRegistry()
+
+FILES_SCANNED = REGISTRY.counter(
+    "freshnamer_files_scanned", "Files kept by folder scans")
+OPERATIONS_PLANNED = REGISTRY.counter(
+    "freshnamer_operations_planned", "Rename operations in built plans")
+PLAN_CONFLICTS = REGISTRY.counter(
+    "freshnamer_plan_conflicts", "Conflicts reported while planning")
+VALIDATION_ERRORS = REGISTRY.counter(
+    "freshnamer_validation_errors", "Errors reported by plan validation")
+FILES_RENAMED = REGISTRY.counter(
+    "freshnamer_files_renamed", "Files renamed, by phase (execute or undo)", ("phase",))
+RENAME_FAILURES = REGISTRY.counter(
+    "freshnamer_rename_failures", "Failed renames, by phase (execute or undo)", ("phase",))
+PHASE_SECONDS = REGISTRY.histogram(
+    "freshnamer_phase_duration_seconds",
+    "Wall time per call of scan, plan, validate, execute and undo", ("phase",))
+
+
+# ---------------------------------------------------------
+# Textfile writer (node_exporter textfile collector)
+# ---------------------------------------------------------
+def write_textfile(path: str, registry: MetricsRegistry = REGISTRY, openmetrics: bool = True) -> None:
+    """
+    Write the registry to path atomically: a temporary file in the same
+    folder, then os.replace, so the collector never reads half a file.
+    """
+    text = registry.render(openmetrics)
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".freshnamer-metrics-", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        # mkstemp creates 0600; the collector usually runs as another user
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class TextfileWriter:
+    """
+    Rewrites the metrics file every interval seconds while something
+    changed, and once more on stop(). Counters found in an existing file
+    are carried over on start, so one-shot runs accumulate.
+    """
+
+    def __init__(self, path: str, interval: float = DEFAULT_INTERVAL,
+                 registry: MetricsRegistry = REGISTRY, openmetrics: bool = True):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.openmetrics = openmetrics
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._written = -1
+
+    def start(self) -> "TextfileWriter":
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                restored = self.registry.restore(fh.read())
+            log.debug(f"[METRICS] Carried over {restored} series from {self.path}")
+        except FileNotFoundError:
+            pass
+        except (OSError, UnicodeDecodeError) as e:
+            log.error(f"[METRICS] Ignoring unreadable metrics file {self.path}: {e}")
+
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write now if anything changed since the last write. Errors are logged."""
+        version = self.registry.version
+        if version == self._written:
+            return
+        try:
+            write_textfile(self.path, self.registry, self.openmetrics)
+            self._written = version
+        except OSError as e:
+            log.error(f"[METRICS] Could not write {self.path}: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -5,3 +5,71 @@ def resource_path(relative_path):
     if hasattr(sys, "_MEIPASS"):
         return os.path.join(sys._MEIPASS, relative_path)
     return os.path.join(os.path.abspath("."), relative_path)
+
+
+def config_dir():
+    """
+    Per-user configuration directory (not created here).
+    FRESHNAMER_CONFIG_DIR overrides the platform default.
+    """
+    override = os.environ.get("FRESHNAMER_CONFIG_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        return os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "FreshNamer")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support/FreshNamer")
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "freshnamer")
+
+
+def log_dir():
+    """
+    Per-user log directory (not created here).
+    FRESHNAMER_LOG_DIR overrides the platform default.
+    """
+    override = os.environ.get("FRESHNAMER_LOG_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        return os.path.join(base, "FreshNamer", "logs")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Logs/FreshNamer")
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "freshnamer", "logs")
+
+
+def cache_dir():
+    """
+    Per-user cache directory (not created here).
+    FRESHNAMER_CACHE_DIR overrides the platform default.
+    """
+    override = os.environ.get("FRESHNAMER_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        return os.path.join(base, "FreshNamer", "cache")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/FreshNamer")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "freshnamer")
+
+
+def state_dir():
+    """
+    Per-user state directory for data that must survive a crash, such as
+    the cross-device move journal (not created here).
+    FRESHNAMER_STATE_DIR overrides the platform default.
+    """
+    override = os.environ.get("FRESHNAMER_STATE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        return os.path.join(base, "FreshNamer", "state")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support/FreshNamer/state")
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "freshnamer")
@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import string
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+
+from logger import setup_logger
+from paths import config_dir
+
+log = setup_logger().getChild("placeholders")
+
+PLUGINS_DIR = "plugins"
+ENTRY_POINT_GROUP = "freshnamer.placeholders"
+
+# Placeholders build_name_advanced always provides
+BUILTIN_PLACEHOLDERS = frozenset(
+    {"original", "num", "num_padded", "prefix", "suffix", "category", "folder"}
+)
+
+# Declared provider cost. Cheap providers run inline when a name is first
+# rendered; the others run in the worker pool while the plan is finished,
+# and previews show their names as pending until then.
+COST_CHEAP = "cheap"
+COST_IO = "io"
+COST_EXPENSIVE = "expensive"
+COSTS = (COST_CHEAP, COST_IO, COST_EXPENSIVE)
+
+PROVIDER_WORKERS = 4
+CACHE_ENTRIES = 200_000
+
+
+# ---------------------------------------------------------
+# Provider interface
+# ---------------------------------------------------------
+class PlaceholderProvider(ABC):
+    """
+    Supplies the value of one advanced-mode placeholder ({name}) for a
+    whole batch of files at once.
+
+    Subclasses set:
+        name:      the placeholder, a Python identifier
+        cost:      COST_CHEAP, COST_IO or COST_EXPENSIVE
+        cacheable: True if a file's value only depends on the file itself,
+                   so it can be reused until the file's size or mtime changes
+        version:   part of the cache key; bump it when the values change
+
+    and implement values(), which gets every file of a plan that uses the
+    placeholder in one call and returns one value per file, in order.
+    """
+
+    name: str = ""
+    cost: str = COST_CHEAP
+    cacheable: bool = False
+    version: str = "1"
+
+    @abstractmethod
+    def values(self, files: Sequence[Path]) -> Sequence[object]:
+        ...
+
+
+class FunctionProvider(PlaceholderProvider):
+    """Wrap a plain function files → values as a provider."""
+
+    def __init__(self, name: str, func: Callable[[Sequence[Path]], Sequence[object]],
+                 cost: str = COST_CHEAP, cacheable: bool = False, version: str = "1"):
+        self.name = name
+        self.func = func
+        self.cost = cost
+        self.cacheable = cacheable
+        self.version = version
+
+    def values(self, files: Sequence[Path]) -> Sequence[object]:
+        return self.func(files)
+
+
+# ---------------------------------------------------------
+# Registry
+# ---------------------------------------------------------
+class PlaceholderRegistry:
+    """Placeholder name → provider."""
+
+    def __init__(self):
+        self._providers: Dict[str, PlaceholderProvider] = {}
+        self._lock = threading.Lock()
+
+    def register(self, provider: PlaceholderProvider) -> None:
+        """Add a provider. Raises ValueError for a bad or built-in name or an unknown cost."""
+        name = provider.name
+        if not name or not name.isidentifier():
+            raise ValueError(f"Placeholder name must be an identifier: {name!r}")
+        if name in BUILTIN_PLACEHOLDERS:
+            raise ValueError(f"Placeholder {{{name}}} is built in")
+        if provider.cost not in COSTS:
+            raise ValueError(f"Unknown cost '{provider.cost}' for {{{name}}} (use {', '.join(COSTS)})")
+        with self._lock:
+            if name in self._providers:
+                log.warning(f"[PLUGIN] Replacing provider for {{{name}}}")
+            self._providers[name] = provider
+        log.info(f"[PLUGIN] Registered {{{name}}} | cost={provider.cost} cacheable={provider.cacheable}")
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._providers.pop(name, None)
+
+    def get(self, name: str) -> PlaceholderProvider | None:
+        return self._providers.get(name)
+
+    def names(self) -> List[str]:
+        return sorted(self._providers)
+
+
+def placeholder_fields(pattern: str) -> Set[str]:
+    """
+    Placeholder names an advanced pattern refers to ("{num:03d}" → "num",
+    "{shoot.code}" → "shoot"). Raises ValueError for a malformed pattern.
+    """
+    fields = set()
+    for _, field, _, _ in string.Formatter().parse(pattern):
+        if field is None:
+            continue
+        root = field.split(".", 1)[0].split("[", 1)[0]
+        if not root or root.isdigit():
+            raise ValueError(f"Positional fields are not supported: {{{field}}}")
+        fields.add(root)
+    return fields
+
+
+# ---------------------------------------------------------
+# Plugin discovery
+# ---------------------------------------------------------
+def plugins_path() -> str:
+    return os.path.join(config_dir(), PLUGINS_DIR)
+
+
+def _register_module(registry: PlaceholderRegistry, module, origin: str) -> None:
+    # A plugin either registers itself or lists its providers
+    hook = getattr(module, "register", None)
+    if callable(hook):
+        hook(registry)
+        return
+    for provider in getattr(module, "PROVIDERS", ()):
+        registry.register(provider)
+    if not hasattr(module, "PROVIDERS"):
+        log.warning(f"[PLUGIN] {origin} defines neither register() nor PROVIDERS")
+
+
+def load_plugins(registry: PlaceholderRegistry, directory: str | None = None) -> None:
+    """
+    Load placeholder plugins: every *.py file in the plugins directory
+    (under the config directory) and every "freshnamer.placeholders"
+    entry point. A broken plugin is logged and skipped.
+    """
+    directory = directory or plugins_path()
+    try:
+        files = sorted(f for f in os.listdir(directory) if f.endswith(".py"))
+    except OSError:
+        files = []
+
+    for filename in files:
+        path = os.path.join(directory, filename)
+        try:
+            spec = importlib.util.spec_from_file_location(f"freshnamer_plugin_{filename[:-3]}", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _register_module(registry, module, path)
+        except Exception as e:
+            log.error(f"[PLUGIN] Could not load {path}: {e}")
+
+    try:
+        eps = metadata.entry_points()
+        # Python 3.10+ selects by group; 3.9 returns a dict of groups
+        eps = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, "select") else eps.get(ENTRY_POINT_GROUP, ())
+    except Exception as e:
+        log.error(f"[PLUGIN] Could not list entry points: {e}")
+        eps = ()
+    for ep in eps:
+        try:
+            loaded = ep.load()
+            if isinstance(loaded, PlaceholderProvider):
+                registry.register(loaded)
+            elif callable(loaded):
+                loaded(registry)
+            else:
+                _register_module(registry, loaded, ep.name)
+        except Exception as e:
+            log.error(f"[PLUGIN] Could not load entry point '{ep.name}': {e}")
+
+
+_registry: PlaceholderRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_placeholder_registry() -> PlaceholderRegistry:
+    """Process-wide registry; plugins are loaded on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PlaceholderRegistry()
+            load_plugins(_registry)
+        return _registry
+
+
+def register_placeholder(provider: PlaceholderProvider) -> None:
+    get_placeholder_registry().register(provider)
+
+
+# ---------------------------------------------------------
+# Value cache
+# ---------------------------------------------------------
+class PlaceholderCache:
+    """
+    Values of cacheable providers, keyed by (provider, version, path) and
+    validated by (size, mtime_ns). In memory, least recently used entries
+    dropped first; it spares repeated previews of the same folder.
+    """
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[int, int, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, provider: PlaceholderProvider, paths: Sequence[Path],
+                 stats: Sequence[os.stat_result | None]) -> Tuple[List[object], List[int]]:
+        """(values, indices of paths that missed)."""
+        values: List[object] = [None] * len(paths)
+        missing: List[int] = []
+        with self._lock:
+            entries = self._entries
+            for i, (path, st) in enumerate(zip(paths, stats)):
+                key = (provider.name, provider.version, str(path))
+                cached = entries.get(key)
+                if st is not None and cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+                    values[i] = cached[2]
+                    entries.move_to_end(key)
+                else:
+                    missing.append(i)
+        return values, missing
+
+    def put_many(self, provider: PlaceholderProvider, paths: Sequence[Path],
+                 stats: Sequence[os.stat_result | None], values: Sequence[object]) -> None:
+        with self._lock:
+            entries = self._entries
+            for path, st, value in zip(paths, stats, values):
+                if st is None:
+                    continue
+                key = (provider.name, provider.version, str(path))
+                entries[key] = (st.st_size, st.st_mtime_ns, value)
+                entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = PlaceholderCache()
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_placeholder_cache() -> PlaceholderCache:
+    return _cache
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=PROVIDER_WORKERS, thread_name_prefix="placeholder")
+        return _pool
+
+
+# ---------------------------------------------------------
+# Per-plan batch
+# ---------------------------------------------------------
+class PlaceholderBatch:
+    """
+    Plugin placeholder values for the rows of one plan. Each provider is
+    called once per plan, with every row that uses its placeholder, the
+    first time one of its values is needed (or by prefetch()).
+
+    A provider that raises or returns the wrong number of values leaves
+    its rows without a value; the error is kept in errors.
+    """
+
+    def __init__(self, paths: Sequence[Path], registry: PlaceholderRegistry,
+                 stat: Callable[[Path], os.stat_result] | None = None,
+                 stats: Dict[Path, os.stat_result] | None = None):
+        self.paths = paths
+        self.registry = registry
+        self.errors: List[str] = []
+        self._stat = stat
+        self._stats = stats or {}
+        self._rows: Dict[str, List[range]] = {}
+        self._values: Dict[str, List[object]] = {}
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def require(self, name: str, start: int, stop: int) -> None:
+        """Rows start..stop-1 use placeholder name."""
+        self._rows.setdefault(name, []).append(range(start, stop))
+        self._locks.setdefault(name, threading.Lock())
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._rows)
+
+    @property
+    def pending(self) -> bool:
+        """True while a non-cheap provider has not run yet."""
+        return any(
+            name not in self._values and self.registry.get(name).cost != COST_CHEAP
+            for name in self._rows
+        )
+
+    def values(self, name: str) -> List[object]:
+        """Values of placeholder name by row (None where not used or failed)."""
+        found = self._values.get(name)
+        if found is None:
+            with self._locks[name]:
+                found = self._values.get(name)
+                if found is None:
+                    found = self._compute(name)
+                    self._values[name] = found
+        return found
+
+    def prefetch(self) -> None:
+        """Run every provider not run yet, the costly ones in the worker pool."""
+        todo = [name for name in self._rows if name not in self._values]
+        costly = [name for name in todo if self.registry.get(name).cost != COST_CHEAP]
+        futures = [_get_pool().submit(self.values, name) for name in costly]
+        for name in todo:
+            if name not in costly:
+                self.values(name)
+        for future in futures:
+            future.result()
+
+    def _row_stats(self, rows: List[int]) -> List[os.stat_result | None]:
+        stats = []
+        for i in rows:
+            path = self.paths[i]
+            st = self._stats.get(path)
+            if st is None and self._stat is not None:
+                try:
+                    st = self._stat(path)
+                except OSError:
+                    st = None
+            stats.append(st)
+        return stats
+
+    def _compute(self, name: str) -> List[object]:
+        provider = self.registry.get(name)
+        result: List[object] = [None] * len(self.paths)
+        rows = sorted({i for span in self._rows[name] for i in span})
+        files = [self.paths[i] for i in rows]
+
+        if provider.cacheable:
+            stats = self._row_stats(rows)
+            found, missing = _cache.get_many(provider, files, stats)
+        else:
+            stats, found, missing = None, [None] * len(rows), list(range(len(rows)))
+
+        if missing:
+            batch = [files[k] for k in missing]
+            try:
+                fresh = list(provider.values(batch))
+                if len(fresh) != len(batch):
+                    raise ValueError(f"returned {len(fresh)} values for {len(batch)} files")
+            except Exception as e:
+                message = f"Placeholder {{{name}}} failed: {e}"
+                log.error(f"[PLUGIN] {message}")
+                with self._lock:
+                    self.errors.append(message)
+                return result
+            for k, value in zip(missing, fresh):
+                found[k] = value
+            if provider.cacheable:
+                _cache.put_many(provider, batch, [stats[k] for k in missing], fresh)
+
+        log.debug(
+            f"[PLUGIN] {{{name}}} resolved | files={len(rows)} "
+            f"computed={len(missing)} cached={len(rows) - len(missing)}"
+        )
+        for i, value in zip(rows, found):
+            result[i] = value
+        return result
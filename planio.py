@@ -0,0 +1,519 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from logger import setup_logger
+from engine import RenameOperation, RenamePlan
+
+log = setup_logger().getChild("planio")
+
+
+# ---------------------------------------------------------
+# Format constants
+# ---------------------------------------------------------
+FORMAT_NAME = "freshnamer-plan"
+# 2: binary header holds the level count and the skipped counts id
+FORMAT_VERSION = 2
+
+KIND_PLAN = "plan"
+KIND_UNDO = "undo"
+_KIND_CODES = {KIND_PLAN: 0, KIND_UNDO: 1}
+_KIND_NAMES = {v: k for k, v in _KIND_CODES.items()}
+
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+BINARY_SUFFIX = ".fnplan"
+
+# Name policy byte: bit 0 = casefold, bit 1 = nfc (0 = exact)
+_POLICY_BITS = {"casefold": 1, "nfc": 2}
+
+# Binary layout:
+#   header | op records | conflict ids | skipped ids | string offsets | string blob
+# Every string (directories, names, categories, messages) is stored once in the
+# shared string table and referenced by id. The header's counts field is the id
+# + 1 of the skipped counts as JSON (one object per level), 0 when there are none.
+# Version 1 headers had neither counts nor a level count: they read as having no
+# counts, and as many levels as the last operation's level + 1.
+_MAGIC = b"FNPLAN"
+_PREFIX = struct.Struct("<6sH")     # magic, version
+_HEADER = struct.Struct("<6sHBBIIQQQQQ")
+_HEADER_V1 = struct.Struct("<6sHBB6xQQQQQ")
+_OP = struct.Struct("<IIIIII")      # old_dir, old_name, new_dir, new_name, category, level
+_ID = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+
+class PlanFormatError(ValueError):
+    """Raised when a plan file is malformed or of an unexpected kind."""
+
+
+def _policy_to_code(name: str) -> int:
+    return sum(_POLICY_BITS.get(part, 0) for part in name.split("+"))
+
+
+def _policy_from_code(code: int) -> str:
+    return "+".join(p for p, bit in _POLICY_BITS.items() if code & bit) or "exact"
+
+
+def _levels_policy(levels: List[RenamePlan]) -> str:
+    return levels[0].name_policy if levels else "exact"
+
+
+def _levels_counts(levels: List[RenamePlan]) -> List[Dict[str, int]] | None:
+    counts = [dict(plan.skipped_counts) for plan in levels]
+    return counts if any(counts) else None
+
+
+def _apply_counts(levels: List[RenamePlan], counts) -> None:
+    for plan, level_counts in zip(levels, counts or ()):
+        plan.skipped_counts = {str(k): int(v) for k, v in level_counts.items()}
+
+
+def _detect_format(path: Path) -> str:
+    if path.suffix.lower() in JSONL_SUFFIXES:
+        return "jsonl"
+    if path.suffix.lower() == BINARY_SUFFIX:
+        return "binary"
+    raise PlanFormatError(
+        f"Unknown plan format for '{path.name}' (use .jsonl or {BINARY_SUFFIX})"
+    )
+
+
+# ---------------------------------------------------------
+# JSON Lines
+# ---------------------------------------------------------
+def _write_jsonl(path: Path, kind: str, levels: List[RenamePlan]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        header = {
+            "format": FORMAT_NAME, "version": FORMAT_VERSION, "kind": kind,
+            "levels": len(levels), "name_policy": _levels_policy(levels),
+        }
+        counts = _levels_counts(levels)
+        if counts is not None:
+            header["skipped_counts"] = counts
+        fh.write(json.dumps(header) + "\n")
+
+        for level, plan in enumerate(levels):
+            for op in plan.operations:
+                rec = {"old": str(op.old_path), "new": str(op.new_path), "category": op.category}
+                if kind == KIND_UNDO:
+                    rec["level"] = level
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            for msg in plan.conflicts:
+                fh.write(json.dumps({"conflict": msg, "level": level}, ensure_ascii=False) + "\n")
+            for msg in plan.skipped:
+                fh.write(json.dumps({"skipped": msg, "level": level}, ensure_ascii=False) + "\n")
+
+
+def _read_jsonl_header(fh, path: Path) -> dict:
+    first = fh.readline()
+    try:
+        header = json.loads(first)
+    except json.JSONDecodeError as e:
+        raise PlanFormatError(f"Invalid plan header in '{path}': {e}")
+    if header.get("format") != FORMAT_NAME:
+        raise PlanFormatError(f"'{path}' is not a FreshNamer plan file")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise PlanFormatError(f"'{path}' uses unsupported version {header.get('version')}")
+    return header
+
+
+def _iter_jsonl_records(fh, path: Path) -> Iterator[dict]:
+    # Records after the header, one JSON object per non-empty line
+    for line_no, line in enumerate(fh, start=2):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise PlanFormatError(f"{path}:{line_no}: {e}")
+
+
+def _path_interner():
+    dirs: Dict[str, Path] = {}
+
+    def _path(text: str) -> Path:
+        # Share parent Path objects between operations in the same directory
+        parent, name = os.path.split(text)
+        base = dirs.get(parent)
+        if base is None:
+            base = dirs[parent] = Path(parent)
+        return base / name
+
+    return _path
+
+
+def iter_jsonl_operations(path: str | Path) -> Iterator[Tuple[int, RenameOperation]]:
+    """
+    Stream (level, operation) pairs from a JSON Lines plan file
+    without holding the whole file in memory.
+    """
+    path = Path(path)
+    _path = _path_interner()
+    with open(path, "r", encoding="utf-8") as fh:
+        _read_jsonl_header(fh, path)
+        for rec in _iter_jsonl_records(fh, path):
+            if "old" in rec:
+                yield rec.get("level", 0), RenameOperation(
+                    _path(rec["old"]), _path(rec["new"]), rec["category"]
+                )
+
+
+def _read_jsonl(path: Path) -> Tuple[str, List[RenamePlan]]:
+    _path = _path_interner()
+    with open(path, "r", encoding="utf-8") as fh:
+        header = _read_jsonl_header(fh, path)
+
+        kind = header.get("kind", KIND_PLAN)
+        count = header.get("levels", 1)
+        if kind == KIND_PLAN:
+            count = max(count, 1)
+        policy = header.get("name_policy", "exact")
+        levels = [RenamePlan([], [], [], name_policy=policy) for _ in range(count)]
+        _apply_counts(levels, header.get("skipped_counts"))
+
+        # One pass over operations and messages alike
+        for rec in _iter_jsonl_records(fh, path):
+            level = rec.get("level", 0)
+            if not 0 <= level < count:
+                raise PlanFormatError(f"'{path}' refers to level {level} of {count}")
+            target = levels[level]
+            if "old" in rec:
+                target.operations.append(RenameOperation(_path(rec["old"]), _path(rec["new"]), rec["category"]))
+            elif "conflict" in rec:
+                target.conflicts.append(rec["conflict"])
+            elif "skipped" in rec:
+                target.skipped.append(rec["skipped"])
+
+    return kind, levels
+
+
+# ---------------------------------------------------------
+# Binary
+# ---------------------------------------------------------
+def _write_binary(path: Path, kind: str, levels: List[RenamePlan]) -> None:
+    strings: Dict[str, int] = {}
+
+    def sid(text: str) -> int:
+        idx = strings.get(text)
+        if idx is None:
+            idx = strings[text] = len(strings)
+        return idx
+
+    n_ops = 0
+    conflict_ids: List[int] = []
+    skipped_ids: List[int] = []
+
+    with open(path, "wb") as fh:
+        fh.write(b"\0" * _HEADER.size)
+
+        for level, plan in enumerate(levels):
+            for op in plan.operations:
+                fh.write(_OP.pack(
+                    sid(str(op.old_path.parent)), sid(op.old_path.name),
+                    sid(str(op.new_path.parent)), sid(op.new_path.name),
+                    sid(op.category), level,
+                ))
+                n_ops += 1
+            conflict_ids.extend(sid(m) for m in plan.conflicts)
+            skipped_ids.extend(sid(m) for m in plan.skipped)
+
+        counts = _levels_counts(levels)
+        counts_ref = sid(json.dumps(counts)) + 1 if counts is not None else 0
+
+        for idx in conflict_ids:
+            fh.write(_ID.pack(idx))
+        for idx in skipped_ids:
+            fh.write(_ID.pack(idx))
+
+        strings_offset = fh.tell()
+        encoded = [s.encode("utf-8") for s in strings]
+        pos = 0
+        for blob in encoded:
+            fh.write(_OFFSET.pack(pos))
+            pos += len(blob)
+        fh.write(_OFFSET.pack(pos))
+        for blob in encoded:
+            fh.write(blob)
+
+        fh.seek(0)
+        fh.write(_HEADER.pack(
+            _MAGIC, FORMAT_VERSION, _KIND_CODES[kind], _policy_to_code(_levels_policy(levels)), counts_ref,
+            len(levels), n_ops, len(conflict_ids), len(skipped_ids), len(strings), strings_offset,
+        ))
+
+
+class MappedPlanFile:
+    """
+    Read-only, memory-mapped view of a binary plan file.
+    Strings and operations are decoded on demand. Close it (or use it
+    as a context manager) before the file is replaced: Windows refuses
+    to replace a mapped file.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fh = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fh.close()
+            raise PlanFormatError(f"'{self.path}' is empty")
+
+        try:
+            self._read_header()
+        except PlanFormatError:
+            self.close()
+            raise
+        self._string_cache: Dict[int, str] = {}
+        self._dir_cache: Dict[int, Path] = {}
+
+    def _read_header(self) -> None:
+        if len(self._mm) < _HEADER_V1.size:
+            raise PlanFormatError(f"'{self.path}' is truncated")
+        magic, version = _PREFIX.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise PlanFormatError(f"'{self.path}' is not a FreshNamer plan file")
+        if version > FORMAT_VERSION:
+            raise PlanFormatError(f"'{self.path}' uses unsupported version {version}")
+
+        header = _HEADER if version >= 2 else _HEADER_V1
+        if len(self._mm) < header.size:
+            raise PlanFormatError(f"'{self.path}' is truncated")
+        if version >= 2:
+            (_, _, kind_code, policy_code, self._counts_ref, self.n_levels, self.n_ops, self.n_conflicts,
+             self.n_skipped, self.n_strings, self._strings_offset) = header.unpack_from(self._mm, 0)
+        else:
+            (_, _, kind_code, policy_code, self.n_ops, self.n_conflicts,
+             self.n_skipped, self.n_strings, self._strings_offset) = header.unpack_from(self._mm, 0)
+            self._counts_ref = 0
+
+        self.kind = _KIND_NAMES.get(kind_code, KIND_PLAN)
+        self.name_policy = _policy_from_code(policy_code)
+        self._ops_offset = header.size
+        self._ids_offset = self._ops_offset + self.n_ops * _OP.size
+        self._blob_offset = self._strings_offset + (self.n_strings + 1) * _OFFSET.size
+        if version < 2:
+            # Empty levels at the end were not recorded
+            self.n_levels = self.record(self.n_ops - 1)[5] + 1 if self.n_ops else 0
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self) -> "MappedPlanFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def string(self, idx: int) -> str:
+        text = self._string_cache.get(idx)
+        if text is None:
+            at = self._strings_offset + idx * _OFFSET.size
+            start, = _OFFSET.unpack_from(self._mm, at)
+            end, = _OFFSET.unpack_from(self._mm, at + _OFFSET.size)
+            text = self._mm[self._blob_offset + start:self._blob_offset + end].decode("utf-8")
+            self._string_cache[idx] = text
+        return text
+
+    def _dir(self, idx: int) -> Path:
+        path = self._dir_cache.get(idx)
+        if path is None:
+            path = self._dir_cache[idx] = Path(self.string(idx))
+        return path
+
+    def record(self, i: int) -> Tuple[int, int, int, int, int, int]:
+        return _OP.unpack_from(self._mm, self._ops_offset + i * _OP.size)
+
+    def operation(self, i: int) -> RenameOperation:
+        old_dir, old_name, new_dir, new_name, cat, _ = self.record(i)
+        return RenameOperation(
+            self._dir(old_dir) / self.string(old_name),
+            self._dir(new_dir) / self.string(new_name),
+            self.string(cat),
+        )
+
+    def level_ranges(self) -> List[Tuple[int, int]]:
+        """
+        Contiguous [start, stop) operation ranges, one per level; a level
+        without operations gets an empty range so levels stay aligned
+        with their skipped counts.
+        """
+        ranges: List[Tuple[int, int]] = []
+        i = 0
+        for level in range(self.n_levels):
+            start = i
+            while i < self.n_ops and self.record(i)[5] == level:
+                i += 1
+            ranges.append((start, i))
+        if i != self.n_ops:
+            raise PlanFormatError(f"'{self.path}' has operations out of level order")
+        return ranges
+
+    def messages(self) -> Tuple[List[str], List[str]]:
+        ids = [
+            _ID.unpack_from(self._mm, self._ids_offset + i * _ID.size)[0]
+            for i in range(self.n_conflicts + self.n_skipped)
+        ]
+        texts = [self.string(i) for i in ids]
+        return texts[:self.n_conflicts], texts[self.n_conflicts:]
+
+    def skipped_counts(self) -> List[Dict[str, int]]:
+        """Skipped counts per level (empty if the file has none)."""
+        if not self._counts_ref:
+            return []
+        if self._counts_ref > self.n_strings:
+            raise PlanFormatError(f"'{self.path}' has invalid skipped counts")
+        try:
+            return json.loads(self.string(self._counts_ref - 1))
+        except ValueError as e:
+            raise PlanFormatError(f"'{self.path}' has invalid skipped counts: {e}")
+
+
+class MappedOperations:
+    """
+    Lazy sequence of RenameOperation backed by a MappedPlanFile.
+
+    Supports len(), iteration, indexing and in-place sort(key=...),
+    which is all execute_plan and validate_plan need. Sorting only
+    permutes an index list; the file itself is never rewritten.
+    """
+
+    def __init__(self, source: MappedPlanFile, start: int = 0, stop: int | None = None):
+        self._source = source
+        self._order: List[int] | range = range(start, source.n_ops if stop is None else stop)
+
+    @property
+    def path(self) -> Path:
+        """The plan file the operations are read from."""
+        return self._source.path
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __getitem__(self, i: int) -> RenameOperation:
+        return self._source.operation(self._order[i])
+
+    def __iter__(self) -> Iterator[RenameOperation]:
+        op = self._source.operation
+        for i in self._order:
+            yield op(i)
+
+    def sort(self, key=None, reverse: bool = False) -> None:
+        if key is None:
+            raise TypeError("MappedOperations.sort() requires a key")
+        keys = [key(self._source.operation(i)) for i in self._order]
+        perm = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        self._order = [self._order[p] for p in perm]
+
+    def close(self) -> None:
+        """Unmap the file; the operations can no longer be read."""
+        self._source.close()
+
+
+def _read_binary(path: Path) -> Tuple[str, List[RenamePlan]]:
+    source = MappedPlanFile(path)
+    try:
+        conflicts, skipped = source.messages()
+        counts = source.skipped_counts()
+        if source.kind == KIND_UNDO:
+            # Undo files are rewritten after every run: read them eagerly
+            # so the mapping is gone before the file is replaced
+            with source:
+                levels = [
+                    RenamePlan(list(MappedOperations(source, start, stop)), [], [], name_policy=source.name_policy)
+                    for start, stop in source.level_ranges()
+                ]
+        else:
+            levels = [RenamePlan(MappedOperations(source), conflicts, skipped, name_policy=source.name_policy)]
+    except BaseException:
+        source.close()
+        raise
+    _apply_counts(levels, counts)
+
+    log.debug(f"[PLANIO] Mapped '{path}' | ops={source.n_ops} strings={source.n_strings}")
+    return source.kind, levels
+
+
+# ---------------------------------------------------------
+# Public API
+# ---------------------------------------------------------
+def _write(path: str | Path, kind: str, levels: List[RenamePlan], fmt: str | None) -> Path:
+    path = Path(path)
+    fmt = fmt or _detect_format(path)
+    writers = {"jsonl": _write_jsonl, "binary": _write_binary}
+    if fmt not in writers:
+        raise PlanFormatError(f"Unknown plan format: {fmt}")
+
+    # Write beside the target and swap in atomically; an existing file may
+    # still be memory-mapped by the records being written.
+    tmp = path.with_name(path.name + ".tmp")
+    writers[fmt](tmp, kind, levels)
+    os.replace(tmp, path)
+    log.info(f"[PLANIO] Exported {kind} | path={path} format={fmt} levels={len(levels)}")
+    return path
+
+
+def _read(path: str | Path, expected_kind: str) -> List[RenamePlan]:
+    path = Path(path)
+    fmt = _detect_format(path)
+    kind, levels = _read_jsonl(path) if fmt == "jsonl" else _read_binary(path)
+    if kind != expected_kind:
+        raise PlanFormatError(f"'{path}' contains a {kind} record, expected {expected_kind}")
+    log.info(f"[PLANIO] Imported {kind} | path={path} format={fmt} levels={len(levels)}")
+    return levels
+
+
+def export_plan(plan: RenamePlan, path: str | Path, fmt: str | None = None) -> Path:
+    """
+    Write a plan to disk. The format is taken from the file suffix
+    (.jsonl or .fnplan) unless fmt is given ("jsonl" or "binary").
+    """
+    return _write(path, KIND_PLAN, [plan], fmt)
+
+
+def import_plan(path: str | Path) -> RenamePlan:
+    """
+    Load a plan previously written by export_plan.
+    Binary plans are memory-mapped and decoded lazily, so the result
+    can be passed straight to validate_plan / execute_plan; release the
+    mapping with close_plan() once done.
+    """
+    return _read(path, KIND_PLAN)[0]
+
+
+def close_plan(plan: RenamePlan) -> None:
+    """
+    Release the file behind a plan loaded by import_plan (nothing to do
+    for JSON Lines plans). The plan's operations can no longer be read.
+    """
+    if isinstance(plan.operations, MappedOperations):
+        plan.operations.close()
+
+
+def export_undo_stack(path: str | Path, stack: Iterable[RenamePlan] | None = None, fmt: str | None = None) -> Path:
+    """
+    Write undo records (oldest first). Defaults to the engine's undo stack.
+    """
+    import engine
+    levels = list(engine._undo_stack if stack is None else stack)
+    return _write(path, KIND_UNDO, levels, fmt)
+
+
+def import_undo_stack(path: str | Path, replace: bool = True) -> int:
+    """
+    Load undo records into the engine's undo stack.
+    Returns the number of levels loaded.
+    """
+    import engine
+    levels = _read(path, KIND_UNDO)
+    if replace:
+        engine._undo_stack.clear()
+    engine._undo_stack.extend(levels)
+    return len(levels)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Set, Tuple
+
+from logger import setup_logger
+
+log = setup_logger().getChild("preview_index")
+
+# Filter modes understood by PreviewIndex.visible()
+MODE_ALL = "all"
+MODE_CONFLICTS = "conflicts"
+MODE_CHANGED = "changed"
+
+
+class PreviewIndex:
+    """
+    Precomputed filter membership for the preview table.
+
+    Rows are identified by their position in the plan. Category, conflict
+    and changed membership are kept as sets; names are kept in one
+    casefolded text blob (original and new name on separate lines) so
+    substring and regex search run in C and only touch matching rows.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str, bool]]):
+        """
+        rows: (category, original name, new name, has_conflict) per row
+        """
+        self.by_category: Dict[str, Set[int]] = {}
+        self.conflicts: Set[int] = set()
+        self.changed: Set[int] = set()
+
+        lines: List[str] = []
+        for i, (category, orig, new, has_conflict) in enumerate(rows):
+            self.by_category.setdefault(category, set()).add(i)
+            if has_conflict:
+                self.conflicts.add(i)
+            if orig != new:
+                self.changed.add(i)
+            lines.append(self._fold(orig))
+            lines.append(self._fold(new))
+
+        self.row_count = len(lines) // 2
+        self._blob = "\n".join(lines)
+        self._line_starts: List[int] = []
+        pos = 0
+        for line in lines:
+            self._line_starts.append(pos)
+            pos += len(line) + 1
+
+    @staticmethod
+    def _fold(text: str) -> str:
+        return text.replace("\n", " ").casefold()
+
+    def _row_at(self, offset: int) -> int:
+        return (bisect_right(self._line_starts, offset) - 1) // 2
+
+    def _next_row_offset(self, row: int) -> int:
+        line = (row + 1) * 2
+        return self._line_starts[line] if line < len(self._line_starts) else len(self._blob)
+
+    # -----------------------------------------------------
+    # Search
+    # -----------------------------------------------------
+    def search(self, text: str, regex: bool = False) -> Set[int]:
+        """
+        Rows whose original or new name contains text (case-insensitive).
+        With regex=True, text is a regular expression; re.error is raised
+        for invalid patterns.
+        """
+        if regex:
+            return self._search_regex(text)
+
+        needle = self._fold(text)
+        found: Set[int] = set()
+        if not needle:
+            return set(range(self.row_count))
+        if not self.row_count:
+            return found
+
+        find = self._blob.find
+        pos = find(needle)
+        while pos != -1:
+            row = self._row_at(pos)
+            found.add(row)
+            # Skip the rest of this row; one hit is enough
+            pos = find(needle, self._next_row_offset(row))
+        return found
+
+    def _line_bounds(self, line: int) -> Tuple[int, int]:
+        start = self._line_starts[line]
+        if line + 1 < len(self._line_starts):
+            return start, self._line_starts[line + 1] - 1
+        return start, len(self._blob)
+
+    def _search_regex(self, pattern: str) -> Set[int]:
+        compiled = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+        found: Set[int] = set()
+        if not self.row_count:
+            return found
+
+        pos = 0
+        while pos < len(self._blob):
+            m = compiled.search(self._blob, pos)
+            if m is None:
+                break
+            row = self._row_at(m.start())
+            # A match spilling over a line break must be confirmed per name
+            if "\n" not in m.group(0) or any(
+                compiled.search(self._blob, *self._line_bounds(line))
+                for line in (row * 2, row * 2 + 1)
+            ):
+                found.add(row)
+            pos = self._next_row_offset(row)
+        return found
+
+    # -----------------------------------------------------
+    # Combined filter
+    # -----------------------------------------------------
+    def visible(
+        self,
+        mode: str = MODE_ALL,
+        category: str | None = None,
+        text: str = "",
+        regex: bool = False,
+    ) -> Set[int] | None:
+        """
+        Rows to show for the given filters, or None meaning "all rows".
+        Intersections start from the smallest set.
+        """
+        sets: List[Set[int]] = []
+
+        if category:
+            sets.append(self.by_category.get(category, set()))
+        if mode == MODE_CONFLICTS:
+            sets.append(self.conflicts)
+        elif mode == MODE_CHANGED:
+            sets.append(self.changed)
+        if text:
+            sets.append(self.search(text, regex))
+
+        if not sets:
+            return None
+
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result.intersection_update(other)
+            if not result:
+                break
+        return result
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from logger import setup_logger
+from fsbackend import FileSystem
+
+log = setup_logger().getChild("scanner")
+
+
+def _compile_globs(patterns: Iterable[str]) -> Tuple[re.Pattern | None, re.Pattern | None]:
+    """
+    One regex for name patterns and one for path patterns (those with a
+    "/", matched against the path relative to the scan root).
+    """
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    names, paths = [], []
+    for pattern in patterns:
+        pattern = pattern.strip().replace("\\", "/").strip("/")
+        if not pattern:
+            continue
+        (paths if "/" in pattern else names).append(fnmatch.translate(pattern))
+    name_re = re.compile("|".join(names), flags) if names else None
+    path_re = re.compile("|".join(paths), flags) if paths else None
+    return name_re, path_re
+
+
+# ---------------------------------------------------------
+# Scan filter
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class ScanFilter:
+    """
+    What the recursive scan descends into and which files it keeps.
+
+    include:     file globs; empty keeps every file
+    exclude:     file and directory globs; excluded directories are never opened
+    max_depth:   deepest folder level to enter (0 = only the chosen folder)
+    skip_hidden: do not enter dot-directories
+    min_size / max_size:     file size bounds in bytes (inclusive)
+    newer_than / older_than: mtime window in epoch seconds [newer_than, older_than)
+    follow_symlinks: descend into symlinked directories (loops are detected)
+
+    Globs without "/" match the name ("*.tmp", "node_modules"); globs with
+    "/" match the path relative to the scanned folder ("cache/*/thumbs").
+    """
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    max_depth: int | None = None
+    skip_hidden: bool = False
+    min_size: int | None = None
+    max_size: int | None = None
+    newer_than: float | None = None
+    older_than: float | None = None
+    follow_symlinks: bool = False
+
+    _include: tuple = field(init=False, repr=False, compare=False)
+    _exclude: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "include", tuple(self.include))
+        object.__setattr__(self, "exclude", tuple(self.exclude))
+        object.__setattr__(self, "_include", _compile_globs(self.include))
+        object.__setattr__(self, "_exclude", _compile_globs(self.exclude))
+
+    @property
+    def needs_stat(self) -> bool:
+        """True if file predicates need size or mtime."""
+        return any(v is not None for v in (self.min_size, self.max_size, self.newer_than, self.older_than))
+
+    @property
+    def needs_relpath(self) -> bool:
+        return self._include[1] is not None or self._exclude[1] is not None
+
+    @property
+    def is_noop(self) -> bool:
+        return self == NO_FILTER
+
+    @staticmethod
+    def _matches(compiled: tuple, name: str, rel: str | None) -> bool:
+        name_re, path_re = compiled
+        if name_re is not None and name_re.match(name):
+            return True
+        return path_re is not None and rel is not None and path_re.match(rel) is not None
+
+    def prune_dir(self, name: str, rel: str | None, depth: int) -> bool:
+        """True if the directory at this depth (root children = 1) is skipped."""
+        if self.max_depth is not None and depth > self.max_depth:
+            return True
+        if self.skip_hidden and name.startswith("."):
+            return True
+        return self._matches(self._exclude, name, rel)
+
+    def accept_file(self, name: str, rel: str | None, st: os.stat_result | None) -> bool:
+        if self._matches(self._exclude, name, rel):
+            return False
+        if (self._include[0] or self._include[1]) and not self._matches(self._include, name, rel):
+            return False
+        if st is not None:
+            if self.min_size is not None and st.st_size < self.min_size:
+                return False
+            if self.max_size is not None and st.st_size > self.max_size:
+                return False
+            if self.newer_than is not None and st.st_mtime < self.newer_than:
+                return False
+            if self.older_than is not None and st.st_mtime >= self.older_than:
+                return False
+        return True
+
+    # -----------------------------------------------------
+    # Serialization (CLI / settings)
+    # -----------------------------------------------------
+    def to_dict(self) -> Dict:
+        return {
+            "include": list(self.include),
+            "exclude": list(self.exclude),
+            "max_depth": self.max_depth,
+            "skip_hidden": self.skip_hidden,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "newer_than": self.newer_than,
+            "older_than": self.older_than,
+            "follow_symlinks": self.follow_symlinks,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict | None) -> "ScanFilter":
+        data = data or {}
+        return cls(
+            include=tuple(data.get("include") or ()),
+            exclude=tuple(data.get("exclude") or ()),
+            max_depth=data.get("max_depth"),
+            skip_hidden=bool(data.get("skip_hidden", False)),
+            min_size=data.get("min_size"),
+            max_size=data.get("max_size"),
+            newer_than=data.get("newer_than"),
+            older_than=data.get("older_than"),
+            follow_symlinks=bool(data.get("follow_symlinks", False)),
+        )
+
+
+NO_FILTER = ScanFilter()
+
+
+def split_globs(text: str) -> Tuple[str, ...]:
+    """Parse a comma- or semicolon-separated glob list from a text field."""
+    return tuple(p.strip() for p in re.split(r"[,;]", text or "") if p.strip())
+
+
+# ---------------------------------------------------------
+# Walk
+# ---------------------------------------------------------
+@dataclass
+class ScanResult:
+    # Files passing the filter, sorted by path
+    files: List[Path] = field(default_factory=list)
+    # Files seen in scanned folders but filtered out (still occupy names)
+    filtered: List[Path] = field(default_factory=list)
+    # stat results gathered during the walk (when a predicate needed them
+    # or the caller asked for them with with_stats)
+    stats: Dict[Path, os.stat_result] = field(default_factory=dict)
+    pruned_dirs: int = 0
+    # (duplicate path, kept path): same (device, inode) reached twice
+    duplicates: List[Tuple[Path, Path]] = field(default_factory=list)
+    # Directories skipped because they were already visited (symlink loops
+    # or several links to one folder)
+    revisited_dirs: int = 0
+    # Folders that could not be listed (permissions, vanished mid-scan);
+    # their files are left out of the plan
+    unreadable_dirs: List[Path] = field(default_factory=list)
+    # mtime_ns of every folder listed (root included); a later stat of
+    # each tells whether entries were added, removed or renamed since
+    dirs: Dict[Path, int] = field(default_factory=dict)
+
+
+def mtime_ns(st: os.stat_result) -> int:
+    """st_mtime_ns, or st_mtime scaled for stat results built from a tuple."""
+    ns = st.st_mtime_ns
+    return ns if ns is not None else int(st.st_mtime * 1e9)
+
+
+def _identity(dev: int, ino: int) -> int:
+    # One int instead of a (dev, ino) tuple: cheaper to hash and store
+    return (dev << 64) | ino
+
+
+def walk(
+    fs: FileSystem,
+    root: Path,
+    recursive: bool = True,
+    scan_filter: ScanFilter | None = None,
+    with_stats: bool = False,
+) -> ScanResult:
+    """
+    Scan root through the filesystem backend, applying scan_filter while
+    walking: pruned directories are never listed, and size/mtime
+    predicates use the directory entry's stat (one per file, only when
+    such a predicate is set). Symlinked directories are only descended
+    into with follow_symlinks (default off, matching Path.rglob).
+
+    Files are deduplicated by (device, inode): a file reachable under
+    several names (hardlinks, or a folder reached twice through symlinks)
+    is planned once, under its smallest path. The inode comes from the
+    directory entry and the device from the containing folder's stat, so
+    files cost no extra stat; directories cost one each, which also
+    detects symlink loops.
+
+    with_stats keeps a stat of every accepted file in result.stats, for
+    callers that order files by size or time without stat-ing them again.
+    """
+    flt = scan_filter or NO_FILTER
+    result = ScanResult()
+    needs_stat = flt.needs_stat
+    needs_rel = flt.needs_relpath
+    follow = flt.follow_symlinks
+
+    try:
+        root_st = fs.stat(root)
+        root_dev = root_st.st_dev
+        visited = {_identity(root_st.st_dev, root_st.st_ino)}
+        result.dirs[root] = mtime_ns(root_st)
+    except OSError:
+        root_dev, visited = 0, set()
+
+    # identity → kept path; files without a usable inode are never merged
+    by_identity: Dict[int, Path] = {}
+    pending: List[Tuple[Path, str, int, int]] = [(root, "", 0, root_dev)]
+
+    while pending:
+        current, rel, depth, dev = pending.pop()
+        try:
+            # Listed up front: backends may only fail once iterated
+            entries = list(fs.scandir(current))
+        except OSError as e:
+            log.error(f"[SCAN] Skipping unreadable folder {current}: {e}")
+            result.unreadable_dirs.append(current)
+            continue
+        for entry in entries:
+            name = entry.name
+            child_rel = (f"{rel}/{name}" if rel else name) if needs_rel else None
+            if entry.is_dir():
+                if not recursive:
+                    continue
+                is_link = entry.is_symlink()
+                if is_link and not follow:
+                    continue
+                if flt.prune_dir(name, child_rel, depth + 1):
+                    result.pruned_dirs += 1
+                    log.debug(f"[SCAN] Pruned {current / name}")
+                    continue
+                try:
+                    dst = entry.stat()
+                except OSError as e:
+                    log.debug(f"[SCAN] Cannot stat {current / name}: {e}")
+                    continue
+                identity = _identity(dst.st_dev, dst.st_ino)
+                if identity in visited:
+                    result.revisited_dirs += 1
+                    kind = "symlink loop or repeated link" if is_link else "bind mount"
+                    log.debug(f"[SCAN] Skipping already visited folder ({kind}): {current / name}")
+                    continue
+                visited.add(identity)
+                result.dirs[current / name] = mtime_ns(dst)
+                pending.append((current / name, child_rel or "", depth + 1, dst.st_dev))
+            elif entry.is_file():
+                path = current / name
+                st = None
+                if needs_stat:
+                    try:
+                        st = entry.stat()
+                    except OSError as e:
+                        log.debug(f"[SCAN] Cannot stat {path}: {e}")
+                        result.filtered.append(path)
+                        continue
+                if not flt.accept_file(name, child_rel, st):
+                    result.filtered.append(path)
+                    continue
+                if with_stats and st is None:
+                    try:
+                        st = entry.stat()
+                    except OSError as e:
+                        log.debug(f"[SCAN] Cannot stat {path}: {e}")
+                if st is not None:
+                    result.stats[path] = st
+
+                # A followed symlink's own inode says nothing about its target
+                if follow and entry.is_symlink():
+                    try:
+                        target = st or entry.stat()
+                        ino, file_dev = target.st_ino, target.st_dev
+                    except OSError:
+                        ino, file_dev = 0, dev
+                else:
+                    ino, file_dev = entry.inode(), dev
+                if not ino:
+                    result.files.append(path)
+                    continue
+
+                identity = _identity(file_dev, ino)
+                kept = by_identity.get(identity)
+                if kept is None:
+                    by_identity[identity] = path
+                else:
+                    if path < kept:
+                        by_identity[identity], path, kept = path, kept, path
+                    result.duplicates.append((path, kept))
+                    result.filtered.append(path)
+
+    result.files.extend(by_identity.values())
+    result.files.sort()
+    result.filtered.sort()
+    if result.duplicates or result.revisited_dirs:
+        log.info(
+            f"[SCAN] Deduplicated | duplicate_files={len(result.duplicates)} "
+            f"revisited_dirs={result.revisited_dirs}"
+        )
+    if not flt.is_noop:
+        log.debug(
+            f"[SCAN] Filter applied | kept={len(result.files)} filtered={len(result.filtered)} "
+            f"pruned_dirs={result.pruned_dirs}"
+        )
+    return result
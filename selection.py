@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+# popcount of every byte value, for bytes.translate()
+_POPCOUNT = bytes(bin(b).count("1") for b in range(256))
+
+
+class SelectionModel:
+    """
+    Checked state of the preview rows, by plan index.
+
+    Stored as a default state plus a bitset of the rows that differ from
+    it, with a running count of selected rows. The bitset is only
+    allocated by the first change that needs it, so resetting, selecting
+    or clearing everything, inverting, and reading the count are
+    constant time; per-row and range updates only touch the rows involved.
+    """
+
+    def __init__(self, size: int = 0, selected: bool = True):
+        self.reset(size, selected)
+
+    def reset(self, size: int, selected: bool = True) -> None:
+        self._size = size
+        self._default = selected
+        self._bits = None       # None: no row differs from the default
+        self._count = size if selected else 0
+
+    def _writable_bits(self) -> bytearray:
+        if self._bits is None:
+            self._bits = bytearray((self._size + 7) // 8)
+        return self._bits
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def count(self) -> int:
+        """Number of selected rows."""
+        return self._count
+
+    @property
+    def all_selected(self) -> bool:
+        return self._count == self._size
+
+    @property
+    def none_selected(self) -> bool:
+        return self._count == 0
+
+    def is_selected(self, i: int) -> bool:
+        bits = self._bits
+        if bits is None:
+            return self._default
+        return self._default != bool(bits[i >> 3] & (1 << (i & 7)))
+
+    def set(self, i: int, selected: bool) -> bool:
+        """Select or clear one row; returns True if its state changed."""
+        if self.is_selected(i) == selected:
+            return False
+        self._writable_bits()[i >> 3] ^= 1 << (i & 7)
+        self._count += 1 if selected else -1
+        return True
+
+    def set_all(self, selected: bool) -> None:
+        self.reset(self._size, selected)
+
+    def invert(self) -> None:
+        self._default = not self._default
+        self._count = self._size - self._count
+
+    def set_range(self, start: int, stop: int, selected: bool) -> None:
+        """Select or clear rows start..stop-1; whole bytes are filled at once."""
+        start, stop = max(start, 0), min(stop, self._size)
+        if start >= stop:
+            return
+        # Bits that differ from the default; selected rows are default XOR bit
+        flip = selected != self._default
+        head = min(stop, (start + 7) & ~7)
+        tail = max(head, stop & ~7)
+        for i in range(start, head):
+            self.set(i, selected)
+        if tail > head:
+            bits = self._writable_bits()
+            lo, hi = head >> 3, tail >> 3
+            before = sum(bits[lo:hi].translate(_POPCOUNT))
+            bits[lo:hi] = (b"\xff" if flip else b"\x00") * (hi - lo)
+            after = (hi - lo) * 8 if flip else 0
+            # Set bits mean selected when the default is cleared, and vice versa
+            self._count += (after - before) * (-1 if self._default else 1)
+        for i in range(tail, stop):
+            self.set(i, selected)
+
+    def set_many(self, indices: Iterable[int], selected: bool) -> int:
+        """Select or clear the given rows (e.g. a filter result); returns how many changed."""
+        changed = 0
+        for i in indices:
+            changed += self.set(i, selected)
+        return changed
+
+    def indices(self, selected: bool = True) -> Iterator[int]:
+        """Indices of the selected (or, with selected=False, cleared) rows, ascending."""
+        # Rows in the wanted state are those whose bit equals `want`
+        want = self._default != selected
+        bits = self._bits
+        size = self._size
+        if bits is None:
+            # Every row is in the default state
+            if not want:
+                yield from range(size)
+            return
+        # A byte with no such row is skipped without looking at its bits
+        skip = 0x00 if want else 0xFF
+        for byte_index, byte in enumerate(bits):
+            if byte == skip:
+                continue
+            base = byte_index << 3
+            for bit in range(min(8, size - base)):
+                if want == bool(byte & (1 << bit)):
+                    yield base + bit
@@ -0,0 +1,696 @@
+"""
+Long-running JSON-RPC 2.0 service, so other programs can plan, validate
+and execute renames without starting a Python process per call.
+
+    python cli.py serve --socket /run/user/1000/freshnamer.sock [--workers 4]
+    python cli.py serve --http 127.0.0.1:8765
+
+Unix socket: one JSON request per line, responses and notifications as
+lines on the same connection (several requests may be in flight).
+HTTP: POST a request to / with Content-Type: application/json; with
+"stream": true the reply is chunked JSON Lines, notifications first and
+the response last. Requests carrying an Origin header (sent by browsers)
+or a Host other than the listening address are refused, so web pages
+cannot reach the service; plan ids are random for the same reason.
+
+Methods (params by name):
+    ping                                → {"version", "uptime"}
+    plan      folder, config, recursive=false, selected_files, name_policy,
+              filter={include, exclude, max_depth, ...}, stream=false, chunk=1000
+                                        → {"plan_id", "operations", "conflicts", ...}
+    validate  plan_id                   → {"ok", "errors"}
+    execute   plan_id, rows, workers=4, verify=false, stream=false
+                                        → {"ok", "errors", "renamed", "failures"}
+    cancel    job                       → {"cancelled"}
+    release   plan_id                   → {"released"}
+    stats                               → jobs, plan cache and pool usage
+
+Plans stay in the service and are referred to by plan_id. Streamed
+calls send {"method": "job", "params": {"id", "job"}} first (the job id
+is what cancel takes), then "plan.operations" chunks of {"old", "new",
+"category"} records or "execute.progress" updates.
+
+Jobs run on a bounded pool; more than --queue waiting jobs are refused
+with SERVER_BUSY. Jobs on overlapping folders take turns (an execute
+excludes everything else under its folder); jobs on separate folders
+run side by side. Folder snapshots stay cached between requests (see
+engine.PlanCache).
+
+Jobs also take the cross-process folder locks (locks.py), so a GUI or
+cli.py run on an overlapping folder makes them fail with TREE_LOCKED,
+or wait up to "wait" seconds (a param of plan, validate and execute).
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import stat
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import engine
+from config import RenameConfig
+from engine import PlanCache, RenamePlan, build_multi_plan, execute_plan, plan_roots, validate_plan
+from locks import TreeLockedError, lock_trees
+from logger import setup_logger
+from scanner import ScanFilter
+
+log = setup_logger().getChild("service")
+
+PROTOCOL_VERSION = 1
+
+# JSON-RPC 2.0 error codes; -32000..-32099 are the server's own
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SERVER_BUSY = -32001
+UNKNOWN_PLAN = -32002
+JOB_CANCELLED = -32003
+TREE_LOCKED = -32004
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE = 64
+DEFAULT_CHUNK = 1000
+# Executed plans kept on the (process-wide) undo stack
+UNDO_DEPTH = 16
+
+_MISSING = object()
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_dict(self) -> Dict:
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+def _param(params: Dict, name: str, kind, default=_MISSING):
+    value = params.get(name, default)
+    if value is _MISSING:
+        raise RpcError(INVALID_PARAMS, f"Missing parameter '{name}'")
+    if value is not default and not isinstance(value, kind):
+        raise RpcError(INVALID_PARAMS, f"Parameter '{name}' has the wrong type")
+    return value
+
+
+def _scan_filter(spec: Dict | None) -> ScanFilter | None:
+    if not spec:
+        return None
+    try:
+        return ScanFilter(**{
+            k: tuple(v) if k in ("include", "exclude") else v
+            for k, v in spec.items()
+        })
+    except (TypeError, ValueError) as e:
+        raise RpcError(INVALID_PARAMS, f"Invalid filter: {e}")
+
+
+def _root_of(folder: str) -> Path:
+    return Path(os.path.abspath(folder))
+
+
+def _overlaps(a: Path, b: Path) -> bool:
+    return a == b or a in b.parents or b in a.parents
+
+
+# ---------------------------------------------------------
+# Jobs and per-folder scheduling
+# ---------------------------------------------------------
+class Job:
+    """One pooled request: what it touches and how to stop it."""
+
+    __slots__ = ("id", "method", "root", "exclusive", "cancel", "future", "fn", "started")
+
+    def __init__(self, job_id: str, method: str, root: Path, exclusive: bool, fn: Callable):
+        self.id = job_id
+        self.method = method
+        self.root = root
+        self.exclusive = exclusive
+        self.cancel = threading.Event()
+        self.future: Future = Future()
+        self.fn = fn
+        self.started = 0.0
+
+    def conflicts(self, other: "Job") -> bool:
+        return (self.exclusive or other.exclusive) and _overlaps(self.root, other.root)
+
+
+class _RootScheduler:
+    """
+    Hands jobs to the pool once no running job on an overlapping folder
+    conflicts. Waiting jobs do not hold a worker, and start in arrival
+    order per folder (a later job never overtakes an earlier one it
+    conflicts with).
+    """
+
+    def __init__(self, pool: ThreadPoolExecutor):
+        self._pool = pool
+        self._lock = threading.Lock()
+        self.running: List[Job] = []
+        self.waiting: deque = deque()
+
+    def submit(self, job: Job) -> None:
+        with self._lock:
+            self.waiting.append(job)
+            self._dispatch()
+
+    def drop_cancelled(self) -> None:
+        with self._lock:
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        blocked: List[Job] = []
+        for job in list(self.waiting):
+            if job.cancel.is_set():
+                self.waiting.remove(job)
+                job.future.set_exception(RpcError(JOB_CANCELLED, "Job cancelled before it started"))
+                continue
+            if any(job.conflicts(other) for other in self.running + blocked):
+                blocked.append(job)
+                continue
+            self.waiting.remove(job)
+            self.running.append(job)
+            self._pool.submit(self._run, job)
+
+    def _run(self, job: Job) -> None:
+        job.started = time.monotonic()
+        try:
+            job.future.set_result(job.fn(job))
+        except BaseException as e:
+            job.future.set_exception(e)
+        finally:
+            with self._lock:
+                self.running.remove(job)
+                self._dispatch()
+
+
+# ---------------------------------------------------------
+# Service
+# ---------------------------------------------------------
+class RenameService:
+    """
+    Transport-independent request handling. handle() answers immediate
+    methods itself and returns a Future for pooled ones; emit(method,
+    params) sends a notification to the caller of a streamed request.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, queue: int = DEFAULT_QUEUE, max_plans: int = 64):
+        self.workers = max(1, workers)
+        self.queue = max(0, queue)
+        self.max_plans = max_plans
+        self.cache = PlanCache()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="freshnamer-rpc")
+        self._scheduler = _RootScheduler(self._pool)
+        self._plans: OrderedDict = OrderedDict()  # plan_id → (root, RenamePlan)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._started = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel.set()
+        self._pool.shutdown(wait=True)
+
+    # -----------------------------------------------------
+    # Dispatch
+    # -----------------------------------------------------
+    def handle(self, method: str, params: Dict, emit: Callable[[str, Dict], None] | None = None):
+        """Result of an immediate method, or a Future for a pooled one. Raises RpcError."""
+        if not isinstance(params, dict):
+            raise RpcError(INVALID_PARAMS, "Params must be an object")
+        if method == "ping":
+            return {"version": PROTOCOL_VERSION, "uptime": round(time.monotonic() - self._started, 3)}
+        if method == "stats":
+            return self._stats()
+        if method == "cancel":
+            return self._cancel(_param(params, "job", str))
+        if method == "release":
+            with self._lock:
+                released = self._plans.pop(_param(params, "plan_id", str), None) is not None
+            return {"released": released}
+        if method == "plan":
+            root, exclusive, fn, emit = self._plan_job(params, emit)
+            return self._submit("plan", root, exclusive, fn, emit, params, [root])
+        if method == "validate":
+            root, plan = self._get_plan(params)
+            return self._submit("validate", root, False, lambda job: self._validate(plan), emit,
+                                params, plan_roots([plan]))
+        if method == "execute":
+            root, exclusive, fn, emit, plan = self._execute_job(params, emit)
+            return self._submit("execute", root, exclusive, fn, emit, params, plan_roots([plan]))
+        raise RpcError(METHOD_NOT_FOUND, f"Unknown method '{method}'")
+
+    def _submit(self, method: str, root: Path, exclusive: bool, fn: Callable, emit, params: Dict,
+                lock_roots: List[Path]) -> Future:
+        wait = _param(params, "wait", (int, float), 0)
+
+        def locked(job: Job):
+            # Other processes (GUI, cli.py, another service) working on these folders
+            try:
+                with lock_trees(lock_roots, exclusive, f"freshnamer service {method}", timeout=wait):
+                    return fn(job)
+            except TreeLockedError as e:
+                raise RpcError(TREE_LOCKED, str(e), {"holder": asdict(e.holder)})
+
+        with self._lock:
+            if len(self._jobs) >= self.workers + self.queue:
+                raise RpcError(SERVER_BUSY, f"Server busy ({len(self._jobs)} jobs)")
+            job = Job(f"j{next(self._ids)}", method, root, exclusive, locked)
+            self._jobs[job.id] = job
+        job.future.add_done_callback(lambda _f: self._forget(job))
+        if emit is not None:
+            emit("job", {"job": job.id})
+        log.info(f"[RPC] Job {job.id} queued | method={method} root={root}")
+        self._scheduler.submit(job)
+        return job.future
+
+    def _forget(self, job: Job) -> None:
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        elapsed = time.monotonic() - job.started if job.started else 0.0
+        log.info(f"[RPC] Job {job.id} finished | method={job.method} elapsed={elapsed:.3f}s")
+
+    def _cancel(self, job_id: str) -> Dict:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return {"cancelled": False}
+        job.cancel.set()
+        # A job still waiting for its folder is dropped right away
+        self._scheduler.drop_cancelled()
+        log.info(f"[RPC] Cancel requested | job={job_id}")
+        return {"cancelled": True}
+
+    def _stats(self) -> Dict:
+        with self._lock:
+            jobs = [
+                {"job": j.id, "method": j.method, "root": str(j.root), "running": j.started > 0}
+                for j in self._jobs.values()
+            ]
+            plans = len(self._plans)
+        return {
+            "workers": self.workers,
+            "queue": self.queue,
+            "jobs": jobs,
+            "plans": plans,
+            "plan_cache": {"hits": self.cache.hits, "misses": self.cache.misses},
+        }
+
+    # -----------------------------------------------------
+    # Methods
+    # -----------------------------------------------------
+    def _get_plan(self, params: Dict):
+        plan_id = _param(params, "plan_id", str)
+        with self._lock:
+            entry = self._plans.get(plan_id)
+        if entry is None:
+            raise RpcError(UNKNOWN_PLAN, f"Unknown plan '{plan_id}' (released or evicted)")
+        return entry
+
+    def _store_plan(self, root: Path, plan: RenamePlan) -> str:
+        with self._lock:
+            # Not guessable: a plan id is all execute needs
+            plan_id = f"p{secrets.token_hex(16)}"
+            self._plans[plan_id] = (root, plan)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return plan_id
+
+    def _plan_job(self, params: Dict, emit):
+        folder = _param(params, "folder", str)
+        try:
+            config = RenameConfig.from_dict(_param(params, "config", dict))
+        except ValueError as e:
+            raise RpcError(INVALID_PARAMS, str(e))
+        recursive = _param(params, "recursive", bool, False)
+        selected = _param(params, "selected_files", list, None)
+        name_policy = _param(params, "name_policy", str, None)
+        scan_filter = _scan_filter(_param(params, "filter", dict, None))
+        stream = _param(params, "stream", bool, False) and emit is not None
+        chunk = max(1, _param(params, "chunk", int, DEFAULT_CHUNK))
+        root = _root_of(folder)
+
+        def run(job: Job) -> Dict:
+            plan = build_multi_plan(
+                folder, config, recursive, selected, name_policy=name_policy,
+                scan_filter=scan_filter, cache=self.cache,
+            )
+            plan_id = self._store_plan(root, plan)
+            records = (
+                {"old": str(op.old_path), "new": str(op.new_path), "category": op.category}
+                for op in plan.operations
+            )
+            result = {
+                "plan_id": plan_id,
+                "operations": len(plan.operations),
+                "conflicts": list(plan.conflicts),
+                "skipped_counts": dict(plan.skipped_counts),
+                "name_policy": plan.name_policy,
+            }
+            if not stream:
+                result["renames"] = list(records)
+                return result
+            for offset in range(0, len(plan.operations), chunk):
+                if job.cancel.is_set():
+                    raise RpcError(JOB_CANCELLED, "Job cancelled", {"plan_id": plan_id})
+                emit("plan.operations", {
+                    "job": job.id, "offset": offset,
+                    "operations": list(itertools.islice(records, chunk)),
+                })
+            return result
+
+        return root, False, run, emit
+
+    def _validate(self, plan: RenamePlan) -> Dict:
+        ok, errors = validate_plan(plan)
+        return {"ok": ok, "errors": errors}
+
+    def _execute_job(self, params: Dict, emit):
+        plan_id = _param(params, "plan_id", str)
+        root, plan = self._get_plan(params)
+        rows = _param(params, "rows", list, None)
+        workers = max(1, _param(params, "workers", int, 4))
+        verify = _param(params, "verify", bool, False)
+        stream = _param(params, "stream", bool, False) and emit is not None
+        if rows is not None:
+            if not all(isinstance(i, int) and 0 <= i < len(plan.operations) for i in rows):
+                raise RpcError(INVALID_PARAMS, "Rows out of range")
+            plan = RenamePlan(
+                engine._select_operations(plan.operations, sorted(set(rows))),
+                list(plan.conflicts), [], plan.skipped_counts, plan.name_policy,
+            )
+
+        def run(job: Job) -> Dict:
+            ok, errors = validate_plan(plan)
+            if not ok:
+                return {"ok": False, "errors": errors, "renamed": 0, "failures": []}
+
+            def progress(p):
+                emit("execute.progress", {
+                    "job": job.id, "done": p.done, "total": p.total, "failures": p.failures,
+                    "elapsed": round(p.elapsed, 3), "cancelled": p.cancelled, "finished": p.finished,
+                })
+
+            renamed, failures = execute_plan(
+                plan, progress=progress if stream else None, cancel=job.cancel,
+                workers=workers, verify=verify,
+            )
+            with self._lock:
+                # An executed plan is spent; renames already happened
+                self._plans.pop(plan_id, None)
+                del engine._undo_stack[:-UNDO_DEPTH]
+            return {
+                "ok": True, "errors": [], "renamed": renamed, "failures": failures,
+                "cancelled": job.cancel.is_set(),
+            }
+
+        return root, True, run, emit, plan
+
+
+# ---------------------------------------------------------
+# Wire format
+# ---------------------------------------------------------
+def _response(req_id, result=None, error: RpcError | None = None) -> Dict:
+    if error is not None:
+        return {"jsonrpc": "2.0", "id": req_id, "error": error.to_dict()}
+    return {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+
+def _notification(method: str, params: Dict) -> Dict:
+    return {"jsonrpc": "2.0", "method": method, "params": params}
+
+
+def _parse(line: bytes):
+    """(id, method, params) of one request. Raises RpcError with the id known so far."""
+    try:
+        request = json.loads(line)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise RpcError(PARSE_ERROR, f"Parse error: {e}")
+    if not isinstance(request, dict):
+        raise RpcError(INVALID_REQUEST, "Request must be an object (batches are not supported)")
+    if request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+        raise RpcError(INVALID_REQUEST, "Not a JSON-RPC 2.0 request", {"id": request.get("id")})
+    return request.get("id"), request["method"], request.get("params", {})
+
+
+def _encode(message: Dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _call(service: RenameService, req_id, method: str, params, emit, send: Callable[[Dict], None]) -> Future | None:
+    """Run one request; send() gets the response now, or when its job finishes."""
+    try:
+        outcome = service.handle(method, params, emit)
+    except RpcError as e:
+        send(_response(req_id, error=e))
+        return None
+    if not isinstance(outcome, Future):
+        send(_response(req_id, outcome))
+        return None
+
+    def done(future: Future) -> None:
+        try:
+            send(_response(req_id, future.result()))
+        except RpcError as e:
+            send(_response(req_id, error=e))
+        except Exception as e:
+            log.exception(f"[RPC] {method} failed")
+            send(_response(req_id, error=RpcError(INTERNAL_ERROR, f"{type(e).__name__}: {e}")))
+
+    outcome.add_done_callback(done)
+    return outcome
+
+
+# ---------------------------------------------------------
+# Unix socket transport
+# ---------------------------------------------------------
+class _LineHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        service: RenameService = self.server.service
+        write_lock = threading.Lock()
+        pending: List[Future] = []
+
+        def send(message: Dict) -> None:
+            with write_lock:
+                try:
+                    self.wfile.write(_encode(message))
+                    self.wfile.flush()
+                except OSError:
+                    # Client went away; its jobs still run to completion
+                    pass
+
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                req_id, method, params = _parse(line)
+            except RpcError as e:
+                send(_response((e.data or {}).get("id"), error=e))
+                continue
+
+            def emit(name, data, req_id=req_id):
+                send(_notification(name, dict(data, id=req_id)))
+
+            stream = isinstance(params, dict) and params.get("stream") is True
+            future = _call(service, req_id, method, params, emit if stream else None, send)
+            if future is not None:
+                pending.append(future)
+                pending = [f for f in pending if not f.done()]
+
+        # Keep the connection until every answer is written
+        for future in pending:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+
+class UnixRpcServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, service: RenameService):
+        if os.path.exists(path):
+            # Only a socket left by a crashed server is replaced
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise OSError(f"{path} exists and is not a socket")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except OSError:
+                os.unlink(path)
+            else:
+                raise OSError(f"Another service is listening on {path}")
+            finally:
+                probe.close()
+        self.service = service
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _LineHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+# ---------------------------------------------------------
+# HTTP transport (localhost only)
+# ---------------------------------------------------------
+class _HttpHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FreshNamer/1"
+
+    def log_message(self, fmt: str, *args) -> None:
+        log.debug("[RPC] HTTP " + fmt % args)
+
+    def _send_json(self, status: int, message: Dict) -> None:
+        body = _encode(message)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _refuse(self, status: int, message: str) -> None:
+        log.info(f"[RPC] HTTP request refused ({status}): {message}")
+        self._send_json(status, _response(None, error=RpcError(INVALID_REQUEST, message)))
+        self.close_connection = True
+
+    def _allowed(self) -> bool:
+        """Only local programs: no browser requests (Origin), no DNS-rebound Host names."""
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self._refuse(415, "Content-Type must be application/json")
+            return False
+        if self.headers.get("Origin") is not None:
+            self._refuse(403, "Cross-origin requests are not accepted")
+            return False
+        if (self.headers.get("Host") or "").lower() not in self.server.allowed_hosts:
+            self._refuse(403, "Unexpected Host header")
+            return False
+        return True
+
+    def do_POST(self) -> None:
+        if not self._allowed():
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            req_id, method, params = _parse(self.rfile.read(length))
+        except RpcError as e:
+            self._send_json(200, _response((e.data or {}).get("id"), error=e))
+            return
+
+        if not (isinstance(params, dict) and params.get("stream") is True):
+            box: List[Dict] = []
+            answered = threading.Event()
+
+            def keep(message: Dict) -> None:
+                box.append(message)
+                answered.set()
+
+            _call(self.server.service, req_id, method, params, None, keep)
+            answered.wait()
+            self._send_json(200, box[0])
+            return
+
+        # Streamed: chunked JSON Lines, notifications then the response
+        write_lock = threading.Lock()
+        finished = threading.Event()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(message: Dict) -> None:
+            data = _encode(message)
+            with write_lock:
+                try:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                except OSError:
+                    pass
+
+        def send(message: Dict) -> None:
+            write_chunk(message)
+            finished.set()
+
+        def emit(name, data):
+            write_chunk(_notification(name, dict(data, id=req_id)))
+
+        _call(self.server.service, req_id, method, params, emit, send)
+        finished.wait()
+        with write_lock:
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+
+class HttpRpcServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, service: RenameService):
+        if host not in ("127.0.0.1", "::1", "localhost"):
+            raise ValueError(f"Refusing to listen on {host}: the service only binds to localhost")
+        self.service = service
+        super().__init__((host, port), _HttpHandler)
+        port = self.server_address[1]
+        names = {host, "localhost"}
+        self.allowed_hosts = {f"[{h}]:{port}" if ":" in h else f"{h}:{port}" for h in names}
+
+
+def serve(
+    socket_path: str | None = None,
+    http: str | None = None,
+    workers: int = DEFAULT_WORKERS,
+    queue: int = DEFAULT_QUEUE,
+) -> None:
+    """Run until interrupted. http is "HOST:PORT"."""
+    service = RenameService(workers, queue)
+    if socket_path:
+        server = UnixRpcServer(socket_path, service)
+        where = socket_path
+    else:
+        host, _, port = (http or "").rpartition(":")
+        server = HttpRpcServer(host or "127.0.0.1", int(port), service)
+        where = f"http://{host or '127.0.0.1'}:{server.server_address[1]}/"
+    log.info(f"[RPC] Serving on {where} | workers={service.workers} queue={service.queue}")
+    print(f"FreshNamer service listening on {where}", flush=True)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # Shut down cleanly (running jobs cancelled, socket removed) on SIGTERM too
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
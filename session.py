@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Set
+
+from logger import setup_logger
+from engine import RenamePlan
+from paths import cache_dir
+
+log = setup_logger().getChild("session")
+
+SESSION_FILE = "session.json"
+SNAPSHOT_FILE = "last_plan.fnplan"
+
+
+@dataclass
+class Session:
+    folder: str
+    recursive: bool
+    config: Dict
+    plan: RenamePlan | None
+    saved_at: float
+
+
+@dataclass
+class PlanDiff:
+    """
+    Row-level difference between a cached plan and a fresh one,
+    keyed by source path.
+    """
+    index_of: Dict[Path, int] = field(default_factory=dict)   # old_path → index in new plan
+    changed: Set[Path] = field(default_factory=set)           # new name or category differs
+    removed: Set[Path] = field(default_factory=set)           # no longer in the plan
+    added: List[int] = field(default_factory=list)            # new-plan indices not in the cache
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.changed or self.removed or self.added)
+
+
+# ---------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------
+def save_session(folder: str, recursive: bool, config: Dict, plan: RenamePlan | None = None) -> None:
+    """
+    Remember the last folder, its settings and a compact snapshot of
+    the last plan. Failures are logged, never raised.
+    """
+    from planio import export_plan
+
+    directory = Path(cache_dir())
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        has_snapshot = plan is not None and len(plan.operations) > 0
+        # A plan still mapped from the snapshot is already on disk
+        if has_snapshot and getattr(plan.operations, "path", None) != directory / SNAPSHOT_FILE:
+            export_plan(plan, directory / SNAPSHOT_FILE)
+
+        data = {
+            "folder": folder,
+            "recursive": recursive,
+            "config": config,
+            "snapshot": SNAPSHOT_FILE if has_snapshot else None,
+            "saved_at": time.time(),
+        }
+        tmp = directory / (SESSION_FILE + ".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, directory / SESSION_FILE)
+        log.info(f"[SESSION] Saved | folder={folder} snapshot={has_snapshot}")
+    except (OSError, TypeError, ValueError) as e:
+        log.error(f"[SESSION] Could not save session: {e}")
+
+
+def load_session() -> Session | None:
+    """
+    Load the last session. The plan snapshot is memory-mapped, so this
+    returns immediately even for very large plans.
+    """
+    from planio import import_plan, PlanFormatError
+
+    directory = Path(cache_dir())
+    try:
+        data = json.loads((directory / SESSION_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.error(f"[SESSION] Ignoring unreadable session: {e}")
+        return None
+
+    if not data.get("folder"):
+        return None
+
+    plan = None
+    if data.get("snapshot"):
+        try:
+            plan = import_plan(directory / data["snapshot"])
+        except (OSError, PlanFormatError) as e:
+            log.error(f"[SESSION] Ignoring plan snapshot: {e}")
+
+    log.info(f"[SESSION] Loaded | folder={data['folder']} snapshot={plan is not None}")
+    return Session(
+        folder=data["folder"],
+        recursive=bool(data.get("recursive", False)),
+        config=data.get("config") or {},
+        plan=plan,
+        saved_at=data.get("saved_at", 0.0),
+    )
+
+
+# ---------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------
+def diff_plans(cached: RenamePlan, fresh: RenamePlan) -> PlanDiff:
+    """
+    Compare the plan restored from the last session with the one just
+    built, so the preview can be patched row by row instead of rebuilt.
+    """
+    diff = PlanDiff()
+    fresh_index = {op.old_path: i for i, op in enumerate(fresh.operations)}
+    seen: Set[int] = set()
+
+    for op in cached.operations:
+        i = fresh_index.get(op.old_path)
+        if i is None:
+            diff.removed.add(op.old_path)
+            continue
+        seen.add(i)
+        diff.index_of[op.old_path] = i
+        new_op = fresh.operations[i]
+        if new_op.new_path != op.new_path or new_op.category != op.category:
+            diff.changed.add(op.old_path)
+
+    diff.added = [i for i in range(len(fresh.operations)) if i not in seen]
+    log.debug(
+        f"[SESSION] Reconciled | changed={len(diff.changed)} removed={len(diff.removed)} "
+        f"added={len(diff.added)}"
+    )
+    return diff
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+# Keep the files the app writes during the test run out of the user's folders.
+# Set before the modules under test are imported: paths are read at import time.
+_state = tempfile.mkdtemp(prefix="freshnamer-tests-")
+for _name, _sub in (
+    ("FRESHNAMER_LOG_DIR", "logs"),
+    ("FRESHNAMER_CACHE_DIR", "cache"),
+    ("FRESHNAMER_STATE_DIR", "state"),
+    ("FRESHNAMER_CONFIG_DIR", "config"),
+    ("FRESHNAMER_LOCK_DIR", "locks"),
+):
+    os.environ[_name] = os.path.join(_state, _sub)
+os.environ.pop("FRESHNAMER_NAME_POLICY", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _clean_undo_stack():
+    import engine
+    saved = list(engine._undo_stack)
+    engine._undo_stack.clear()
+    yield
+    engine._undo_stack[:] = saved
+
+
+@pytest.fixture
+def make_files(tmp_path):
+    """make_files("a.jpg", "sub/b.jpg", ...) creates empty files under tmp_path; returns tmp_path."""
+    def make(*names, data=b""):
+        for name in names:
+            path = tmp_path / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        return tmp_path
+    return make
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from contextlib import contextmanager
+
+import pytest
+
+import aio
+import engine
+from aio import AsyncRenamer
+from fsbackend import LatencyFileSystem, OsFileSystem
+from locks import TreeLockedError, held_locks, lock_trees
+
+CONFIG = {"image": {"enabled": True, "prefix": "img_", "padding": 3, "start": 1}}
+
+
+@pytest.fixture(autouse=True)
+def _locks(tmp_path_factory, monkeypatch):
+    monkeypatch.setenv("FRESHNAMER_LOCK_DIR", str(tmp_path_factory.mktemp("locks")))
+
+
+def _slow(latency=0.01):
+    return LatencyFileSystem(OsFileSystem(), latency=latency, fail_ops=set())
+
+
+def _names(folder):
+    return sorted(p.name for p in folder.iterdir())
+
+
+def test_plan_validate_execute_undo(make_files):
+    folder = make_files(*(f"f{i}.jpg" for i in range(5)))
+
+    async def main():
+        async with AsyncRenamer(workers=2, fs_calls=2) as renamer:
+            plan = await renamer.plan(str(folder), CONFIG)
+            ops = [op async for op in renamer.operations(plan, chunk=2)]
+            assert len(ops) == 5
+            assert await renamer.validate(plan) == (True, [])
+
+            run = renamer.execute(plan, batch=2)
+            updates = [p async for p in run]
+            assert await run == (5, [])
+            assert updates[-1].finished and updates[-1].done == 5
+            assert _names(folder) == [f"img_{i:03d}.jpg" for i in range(1, 6)]
+
+            assert await renamer.undo() == (5, [])
+            assert _names(folder) == [f"f{i}.jpg" for i in range(5)]
+
+    asyncio.run(main())
+    assert held_locks() == []
+
+
+@pytest.mark.parametrize("how", ["run", "awaiting task"])
+def test_cancelled_execute_stops_and_releases_locks(make_files, how):
+    folder = make_files(*(f"f{i:02d}.jpg" for i in range(40)))
+
+    async def main():
+        async with AsyncRenamer(fs=_slow()) as renamer:
+            plan = await renamer.plan(str(folder), CONFIG)
+            run = renamer.execute(plan, batch=1)
+            waiter = asyncio.ensure_future(run)
+            async for progress in run:
+                if progress.done >= 3:
+                    break
+            if how == "run":
+                run.cancel()
+            else:
+                waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert run.done()
+
+    asyncio.run(main())
+
+    renamed = [n for n in _names(folder) if n.startswith("img_")]
+    assert 3 <= len(renamed) < 40
+    # The undo stack holds exactly what was renamed before the cancel
+    assert len(engine._undo_stack[-1].operations) == len(renamed)
+    assert held_locks() == []
+    with lock_trees([folder]):
+        pass
+
+
+def test_cancelled_plan_stops_scanning(make_files):
+    folder = make_files(*(f"d{i}/f.jpg" for i in range(50)))
+    fs = _slow(0.02)
+
+    async def main():
+        async with AsyncRenamer(fs=fs) as renamer:
+            task = asyncio.ensure_future(renamer.plan(str(folder), CONFIG, recursive=True))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        # close() waited for the worker: it gave up well before listing every folder
+        return fs.calls.get("scandir", 0)
+
+    assert asyncio.run(main()) < 40
+    assert held_locks() == []
+
+
+def test_busy_folder(make_files):
+    folder = make_files("a.jpg")
+
+    async def main():
+        with lock_trees([folder], purpose="other job"):
+            async with AsyncRenamer(lock_wait=0) as renamer:
+                with pytest.raises(TreeLockedError):
+                    await renamer.plan(str(folder), CONFIG)
+
+            async with AsyncRenamer(lock_wait=None) as renamer:
+                # Cancelled while waiting for the lock: nothing stays held afterwards
+                task = asyncio.ensure_future(renamer.plan(str(folder), CONFIG))
+                await asyncio.sleep(0.3)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                assert len(held_locks()) == 1
+
+        async with AsyncRenamer(lock_wait=5) as renamer:
+            holder = lock_trees([folder])
+            holder.__enter__()
+            asyncio.get_running_loop().call_later(0.3, holder.__exit__, None, None, None)
+            plan = await renamer.plan(str(folder), CONFIG)
+            assert len(plan.operations) == 1
+
+    asyncio.run(main())
+    assert held_locks() == []
+
+
+def test_cancelled_while_lock_is_granted(make_files, monkeypatch):
+    folder = make_files("a.jpg")
+    released = []
+
+    @contextmanager
+    def slow_lock_trees(*args, **kwargs):
+        time.sleep(0.3)
+        with lock_trees(*args, **kwargs) as held:
+            yield held
+            # Not reached when the lock is only dropped by garbage collection
+            released.append(True)
+
+    monkeypatch.setattr(aio, "lock_trees", slow_lock_trees)
+
+    async def main():
+        async with AsyncRenamer() as renamer:
+            task = asyncio.ensure_future(renamer.plan(str(folder), CONFIG))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        # The lock arrived after the cancel and was dropped straight away
+        await asyncio.sleep(0)
+        assert released == [True]
+        assert held_locks() == []
+
+    asyncio.run(main())
+
+
+def test_undo_locks_the_level_it_undoes(tmp_path, monkeypatch):
+    first, second = tmp_path / "first", tmp_path / "second"
+    for folder in (first, second):
+        folder.mkdir()
+        (folder / "a.jpg").write_bytes(b"")
+    locked = []
+
+    def recording_lock_trees(roots, *args, **kwargs):
+        locked.append(set(roots))
+        return lock_trees(roots, *args, **kwargs)
+
+    monkeypatch.setattr(aio, "lock_trees", recording_lock_trees)
+
+    async def main():
+        async with AsyncRenamer(lock_wait=5) as renamer:
+            assert await renamer.execute(await renamer.plan(str(first), CONFIG)) == (1, [])
+            with lock_trees([first]):
+                run = renamer.undo()
+                await asyncio.sleep(0.2)
+                # Another run lands on top of the stack while the undo waits
+                engine.execute_plan(engine.build_multi_plan(str(second), CONFIG, False))
+            assert await run == (1, [])
+
+    asyncio.run(main())
+    assert _names(second) == ["a.jpg"] and _names(first) == ["img_001.jpg"]
+    assert locked[-1] == {second}
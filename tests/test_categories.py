@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import categories
+from categories import CategoryRegistry, load_categories, reload_registry
+from engine import build_multi_plan
+
+
+@pytest.fixture
+def registry():
+    return CategoryRegistry({"image": ["jpg", ".JPEG"], "archive": [".zip", ".tar.gz", ".gz"]})
+
+
+def test_classify(registry):
+    assert registry.classify("IMG.JPG") == "image"
+    assert registry.classify("photo.jpeg") == "image"
+    assert registry.classify("notes.txt") is None
+    assert registry.classify("noext") is None
+    assert registry.classify(".jpg") is None  # a dotfile, not an extension
+
+
+def test_longest_extension_wins(registry):
+    assert registry.match("backup.tar.gz") == ("archive", 7)
+    assert registry.split("backup.tar.gz") == ("backup", ".tar.gz")
+    assert registry.split("log.gz") == ("log", ".gz")
+    assert registry.split("a.b.unknown") == ("a.b", ".unknown")
+    assert registry.split("README") == ("README", "")
+
+
+def test_user_file_extends_and_replaces(tmp_path):
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps({
+        "image": {"extend": [".cr3"]},
+        "archive": [".zip", ".tar.gz"],
+        "bad": 3,
+    }), encoding="utf-8")
+    merged = load_categories(str(path))
+    assert ".cr3" in merged["image"] and ".jpg" in merged["image"]
+    assert merged["archive"] == [".zip", ".tar.gz"]
+    assert "bad" not in merged
+
+
+def test_unreadable_user_file_falls_back(tmp_path):
+    path = tmp_path / "categories.json"
+    path.write_text("{broken", encoding="utf-8")
+    assert load_categories(str(path)) == load_categories(str(tmp_path / "missing.json"))
+
+
+def test_plan_uses_custom_category(tmp_path, make_files, monkeypatch):
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps({"archive": [".tar.gz"]}), encoding="utf-8")
+    monkeypatch.setattr(categories, "_registry", None)
+    reload_registry(str(path))
+    folder = make_files("backup.tar.gz", "a.jpg")
+    config = {"archive": {"enabled": True, "prefix": "bk_", "start": 1}}
+    plan = build_multi_plan(str(folder), config, False)
+    assert [(op.old_path.name, op.new_path.name) for op in plan.operations] == [("backup.tar.gz", "bk_1.tar.gz")]
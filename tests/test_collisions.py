@@ -0,0 +1,30 @@
+from pathlib import Path, PureWindowsPath
+
+from collisions import CollisionIndex, NamePolicy
+
+CASEFOLD = NamePolicy(case_insensitive=True)
+
+
+def test_case_only_rename_is_not_a_noop():
+    index = CollisionIndex(CASEFOLD)
+    assert index.is_noop(Path("/d/a.jpg"), Path("/d/a.jpg"))
+    assert not index.is_noop(Path("/d/A.jpg"), Path("/d/a.jpg"))
+    # PureWindowsPath("A") == PureWindowsPath("a"), but the rename still has to happen
+    assert not index.is_noop(PureWindowsPath("C:/d/IMG.JPG"), PureWindowsPath("C:/d/img.jpg"))
+
+
+def test_every_existing_twin_is_checked():
+    index = CollisionIndex(CASEFOLD)
+    index.add_existing(Path("/d/A.jpg"))
+    index.add_existing(Path("/d/a.jpg"))
+    index.add_rename(Path("/d/A.jpg"), Path("/d/a.JPG"), "image")
+    # A.jpg moves away, but a.jpg stays where the target lands
+    assert index.conflicts() == ["Target already exists: /d/a.JPG (as 'a.jpg')"]
+
+
+def test_target_freed_by_its_own_rename():
+    index = CollisionIndex(CASEFOLD)
+    index.add_existing(Path("/d/A.jpg"))
+    index.add_rename(Path("/d/A.jpg"), Path("/d/a.jpg"), "image")
+    assert index.conflicts() == []
+
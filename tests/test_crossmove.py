@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import crossmove
+from crossmove import (
+    STATE_BEGIN, STATE_COPIED, STATE_DONE, STATE_FAILED, MoveJournal, move_file, resume_moves,
+)
+from engine import build_multi_plan, execute_plan, undo_last_rename
+
+
+@pytest.fixture(autouse=True)
+def _state_dir(tmp_path, monkeypatch):
+    state = tmp_path / "state"
+    monkeypatch.setenv("FRESHNAMER_STATE_DIR", str(state))
+    return state
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "in" / "a.bin"
+    path.parent.mkdir()
+    path.write_bytes(b"payload" * 1000)
+    return path
+
+
+def _states(journal):
+    with open(journal.path, encoding="utf-8") as fh:
+        return [json.loads(line)["state"] for line in fh]
+
+
+def _write_journal(path, *entries):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        for state, s, d in entries:
+            fh.write(json.dumps({"state": state, "src": str(s), "dst": str(d)}) + "\n")
+
+
+def test_move_records_every_step(src, tmp_path):
+    dst = tmp_path / "out.bin"
+    journal = MoveJournal()
+    move_file(src, dst, verify=True, journal=journal)
+    assert not src.exists()
+    assert dst.read_bytes() == b"payload" * 1000
+    assert _states(journal) == [STATE_BEGIN, STATE_COPIED, STATE_DONE]
+    assert journal.pending() == []
+    journal.clear()
+    assert not journal.path.exists()
+
+
+def test_failed_move_is_not_resumed(src, tmp_path, monkeypatch):
+    dst = tmp_path / "out.bin"
+    digests = iter(["a", "b"])
+    monkeypatch.setattr(crossmove, "file_digest", lambda path: next(digests))
+    journal = MoveJournal()
+    with pytest.raises(OSError, match="Checksum mismatch"):
+        move_file(src, dst, verify=True, journal=journal)
+    assert src.exists() and not dst.exists()
+    assert _states(journal) == [STATE_BEGIN, STATE_FAILED]
+    assert journal.pending() == []
+    journal.close()
+
+    # The user was told it failed: resume leaves it alone
+    monkeypatch.undo()
+    assert resume_moves(journal) == (0, [])
+    assert src.exists() and not dst.exists()
+
+
+def test_failed_source_unlink_is_resumed(src, tmp_path, monkeypatch):
+    dst = tmp_path / "out.bin"
+    unlink = os.unlink
+
+    def refuse_source(path, *args, **kwargs):
+        if Path(path) == src:
+            raise PermissionError(13, "Permission denied", str(path))
+        return unlink(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "unlink", refuse_source)
+    journal = MoveJournal()
+    with pytest.raises(PermissionError):
+        move_file(src, dst, journal=journal)
+    # The finished copy is kept for resume_moves()
+    assert src.exists() and dst.read_bytes() == b"payload" * 1000
+    assert _states(journal) == [STATE_BEGIN, STATE_COPIED]
+    journal.close()
+
+    monkeypatch.setattr(os, "unlink", unlink)
+    assert resume_moves(journal) == (1, [])
+    assert not src.exists() and dst.exists()
+
+
+def test_move_never_overwrites(src, tmp_path):
+    dst = tmp_path / "out.bin"
+    dst.write_bytes(b"other")
+    journal = MoveJournal()
+    with pytest.raises(FileExistsError):
+        move_file(src, dst, journal=journal)
+    assert dst.read_bytes() == b"other" and src.exists()
+    assert journal.pending() == []
+
+
+def test_resume_finishes_copied_and_redoes_begin(tmp_path, _state_dir):
+    copied_src, copied_dst = tmp_path / "c.bin", tmp_path / "c-out.bin"
+    copied_src.write_bytes(b"c")
+    copied_dst.write_bytes(b"c")
+    begun_src, begun_dst = tmp_path / "b.bin", tmp_path / "b-out.bin"
+    begun_src.write_bytes(b"full contents")
+    begun_dst.write_bytes(b"ful")  # torn copy
+    _write_journal(
+        _state_dir / "move-journal-1-1.jsonl",
+        (STATE_BEGIN, copied_src, copied_dst), (STATE_COPIED, copied_src, copied_dst),
+        (STATE_BEGIN, begun_src, begun_dst),
+    )
+
+    assert resume_moves() == (2, [])
+    assert not copied_src.exists() and copied_dst.read_bytes() == b"c"
+    assert not begun_src.exists() and begun_dst.read_bytes() == b"full contents"
+    assert crossmove.journal_paths() == []
+
+
+def test_resume_skips_journal_of_running_move(tmp_path, src):
+    running = MoveJournal()
+    running.record(STATE_BEGIN, src, tmp_path / "out.bin")
+    try:
+        assert resume_moves() == (0, [])
+        assert src.exists()
+        assert running.path.exists()
+    finally:
+        running.close()
+
+
+def _other_device(path: Path):
+    for candidate in ("/dev/shm", tempfile.gettempdir()):
+        if os.path.isdir(candidate) and os.access(candidate, os.W_OK) \
+                and os.stat(candidate).st_dev != os.stat(path).st_dev:
+            return Path(tempfile.mkdtemp(dir=candidate))
+    return None
+
+
+def test_plan_into_destination_on_another_device(make_files):
+    folder = make_files("a.jpg", "sub/b.jpg")
+    dest = _other_device(folder)
+    if dest is None:
+        pytest.skip("no second filesystem to move to")
+    config = {"image": {"enabled": True, "prefix": "img_", "start": 1}}
+    plan = build_multi_plan(str(folder), config, True, destination=str(dest))
+    assert sorted(str(op.new_path.relative_to(dest)) for op in plan.operations) == [
+        "img_1.jpg", os.path.join("sub", "img_2.jpg"),
+    ]
+    assert execute_plan(plan) == (2, [])
+    assert (dest / "img_1.jpg").exists() and (dest / "sub" / "img_2.jpg").exists()
+    assert not (folder / "a.jpg").exists()
+
+    restored, errors = undo_last_rename()
+    assert (restored, errors) == (2, [])
+    assert (folder / "a.jpg").exists() and (folder / "sub" / "b.jpg").exists()
@@ -0,0 +1,110 @@
+from pathlib import Path
+
+import pytest
+
+import engine
+from engine import (
+    CompactOperations, RenameOperation, build_multi_plan, execute_plan, undo_last_rename, validate_plan,
+)
+from fsbackend import LatencyFileSystem, MemoryFileSystem
+
+
+def _advanced(pattern):
+    return {"image": {"enabled": True, "mode": "advanced", "advanced": pattern, "padding": 2, "start": 1}}
+
+
+@pytest.mark.parametrize("pattern", ["{num:abc}", "{original!z}", "{original[5]}", "{original:d}", "{num.real.x}"])
+def test_bad_format_spec_becomes_plan_message(make_files, pattern):
+    folder = make_files("a.jpg", "b.jpg")
+    plan = build_multi_plan(str(folder), _advanced(pattern), False)
+    assert len(plan.operations) == 0
+    assert any("Invalid pattern for 'image'" in c for c in plan.conflicts)
+
+
+def test_advanced_pattern_renders(make_files):
+    folder = make_files("a.jpg", "b.jpg")
+    plan = build_multi_plan(str(folder), _advanced("{original}_{num_padded}"), False)
+    assert sorted(op.new_path.name for op in plan.operations) == ["a_01.jpg", "b_02.jpg"]
+
+
+def _regex(pattern, replace):
+    return {"image": {"enabled": True, "mode": "regex", "regex_pattern": pattern, "regex_replace": replace}}
+
+
+def test_regex_renames_stems(make_files):
+    folder = make_files("IMG_1.jpg", "IMG_2.jpg", "other.jpg")
+    plan = build_multi_plan(str(folder), _regex(r"^IMG_(\d+)$", r"photo-\1"), False)
+    assert sorted(op.new_path.name for op in plan.operations) == ["photo-1.jpg", "photo-2.jpg"]
+    assert plan.skipped_counts["no_match"] == 1 and not plan.conflicts
+
+
+@pytest.mark.parametrize("pattern, replace", [(r"^(\w)_", r"\1/"), (r".+", "")])
+def test_regex_result_that_is_not_a_file_name_is_a_conflict(make_files, pattern, replace):
+    folder = make_files("a_1.jpg", "b_2.jpg")
+    plan = build_multi_plan(str(folder), _regex(pattern, replace), False)
+    assert len(plan.operations) == 0
+    assert len(plan.conflicts) == 2 and all("for 'a_1.jpg'" in c or "for 'b_2.jpg'" in c for c in plan.conflicts)
+    assert validate_plan(plan)[0] is False
+
+
+def test_execute_and_undo(make_files):
+    folder = make_files("a.jpg", "b.jpg")
+    config = {"image": {"enabled": True, "prefix": "img_", "padding": 3, "start": 1}}
+    plan = build_multi_plan(str(folder), config, False)
+    assert validate_plan(plan) == (True, [])
+    renamed, failures = execute_plan(plan)
+    assert (renamed, failures) == (2, [])
+    assert sorted(p.name for p in folder.iterdir()) == ["img_001.jpg", "img_002.jpg"]
+    restored, errors = undo_last_rename()
+    assert restored == 2 and not errors
+    assert sorted(p.name for p in folder.iterdir()) == ["a.jpg", "b.jpg"]
+
+
+def test_failed_run_keeps_successful_renames_undoable():
+    mem = MemoryFileSystem([f"/m/{i:02d}.jpg" for i in range(20)])
+    plan = build_multi_plan("/m", {"image": {"enabled": True, "prefix": "img_", "start": 1}}, False, fs=mem)
+    fs = LatencyFileSystem(mem, latency=0.0, failure_rate=0.5, seed=3)
+    renamed, failures = execute_plan(plan, fs)
+    assert 0 < renamed < 20 and len(failures) == 20 - renamed
+    # Exactly the renames that happened are on the undo stack
+    assert len(engine._undo_stack[-1].operations) == renamed
+
+    assert undo_last_rename(mem) == (renamed, [])
+    assert mem.files() == [Path(f"/m/{i:02d}.jpg") for i in range(20)]
+
+
+@pytest.mark.parametrize("strategy", ["fill", "append"])
+def test_selection_keeps_numbers_of_files_left_out(make_files, strategy):
+    folder = make_files("IMG_001.jpg", "IMG_003.jpg", "DSC.jpg")
+    config = {"image": {"enabled": True, "prefix": "IMG_", "padding": 3, "start": 1, "renumber": strategy}}
+    expected = "IMG_002.jpg" if strategy == "fill" else "IMG_004.jpg"
+
+    full = build_multi_plan(str(folder), config, False)
+    assert [(op.old_path.name, op.new_path.name) for op in full.operations] == [("DSC.jpg", expected)]
+
+    # What the GUI executes: the checked rows of the preview
+    selected = build_multi_plan(str(folder), config, False, selected_files=["DSC.jpg"])
+    assert [op.new_path.name for op in selected.operations] == [expected]
+    assert validate_plan(selected) == (True, [])
+    assert execute_plan(selected) == (1, [])
+
+
+def test_selection_shift_matches_full_plan(make_files):
+    folder = make_files("a.jpg", "b.jpg", "c.jpg")
+    config = {"image": {"enabled": True, "prefix": "p", "padding": 1, "start": 1}}
+    plan = build_multi_plan(str(folder), config, False, selected_files=["c.jpg"])
+    assert [op.new_path.name for op in plan.operations] == ["p3.jpg"]
+
+
+def test_compact_subset_copies_only_its_names():
+    ops = CompactOperations(
+        RenameOperation(Path(f"/m/{i:04d}.jpg"), Path(f"/m/img_{i:04d}.jpg"), "image") for i in range(1000)
+    )
+    ops.set_flag(7, 1)
+    sub = ops[5:8]
+    assert list(sub) == list(ops)[5:8]
+    assert [sub.flags(i) for i in range(3)] == [0, 0, 1]
+    assert len(sub._names) == sum(len(f"{i:04d}.jpgimg_{i:04d}.jpg") for i in range(5, 8))
+    assert sub.nbytes() < ops.nbytes() / 10
+    # Taking a subset of a subset still finds the right names
+    assert list(sub[::-2]) == [ops[7], ops[5]]
@@ -0,0 +1,109 @@
+import errno
+import os
+import shutil
+
+import pytest
+
+import crossmove
+import fastcopy
+from fastcopy import ShortCopyError, clone_file, copy_data
+
+DATA = os.urandom(200_000)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_support_table(monkeypatch):
+    monkeypatch.setattr(fastcopy, "_unsupported", set())
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "src.bin"
+    path.write_bytes(DATA)
+    return path
+
+
+def _no_reflink(monkeypatch):
+    def refuse(src_fd, dst_fd):
+        raise OSError(errno.EOPNOTSUPP, "no reflink")
+    monkeypatch.setattr(fastcopy, "_reflink", refuse)
+
+
+def test_clone_prefers_hardlink(source, tmp_path):
+    dst = tmp_path / "link.bin"
+    assert clone_file(source, dst) == fastcopy.METHOD_HARDLINK
+    assert os.stat(dst).st_ino == os.stat(source).st_ino
+
+
+def test_clone_without_hardlink_copies(source, tmp_path, monkeypatch):
+    _no_reflink(monkeypatch)
+    dst = tmp_path / "copy.bin"
+    method = clone_file(source, dst, allow_hardlink=False)
+    assert method in (fastcopy.METHOD_COPY_FILE_RANGE, fastcopy.METHOD_SENDFILE, fastcopy.METHOD_COPY)
+    assert dst.read_bytes() == DATA
+    assert os.stat(dst).st_ino != os.stat(source).st_ino
+
+
+def test_clone_never_overwrites(source, tmp_path):
+    dst = tmp_path / "taken.bin"
+    dst.write_bytes(b"keep")
+    with pytest.raises(FileExistsError):
+        clone_file(source, dst, allow_hardlink=False)
+    assert dst.read_bytes() == b"keep"
+
+
+def test_unsupported_method_is_remembered(source, tmp_path, monkeypatch):
+    calls = []
+
+    def refuse(src_fd, dst_fd):
+        calls.append(1)
+        raise OSError(errno.EOPNOTSUPP, "no reflink")
+
+    monkeypatch.setattr(fastcopy, "_reflink", refuse)
+    if not any(m == fastcopy.METHOD_REFLINK for m, _ in fastcopy._data_methods()):
+        pytest.skip("no reflink on this platform")
+    copy_data(source, tmp_path / "a.bin")
+    copy_data(source, tmp_path / "b.bin")
+    assert len(calls) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "copy_file_range"), reason="needs copy_file_range")
+def test_short_kernel_copy_falls_back(source, tmp_path, monkeypatch):
+    _no_reflink(monkeypatch)
+    real = os.copy_file_range
+
+    def short(src_fd, dst_fd, count, *args):
+        # Stops after the first block, as some FUSE filesystems do
+        if os.lseek(dst_fd, 0, os.SEEK_CUR) > 0:
+            return 0
+        return real(src_fd, dst_fd, min(count, 4096), *args)
+
+    monkeypatch.setattr(os, "copy_file_range", short)
+    dst = tmp_path / "copy.bin"
+    method = copy_data(source, dst)
+    assert method != fastcopy.METHOD_COPY_FILE_RANGE
+    assert dst.read_bytes() == DATA
+
+
+def test_short_copy_is_never_reported_as_done(source, tmp_path, monkeypatch):
+    _no_reflink(monkeypatch)
+    monkeypatch.setattr(fastcopy, "_data_methods", lambda: iter(()))
+    monkeypatch.setattr(shutil, "copyfileobj", lambda fin, fout, n: fout.write(fin.read(1000)))
+    dst = tmp_path / "copy.bin"
+    with pytest.raises(ShortCopyError):
+        copy_data(source, dst)
+    assert not dst.exists()
+
+
+def test_move_keeps_source_when_copy_is_short(source, tmp_path, monkeypatch):
+    def truncated(src, dst, devs=None, fsync=False):
+        with open(dst, "wb") as fh:
+            fh.write(DATA[:10])
+        return fastcopy.METHOD_COPY
+
+    monkeypatch.setattr(crossmove, "copy_data", truncated)
+    dst = tmp_path / "moved.bin"
+    with pytest.raises(OSError):
+        crossmove.move_file(source, dst)
+    assert source.read_bytes() == DATA
+    assert not dst.exists()
@@ -0,0 +1,106 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from engine import build_multi_plan, execute_plan, undo_last_rename, validate_plan
+from fsbackend import (
+    FileSystem, LatencyFileSystem, MemoryFileSystem, OsFileSystem, ThrottledFileSystem, get_filesystem,
+    set_filesystem,
+)
+
+CONFIG = {"image": {"enabled": True, "prefix": "img_", "start": 1}}
+
+
+def test_memory_plan_execute_undo():
+    fs = MemoryFileSystem(["/m/b.jpg", "/m/a.jpg", "/m/sub/c.jpg", "/m/notes.txt"])
+    plan = build_multi_plan("/m", CONFIG, True, fs=fs)
+    assert validate_plan(plan, fs) == (True, [])
+    assert execute_plan(plan, fs) == (3, [])
+    assert fs.files() == [Path(p) for p in ("/m/img_1.jpg", "/m/img_2.jpg", "/m/notes.txt", "/m/sub/img_3.jpg")]
+
+    assert undo_last_rename(fs) == (3, [])
+    assert fs.files() == [Path(p) for p in ("/m/a.jpg", "/m/b.jpg", "/m/notes.txt", "/m/sub/c.jpg")]
+
+
+def test_memory_errors_and_clone():
+    fs = MemoryFileSystem(["/m/a.jpg"])
+    with pytest.raises(FileNotFoundError):
+        fs.rename(Path("/m/x.jpg"), Path("/m/y.jpg"))
+    with pytest.raises(FileNotFoundError):
+        fs.rename(Path("/m/a.jpg"), Path("/nowhere/a.jpg"))
+    with pytest.raises(FileNotFoundError):
+        fs.scandir(Path("/nowhere")).__next__()
+
+    assert fs.clone(Path("/m/a.jpg"), Path("/m/b.jpg")) == "hardlink"
+    assert fs.stat(Path("/m/b.jpg")).st_ino == fs.stat(Path("/m/a.jpg")).st_ino
+    assert fs.clone(Path("/m/a.jpg"), Path("/m/c.jpg"), allow_hardlink=False) == "copy"
+    assert fs.stat(Path("/m/c.jpg")).st_ino != fs.stat(Path("/m/a.jpg")).st_ino
+    with pytest.raises(FileExistsError):
+        fs.clone(Path("/m/a.jpg"), Path("/m/b.jpg"))
+
+
+def test_folder_mtime_moves_on_change():
+    fs = MemoryFileSystem(["/m/a.jpg"])
+    before = fs.stat(Path("/m")).st_mtime_ns
+    time.sleep(0.01)
+    fs.rename(Path("/m/a.jpg"), Path("/m/b.jpg"))
+    assert fs.stat(Path("/m")).st_mtime_ns > before
+
+
+def test_injected_failures_are_reported():
+    mem = MemoryFileSystem([f"/m/{i}.jpg" for i in range(20)])
+    plan = build_multi_plan("/m", CONFIG, False, fs=mem)
+    fs = LatencyFileSystem(mem, latency=0.0, failure_rate=1.0, fail_ops={"rename"}, seed=1)
+    renamed, failures = execute_plan(plan, fs)
+    assert renamed == 0 and len(failures) == 20
+    assert all("Injected I/O error" in f for f in failures)
+    assert fs.calls["rename"] == 20
+    # Nothing moved, so nothing to undo
+    assert mem.files() == sorted(Path(f"/m/{i}.jpg") for i in range(20))
+
+
+def test_throttle_bounds_concurrent_calls():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class Slow(MemoryFileSystem):
+        def exists(self, path):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.005)
+            with lock:
+                active[0] -= 1
+            return super().exists(path)
+
+    fs = ThrottledFileSystem(Slow(["/m/a.jpg"]), slots=2)
+    threads = [threading.Thread(target=lambda: [fs.exists(Path("/m/a.jpg")) for _ in range(5)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] <= 2
+
+
+def test_backend_must_implement_the_interface():
+    class NoClone(FileSystem):
+        scandir = stat = is_dir = exists = rename = makedirs = OsFileSystem.exists
+
+    with pytest.raises(TypeError, match="clone"):
+        NoClone()
+    with pytest.raises(TypeError):
+        FileSystem()
+
+
+def test_default_backend_can_be_swapped():
+    fs = MemoryFileSystem(["/m/a.jpg"])
+    previous = set_filesystem(fs)
+    try:
+        assert get_filesystem() is fs
+        plan = build_multi_plan("/m", CONFIG, False)
+        assert execute_plan(plan) == (1, [])
+        assert fs.files() == [Path("/m/img_1.jpg")]
+    finally:
+        set_filesystem(previous)
@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from locks import LOCK_SUFFIX, SubtreeLock, TreeLockedError, _is_stale, held_locks, lock_trees
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def locks(tmp_path, monkeypatch):
+    folder = tmp_path / "locks"
+    monkeypatch.setenv("FRESHNAMER_LOCK_DIR", str(folder))
+    return folder
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for sub in ("photos/2024", "photos/2025", "music"):
+        (tmp_path / sub).mkdir(parents=True)
+    return tmp_path
+
+
+def test_exclusive_excludes_overlapping_trees(locks, tree):
+    with SubtreeLock(tree / "photos", purpose="apply").acquire():
+        for root in (tree / "photos", tree / "photos/2024", tree):
+            with pytest.raises(TreeLockedError, match="apply"):
+                SubtreeLock(root, exclusive=False).acquire()
+        # A separate subtree is free
+        with SubtreeLock(tree / "music"):
+            pass
+
+
+def test_shared_locks_coexist(locks, tree):
+    with SubtreeLock(tree / "photos", exclusive=False), SubtreeLock(tree, exclusive=False):
+        with pytest.raises(TreeLockedError):
+            SubtreeLock(tree / "photos/2025").acquire()
+        assert len(held_locks()) == 2
+    assert held_locks() == []
+    assert list(locks.glob("*" + LOCK_SUFFIX)) == []
+
+
+def test_waits_for_the_holder(locks, tree):
+    holder = SubtreeLock(tree).acquire()
+    threading.Timer(0.3, holder.release).start()
+    started = time.monotonic()
+    with SubtreeLock(tree / "music").acquire(timeout=10):
+        assert time.monotonic() - started >= 0.2
+
+
+def test_lock_of_dead_process_is_stale(locks, tree):
+    locks.mkdir()
+    record = {"root": str(tree), "exclusive": True, "pid": 999999, "host": "h", "purpose": "x", "since": 0}
+    (locks / f"999999-1-1{LOCK_SUFFIX}").write_text(json.dumps(record), encoding="utf-8")
+    assert held_locks() == []
+    with SubtreeLock(tree):
+        pass
+    assert not (locks / f"999999-1-1{LOCK_SUFFIX}").exists()
+
+
+def test_stale_check_only_reads(locks, monkeypatch):
+    locks.mkdir()
+    path = locks / f"999999-1-1{LOCK_SUFFIX}"
+    path.write_text("{}", encoding="utf-8")
+    path.chmod(0o444)
+    real_open = os.open
+
+    def read_only_open(file, flags, *args):
+        # As a user without write access to another user's lock file
+        if flags & (os.O_WRONLY | os.O_RDWR):
+            raise PermissionError(13, "Permission denied", str(file))
+        return real_open(file, flags, *args)
+
+    monkeypatch.setattr(os, "open", read_only_open)
+    assert _is_stale(path)
+
+
+def test_lock_held_by_another_process(locks, tree):
+    script = (
+        "import sys, time\n"
+        "from locks import SubtreeLock\n"
+        "SubtreeLock(sys.argv[1], purpose='child').acquire()\n"
+        "print('ready', flush=True)\n"
+        "time.sleep(60)\n"
+    )
+    child = subprocess.Popen(
+        [sys.executable, "-c", script, str(tree)], cwd=REPO, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, PYTHONPATH=REPO),
+    )
+    try:
+        assert child.stdout.readline().strip() == "ready"
+        with pytest.raises(TreeLockedError) as info:
+            SubtreeLock(tree / "music").acquire()
+        assert info.value.holder.pid == child.pid
+    finally:
+        child.kill()
+        child.wait()
+        child.stdout.close()
+    # The kernel dropped its lock with the process
+    with SubtreeLock(tree / "music"):
+        pass
+
+
+def test_lock_trees_covers_nested_roots(locks, tree):
+    with lock_trees([tree / "photos/2024", tree / "photos", tree / "music"], purpose="batch") as held:
+        assert sorted(lock.root for lock in held) == sorted(
+            os.path.realpath(tree / p) for p in ("photos", "music")
+        )
+    assert held_locks() == []
+
+    with pytest.raises(RuntimeError):
+        with lock_trees([tree]):
+            raise RuntimeError("boom")
+    assert held_locks() == []
@@ -0,0 +1,121 @@
+import json
+import os
+import struct
+import time
+
+import pytest
+
+import metadata
+from engine import build_multi_plan
+from metadata import CaptureTimeCache, read_capture_time
+
+
+def _exif_jpeg(when: str) -> bytes:
+    """A JPEG header carrying only DateTimeOriginal (little-endian TIFF)."""
+    value = when.encode("ascii") + b"\0"
+    # IFD0 at 8: one entry pointing at the EXIF IFD at 26, which holds the date at 44
+    tiff = b"II*\0" + struct.pack("<I", 8)
+    tiff += struct.pack("<H", 1) + struct.pack("<HHII", 0x8769, 4, 1, 26) + struct.pack("<I", 0)
+    tiff += struct.pack("<H", 1) + struct.pack("<HHII", 0x9003, 2, len(value), 44) + struct.pack("<I", 0)
+    tiff += value
+    app1 = b"Exif\0\0" + tiff
+    return b"\xff\xd8\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + b"\xff\xda"
+
+
+def _epoch(when: str) -> float:
+    return time.mktime(time.strptime(when, "%Y:%m:%d %H:%M:%S"))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CaptureTimeCache(tmp_path / "capture.json")
+
+
+def test_reads_exif_date(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(_exif_jpeg("2021:06:01 12:30:00"))
+    assert read_capture_time(path) == _epoch("2021:06:01 12:30:00")
+    (tmp_path / "b.jpg").write_bytes(b"\xff\xd8\xff\xda")
+    assert read_capture_time(tmp_path / "b.jpg") is None
+
+
+def test_cache_follows_the_file_not_the_path(cache, tmp_path, monkeypatch):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(_exif_jpeg("2021:06:01 12:30:00"))
+    assert cache.lookup([path], [os.stat(path)]) == [_epoch("2021:06:01 12:30:00")]
+
+    moved = tmp_path / "b.jpg"
+    os.rename(path, moved)
+    monkeypatch.setattr(metadata, "read_capture_time", lambda p: pytest.fail(f"re-read {p}"))
+    assert cache.lookup([moved], [os.stat(moved)]) == [_epoch("2021:06:01 12:30:00")]
+
+
+def test_changed_file_is_read_again(cache, tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(_exif_jpeg("2021:06:01 12:30:00"))
+    cache.lookup([path], [os.stat(path)])
+    path.write_bytes(_exif_jpeg("2022:01:02 03:04:05") + b"pad")
+    assert cache.lookup([path], [os.stat(path)]) == [_epoch("2022:01:02 03:04:05")]
+
+
+def test_saves_only_when_changed(cache, tmp_path, monkeypatch):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(_exif_jpeg("2021:06:01 12:30:00"))
+    cache.lookup([path], [os.stat(path)])
+    cache.save()
+    assert cache.path.exists()
+
+    writes = []
+    monkeypatch.setattr(os, "replace", lambda *a: writes.append(a))
+    cache.lookup([path], [os.stat(path)])
+    cache.save()
+    # Nothing cached for a file that could not be stat'ed, so nothing to write either
+    cache.lookup([tmp_path / "gone.jpg"], [None])
+    cache.save()
+    assert writes == []
+
+
+def test_cache_is_bounded(tmp_path):
+    cache = CaptureTimeCache(tmp_path / "capture.json", max_entries=2)
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"{i}.jpg"
+        path.write_bytes(b"x" * (i + 1))
+        paths.append(path)
+    cache.lookup(paths, [os.stat(p) for p in paths])
+    cache.save()
+    stored = json.loads(cache.path.read_text(encoding="utf-8"))
+    assert len(stored) == 2
+    # The most recently added survive
+    assert set(stored) == {CaptureTimeCache._key(os.stat(p)) for p in paths[2:]}
+
+
+def test_old_cache_layout_is_dropped(cache, tmp_path):
+    cache.path.write_text(json.dumps({str(tmp_path / "a.jpg"): [1, 2, 3.0]}), encoding="utf-8")
+    assert cache.lookup([], []) == []
+    cache.save()
+    assert json.loads(cache.path.read_text(encoding="utf-8")) == {}
+
+
+def test_plan_numbers_by_capture_date(make_files, tmp_path):
+    folder = make_files("a.jpg", "b.jpg", "c.jpg")
+    (folder / "a.jpg").write_bytes(_exif_jpeg("2021:06:03 00:00:00"))
+    (folder / "b.jpg").write_bytes(_exif_jpeg("2021:06:01 00:00:00"))
+    (folder / "c.jpg").write_bytes(_exif_jpeg("2021:06:02 00:00:00"))
+    config = {"image": {"enabled": True, "prefix": "img_", "start": 1, "order": "captured"}}
+    plan = build_multi_plan(str(folder), config, False)
+    assert {op.old_path.name: op.new_path.name for op in plan.operations} == {
+        "b.jpg": "img_1.jpg", "c.jpg": "img_2.jpg", "a.jpg": "img_3.jpg",
+    }
+
+
+def test_memory_filesystem_numbers_by_mtime():
+    from fsbackend import MemoryFileSystem
+    fs = MemoryFileSystem()
+    for name, mtime in (("a.jpg", 3.0), ("b.jpg", 1.0), ("c.jpg", 2.0)):
+        fs.add_file(f"/m/{name}", mtime=mtime)
+    config = {"image": {"enabled": True, "prefix": "img_", "start": 1, "order": "mtime"}}
+    plan = build_multi_plan("/m", config, False, fs=fs)
+    assert [op.old_path.name for op in sorted(plan.operations, key=lambda op: op.new_path.name)] == [
+        "b.jpg", "c.jpg", "a.jpg",
+    ]
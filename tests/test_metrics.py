@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+import metrics
+from engine import build_multi_plan, execute_plan
+from metrics import MetricsRegistry, TextfileWriter, write_textfile
+
+
+def _registry():
+    registry = MetricsRegistry()
+    counter = registry.counter("t_files", "Files", ("phase",))
+    plain = registry.counter("t_runs", "Runs")
+    hist = registry.histogram("t_seconds", "Time", ("phase",), buckets=(0.1, 1.0))
+    return registry, counter, plain, hist
+
+
+def test_render_formats():
+    registry, counter, plain, hist = _registry()
+    counter.inc(3, phase='ex"ec')
+    hist.observe(0.05, phase="undo")
+    hist.observe(5, phase="undo")
+    text = registry.render()
+    assert '# TYPE t_files counter' in text
+    assert 't_files_total{phase="ex\\"ec"} 3' in text
+    assert "t_runs_total 0" in text
+    assert 't_seconds_bucket{phase="undo",le="0.1"} 1' in text
+    assert 't_seconds_bucket{phase="undo",le="1.0"} 1' in text
+    assert 't_seconds_bucket{phase="undo",le="+Inf"} 2' in text
+    assert 't_seconds_count{phase="undo"} 2' in text
+    assert text.endswith("# EOF\n")
+
+    classic = registry.render(openmetrics=False)
+    assert "# TYPE t_files_total counter" in classic and "# EOF" not in classic
+
+
+def test_bad_updates_raise():
+    registry, counter, plain, hist = _registry()
+    with pytest.raises(ValueError):
+        counter.inc(1)
+    with pytest.raises(ValueError):
+        plain.inc(-1)
+    with pytest.raises(ValueError):
+        registry.counter("t_runs", "again")
+
+
+def test_restore_accumulates():
+    first, counter, plain, hist = _registry()
+    counter.inc(2, phase="execute")
+    plain.inc()
+    hist.observe(0.5, phase="execute")
+    hist.observe(2, phase="execute")
+
+    second, counter2, plain2, hist2 = _registry()
+    assert second.restore(first.render() + "garbage line\nt_unknown_total 4\n") > 0
+    counter2.inc(1, phase="execute")
+    hist2.observe(0.05, phase="execute")
+    assert counter2.value(phase="execute") == 3
+    assert plain2.value() == 1
+    assert hist2.count(phase="execute") == 3
+    assert 't_seconds_bucket{phase="execute",le="0.1"} 1' in second.render()
+    assert 't_seconds_bucket{phase="execute",le="1.0"} 2' in second.render()
+
+
+def test_textfile_writer_carries_counts_over(tmp_path):
+    path = str(tmp_path / "freshnamer.prom")
+    registry, counter, _, _ = _registry()
+    counter.inc(2, phase="execute")
+    write_textfile(path, registry)
+    assert oct(os.stat(path).st_mode & 0o777) == oct(0o644)
+
+    registry, counter, _, _ = _registry()
+    writer = TextfileWriter(path, interval=60, registry=registry).start()
+    counter.inc(1, phase="execute")
+    writer.stop()
+    with open(path, encoding="utf-8") as fh:
+        assert 't_files_total{phase="execute"} 3' in fh.read()
+    assert [p.name for p in tmp_path.iterdir()] == ["freshnamer.prom"]
+
+
+def test_engine_records_renames(make_files):
+    folder = make_files("a.jpg", "b.jpg")
+    before = metrics.FILES_RENAMED.value(phase="execute")
+    plan = build_multi_plan(str(folder), {"image": {"enabled": True, "prefix": "m_"}}, False)
+    execute_plan(plan)
+    assert metrics.FILES_RENAMED.value(phase="execute") == before + 2
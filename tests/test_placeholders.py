@@ -0,0 +1,116 @@
+import pytest
+
+import placeholders
+from engine import build_multi_plan
+from placeholders import (
+    COST_IO, FunctionProvider, PlaceholderProvider, PlaceholderRegistry, load_plugins, placeholder_fields,
+)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = PlaceholderRegistry()
+    monkeypatch.setattr(placeholders, "_registry", registry)
+    placeholders.get_placeholder_cache().clear()
+    return registry
+
+
+def _config(pattern):
+    return {"image": {"enabled": True, "start": 1, "advanced_mode": True, "advanced_text": pattern}}
+
+
+def _new_names(plan):
+    return sorted(op.new_path.name for op in plan.operations)
+
+
+def test_register_rejects_bad_providers(registry):
+    with pytest.raises(ValueError):
+        registry.register(FunctionProvider("not a name", lambda files: []))
+    with pytest.raises(ValueError):
+        registry.register(FunctionProvider("num", lambda files: []))
+    with pytest.raises(ValueError):
+        registry.register(FunctionProvider("shoot", lambda files: [], cost="free"))
+    assert registry.names() == []
+
+
+def test_provider_must_implement_values():
+    class NoValues(PlaceholderProvider):
+        name = "shoot"
+
+    with pytest.raises(TypeError, match="values"):
+        NoValues()
+
+
+def test_placeholder_fields():
+    assert placeholder_fields("{shoot.code}_{num:03d}{tags[0]}") == {"shoot", "num", "tags"}
+    with pytest.raises(ValueError):
+        placeholder_fields("{0}")
+    with pytest.raises(ValueError):
+        placeholder_fields("{unclosed")
+
+
+def test_provider_runs_once_per_plan(registry, make_files):
+    calls = []
+
+    def shoot(files):
+        calls.append(list(files))
+        return [f.stem.upper() for f in files]
+
+    registry.register(FunctionProvider("shoot", shoot, cost=COST_IO))
+    folder = make_files("a.jpg", "b.jpg", "c.jpg")
+    plan = build_multi_plan(str(folder), _config("{shoot}_{num}"), False)
+    assert _new_names(plan) == ["A_1.jpg", "B_2.jpg", "C_3.jpg"]
+    assert len(calls) == 1 and len(calls[0]) == 3
+
+
+def test_cacheable_values_are_reused(registry, make_files):
+    calls = []
+
+    def size(files):
+        calls.append(len(files))
+        return [f.stat().st_size for f in files]
+
+    registry.register(FunctionProvider("size", size, cacheable=True))
+    folder = make_files("a.jpg", "b.jpg", data=b"xx")
+    build_multi_plan(str(folder), _config("{size}_{num}"), False)
+    (folder / "a.jpg").write_bytes(b"xxxx")
+    plan = build_multi_plan(str(folder), _config("{size}_{num}"), False)
+    # Only the changed file is asked for again
+    assert calls == [2, 1]
+    assert _new_names(plan) == ["2_2.jpg", "4_1.jpg"]
+
+
+@pytest.mark.parametrize("bad", [
+    lambda files: 1 / 0,
+    lambda files: ["only one"],
+])
+def test_failing_provider_becomes_a_conflict(registry, make_files, bad):
+    registry.register(FunctionProvider("boom", bad))
+    folder = make_files("a.jpg", "b.jpg")
+    plan = build_multi_plan(str(folder), _config("{boom}_{num}"), False)
+    assert any("Placeholder {boom} failed" in c for c in plan.conflicts)
+
+
+def test_unknown_placeholder_is_reported(registry, make_files):
+    folder = make_files("a.jpg")
+    plan = build_multi_plan(str(folder), _config("{nobody}_{num}"), False)
+    assert not plan.operations
+    assert any("Unknown placeholder {nobody}" in c for c in plan.conflicts)
+
+
+def test_load_plugins_skips_broken_files(tmp_path):
+    (tmp_path / "good.py").write_text(
+        "from placeholders import FunctionProvider\n"
+        "PROVIDERS = [FunctionProvider('camera', lambda files: ['x'] * len(files))]\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "hook.py").write_text(
+        "from placeholders import FunctionProvider\n"
+        "def register(registry):\n"
+        "    registry.register(FunctionProvider('lens', lambda files: ['y'] * len(files)))\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "broken.py").write_text("raise RuntimeError('nope')\n", encoding="utf-8")
+    registry = PlaceholderRegistry()
+    load_plugins(registry, str(tmp_path))
+    assert registry.names() == ["camera", "lens"]
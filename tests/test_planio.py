@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+import engine
+import planio
+from engine import RenameOperation, RenamePlan, build_multi_plan, execute_plan
+from planio import (
+    MappedPlanFile, PlanFormatError, close_plan, export_plan, export_undo_stack, import_plan, import_undo_stack,
+    iter_jsonl_operations,
+)
+
+CONFIG = {"image": {"enabled": True, "prefix": "img_", "start": 1, "renumber": "fill"}}
+
+
+def _pairs(plan):
+    return [(str(op.old_path), str(op.new_path), op.category) for op in plan.operations]
+
+
+@pytest.fixture
+def plan(make_files):
+    # img_2 is already in place: fill keeps it and counts one avoided rename
+    folder = make_files("img_2.jpg", "a.jpg", "b.jpg", "c.txt")
+    plan = build_multi_plan(str(folder), CONFIG, False)
+    assert plan.skipped_counts
+    return plan
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".fnplan"])
+def test_plan_round_trip(plan, tmp_path, suffix):
+    path = export_plan(plan, tmp_path / f"plan{suffix}")
+    loaded = import_plan(path)
+    assert _pairs(loaded) == _pairs(plan)
+    assert loaded.conflicts == plan.conflicts
+    assert loaded.skipped == plan.skipped
+    assert loaded.skipped_counts == plan.skipped_counts
+    assert loaded.name_policy == plan.name_policy
+
+
+def test_jsonl_header_carries_skipped_counts(plan, tmp_path):
+    path = export_plan(plan, tmp_path / "plan.jsonl")
+    with open(path, encoding="utf-8") as fh:
+        header = json.loads(fh.readline())
+    assert header["skipped_counts"] == [plan.skipped_counts]
+    assert [op.old_path.name for _, op in iter_jsonl_operations(path)] == [
+        op.old_path.name for op in plan.operations
+    ]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".fnplan"])
+def test_imported_plan_executes(plan, tmp_path, suffix):
+    loaded = import_plan(export_plan(plan, tmp_path / f"plan{suffix}"))
+    assert execute_plan(loaded) == (len(plan.operations), [])
+    folder = plan.operations[0].old_path.parent
+    assert sorted(p.name for p in folder.iterdir() if p.suffix == ".jpg") == ["img_1.jpg", "img_2.jpg", "img_3.jpg"]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".fnplan"])
+def test_undo_stack_round_trip(tmp_path, suffix):
+    levels = [
+        RenamePlan([RenameOperation(tmp_path / "a", tmp_path / "b", "image")], [], [], name_policy="casefold+nfc"),
+        RenamePlan([RenameOperation(tmp_path / "b", tmp_path / "c", "image"),
+                    RenameOperation(tmp_path / "x", tmp_path / "y", "video")], [], [], name_policy="casefold+nfc"),
+    ]
+    path = export_undo_stack(tmp_path / f"undo{suffix}", levels)
+    assert import_undo_stack(path) == 2
+    assert [_pairs(level) for level in engine._undo_stack] == [_pairs(level) for level in levels]
+    assert engine._undo_stack[0].name_policy == "casefold+nfc"
+
+    # A plan file is not an undo stack
+    with pytest.raises(PlanFormatError):
+        import_plan(path)
+
+
+def test_rejects_foreign_files(tmp_path):
+    (tmp_path / "x.jsonl").write_text('{"format": "other"}\n', encoding="utf-8")
+    (tmp_path / "x.fnplan").write_bytes(b"not a plan at all, but long enough to hold a header" * 2)
+    (tmp_path / "x.txt").write_text("", encoding="utf-8")
+    for name in ("x.jsonl", "x.fnplan", "x.txt"):
+        with pytest.raises(PlanFormatError):
+            import_plan(tmp_path / name)
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".fnplan"])
+def test_empty_undo_levels_keep_their_counts(tmp_path, suffix):
+    levels = [
+        RenamePlan([RenameOperation(tmp_path / "a", tmp_path / "b", "image")], [], [], {"unchanged": 1}),
+        RenamePlan([], [], [], {"no_match": 2}),
+        RenamePlan([RenameOperation(tmp_path / "x", tmp_path / "y", "video")], [], [], {"unchanged": 3}),
+        RenamePlan([], [], [], {"no_match": 4}),
+    ]
+    assert import_undo_stack(export_undo_stack(tmp_path / f"undo{suffix}", levels)) == 4
+    assert [_pairs(level) for level in engine._undo_stack] == [_pairs(level) for level in levels]
+    assert [level.skipped_counts for level in engine._undo_stack] == [level.skipped_counts for level in levels]
+
+
+def test_reads_version_1_binary_files(plan, tmp_path):
+    path = export_plan(plan, tmp_path / "plan.fnplan")
+    data = path.read_bytes()
+    (magic, _, kind, policy, _, _, n_ops, n_conflicts, n_skipped, n_strings,
+     strings_offset) = planio._HEADER.unpack_from(data, 0)
+    shift = planio._HEADER.size - planio._HEADER_V1.size
+    path.write_bytes(
+        planio._HEADER_V1.pack(magic, 1, kind, policy, n_ops, n_conflicts, n_skipped, n_strings, strings_offset - shift)
+        + data[planio._HEADER.size:]
+    )
+
+    loaded = import_plan(path)
+    assert _pairs(loaded) == _pairs(plan)
+    # Version 1 had no skipped counts
+    assert loaded.skipped_counts == {}
+    close_plan(loaded)
+
+
+def test_mapped_file_closes(plan, tmp_path):
+    path = export_plan(plan, tmp_path / "plan.fnplan")
+    with MappedPlanFile(path) as source:
+        assert source.n_levels == 1 and source.level_ranges() == [(0, len(plan.operations))]
+    with pytest.raises(ValueError):
+        source.record(0)
+
+    # A closed plan no longer holds the file, so it can be replaced
+    loaded = import_plan(path)
+    close_plan(loaded)
+    export_plan(plan, path)
@@ -0,0 +1,48 @@
+import re
+
+import pytest
+
+from preview_index import MODE_CHANGED, MODE_CONFLICTS, PreviewIndex
+
+
+@pytest.fixture
+def index():
+    return PreviewIndex([
+        ("image", "IMG_0001.JPG", "holiday_1.jpg", False),
+        ("image", "same.jpg", "same.jpg", False),
+        ("video", "clip.mov", "holiday_2.mov", True),
+        ("document", "Notes.txt", "notes_1.txt", False),
+    ])
+
+
+def test_substring_search_is_case_insensitive(index):
+    assert index.search("HOLIDAY") == {0, 2}
+    assert index.search("img_") == {0}
+    assert index.search("") == {0, 1, 2, 3}
+    assert index.search("nothing") == set()
+
+
+def test_regex_search(index):
+    assert index.search(r"^notes", regex=True) == {3}
+    assert index.search(r"_\d\.jpg$", regex=True) == {0}
+    # Never matches across the original/new boundary or into the next row
+    assert index.search(r"jpg\sholiday", regex=True) == set()
+    assert index.search(r"jpg\ssame", regex=True) == set()
+    with pytest.raises(re.error):
+        index.search("(", regex=True)
+
+
+def test_combined_filters(index):
+    assert index.visible() is None
+    assert index.visible(category="image") == {0, 1}
+    assert index.visible(mode=MODE_CHANGED) == {0, 2, 3}
+    assert index.visible(mode=MODE_CONFLICTS) == {2}
+    assert index.visible(mode=MODE_CHANGED, category="image", text="holiday") == {0}
+    assert index.visible(category="audio") == set()
+
+
+def test_empty_index():
+    index = PreviewIndex([])
+    assert index.search("x") == set()
+    assert index.search("x", regex=True) == set()
+    assert index.visible(text="x") == set()
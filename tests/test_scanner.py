@@ -0,0 +1,75 @@
+import os
+from pathlib import Path
+
+from engine import build_multi_plan
+from fsbackend import OsFileSystem
+from scanner import ScanFilter, split_globs, walk
+
+
+class _UnreadableFileSystem(OsFileSystem):
+    """Real filesystem where listing the given folders fails as without read permission."""
+
+    def __init__(self, *unreadable):
+        self.unreadable = {Path(p) for p in unreadable}
+
+    def scandir(self, path):
+        if Path(path) in self.unreadable:
+            raise PermissionError(13, "Permission denied", str(path))
+        return super().scandir(path)
+
+
+def _names(result, root):
+    return sorted(p.relative_to(root).as_posix() for p in result.files)
+
+
+def test_walk_recursive_and_flat(make_files):
+    root = make_files("a.jpg", "sub/b.jpg", "sub/deep/c.jpg")
+    fs = OsFileSystem()
+    assert _names(walk(fs, root, True), root) == ["a.jpg", "sub/b.jpg", "sub/deep/c.jpg"]
+    assert _names(walk(fs, root, False), root) == ["a.jpg"]
+
+
+def test_walk_prunes(make_files):
+    root = make_files(
+        "a.jpg", "b.tmp", "node_modules/x.jpg", ".hidden/y.jpg", "sub/deep/c.jpg", "cache/1/thumbs/t.jpg",
+    )
+    flt = ScanFilter(exclude=("node_modules", "*.tmp", "cache/*/thumbs"), skip_hidden=True, max_depth=1)
+    result = walk(OsFileSystem(), root, True, flt)
+    assert _names(result, root) == ["a.jpg"]
+    # Excluded files still occupy their names
+    assert [p.name for p in result.filtered] == ["b.tmp"]
+    assert result.pruned_dirs >= 3
+
+
+def test_walk_size_filter(make_files, tmp_path):
+    make_files("small.jpg", data=b"x")
+    make_files("big.jpg", data=b"x" * 100)
+    result = walk(OsFileSystem(), tmp_path, False, ScanFilter(min_size=10))
+    assert _names(result, tmp_path) == ["big.jpg"]
+
+
+def test_walk_deduplicates_hardlinks(make_files):
+    root = make_files("a.jpg")
+    os.link(root / "a.jpg", root / "b.jpg")
+    result = walk(OsFileSystem(), root, False)
+    assert _names(result, root) == ["a.jpg"]
+    assert result.duplicates == [(root / "b.jpg", root / "a.jpg")]
+
+
+def test_walk_skips_unreadable_folder(make_files):
+    root = make_files("a.jpg", "locked/b.jpg", "open/c.jpg")
+    result = walk(_UnreadableFileSystem(root / "locked"), root, True)
+    assert _names(result, root) == ["a.jpg", "open/c.jpg"]
+    assert result.unreadable_dirs == [root / "locked"]
+
+
+def test_plan_survives_unreadable_folder(make_files):
+    root = make_files("a.jpg", "locked/b.jpg")
+    config = {"image": {"enabled": True, "prefix": "img_", "start": 1}}
+    plan = build_multi_plan(str(root), config, True, fs=_UnreadableFileSystem(root / "locked"))
+    assert [op.old_path.name for op in plan.operations] == ["a.jpg"]
+    assert plan.skipped_counts["unreadable_dir"] == 1
+
+
+def test_split_globs():
+    assert split_globs(" *.tmp, node_modules;.git ,") == ("*.tmp", "node_modules", ".git")
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from selection import SelectionModel
+
+
+def _check(model, reference):
+    assert [model.is_selected(i) for i in range(len(reference))] == reference
+    assert model.count == sum(reference)
+    assert list(model.indices()) == [i for i, s in enumerate(reference) if s]
+    assert list(model.indices(selected=False)) == [i for i, s in enumerate(reference) if not s]
+    assert model.all_selected == all(reference)
+    assert model.none_selected == (not any(reference))
+
+
+def test_basic_operations():
+    model = SelectionModel(10)
+    assert model.all_selected and model.count == 10
+    assert model.set(3, False) is True
+    assert model.set(3, False) is False
+    model.invert()
+    _check(model, [i == 3 for i in range(10)])
+    model.set_all(False)
+    _check(model, [False] * 10)
+    assert model.set_many([1, 2, 2, 9], True) == 3
+    _check(model, [i in (1, 2, 9) for i in range(10)])
+
+
+def test_whole_selection_changes_do_not_touch_rows():
+    # Far more rows than could ever be allocated: only a row change needs the bitset
+    model = SelectionModel(10**12)
+    model.set_all(False)
+    model.invert()
+    model.reset(10**12, selected=False)
+    assert model.none_selected and not model.is_selected(10**12 - 1)
+    assert next(model.indices(selected=False)) == 0
+
+
+@pytest.mark.parametrize("size", [0, 1, 7, 8, 9, 63, 64, 200])
+def test_matches_a_plain_list(size):
+    rng = random.Random(size)
+    model = SelectionModel(size)
+    reference = [True] * size
+    for _ in range(300):
+        action = rng.randrange(5)
+        value = rng.random() < 0.5
+        if action == 0 and size:
+            i = rng.randrange(size)
+            model.set(i, value)
+            reference[i] = value
+        elif action == 1:
+            start, stop = sorted(rng.randrange(-2, size + 3) for _ in range(2))
+            model.set_range(start, stop, value)
+            for i in range(max(start, 0), min(stop, size)):
+                reference[i] = value
+        elif action == 2:
+            model.invert()
+            reference = [not s for s in reference]
+        elif action == 3:
+            model.set_all(value)
+            reference = [value] * size
+        else:
+            picked = rng.sample(range(size), min(size, 5))
+            model.set_many(picked, value)
+            for i in picked:
+                reference[i] = value
+        _check(model, reference)
@@ -0,0 +1,148 @@
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from locks import lock_trees
+from service import (
+    INVALID_PARAMS, METHOD_NOT_FOUND, PARSE_ERROR, SERVER_BUSY, TREE_LOCKED, UNKNOWN_PLAN,
+    HttpRpcServer, RenameService, UnixRpcServer,
+)
+
+CONFIG = {"image": {"enabled": True, "prefix": "x_", "padding": 2, "start": 1}}
+
+
+@pytest.fixture
+def http_server():
+    service = RenameService(workers=2, queue=2)
+    server = HttpRpcServer("127.0.0.1", 0, service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def _post(server, body, headers=None):
+    port = server.server_address[1]
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+    conn.request("POST", "/", payload, headers)
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    lines = [json.loads(line) for line in data.splitlines() if line.strip()]
+    return response.status, lines
+
+
+def _rpc(method, params=None, req_id=1):
+    return {"jsonrpc": "2.0", "id": req_id, "method": method, "params": params or {}}
+
+
+def test_http_plan_and_execute(http_server, make_files):
+    folder = make_files("a.jpg", "b.jpg")
+    status, [reply] = _post(http_server, _rpc("plan", {"folder": str(folder), "config": CONFIG}))
+    assert status == 200
+    plan_id = reply["result"]["plan_id"]
+    assert reply["result"]["operations"] == 2
+    # Random, not a counter another client could guess
+    assert plan_id not in ("p1", "p2") and len(plan_id) > 16
+
+    status, [reply] = _post(http_server, _rpc("execute", {"plan_id": plan_id}))
+    assert reply["result"]["renamed"] == 2
+    assert sorted(p.name for p in folder.iterdir()) == ["x_01.jpg", "x_02.jpg"]
+
+
+def test_http_refuses_browser_requests(http_server, make_files):
+    folder = make_files("a.jpg", "b.jpg")
+    request = _rpc("plan", {"folder": str(folder), "config": CONFIG})
+
+    status, [reply] = _post(http_server, request, {"Content-Type": "text/plain"})
+    assert status == 415
+    assert "error" in reply
+
+    status, _ = _post(http_server, request, {"Origin": "http://evil.example"})
+    assert status == 403
+
+    status, _ = _post(http_server, request, {"Host": "evil.example:80"})
+    assert status == 403
+
+    # None of them got as far as planning
+    assert http_server.service._plans == {}
+    assert sorted(p.name for p in folder.iterdir()) == ["a.jpg", "b.jpg"]
+
+
+def test_http_errors_and_streaming(http_server, make_files):
+    status, [reply] = _post(http_server, b"{not json")
+    assert reply["error"]["code"] == PARSE_ERROR
+
+    _, [reply] = _post(http_server, _rpc("nope"))
+    assert reply["error"]["code"] == METHOD_NOT_FOUND
+
+    _, [reply] = _post(http_server, _rpc("plan", {"folder": "/x"}))
+    assert reply["error"]["code"] == INVALID_PARAMS
+
+    _, [reply] = _post(http_server, _rpc("execute", {"plan_id": "p1"}))
+    assert reply["error"]["code"] == UNKNOWN_PLAN
+
+    folder = make_files(*(f"f{i}.jpg" for i in range(5)))
+    _, lines = _post(http_server, _rpc("plan", {
+        "folder": str(folder), "config": CONFIG, "stream": True, "chunk": 2,
+    }))
+    assert lines[0]["method"] == "job"
+    chunks = [m for m in lines if m.get("method") == "plan.operations"]
+    assert [len(c["params"]["operations"]) for c in chunks] == [2, 2, 1]
+    assert lines[-1]["result"]["operations"] == 5
+
+
+def test_busy_and_locked_jobs(make_files):
+    folder = make_files("a.jpg")
+    service = RenameService(workers=1, queue=0)
+    params = {"folder": str(folder), "config": CONFIG}
+    try:
+        with lock_trees([folder], purpose="test"):
+            with pytest.raises(Exception) as info:
+                service.handle("plan", dict(params)).result(timeout=10)
+            assert info.value.code == TREE_LOCKED
+
+            waiting = service.handle("plan", dict(params, wait=10))
+            with pytest.raises(Exception) as info:
+                service.handle("plan", dict(params))
+            assert info.value.code == SERVER_BUSY
+        assert waiting.result(timeout=10)["operations"] == 1
+    finally:
+        service.close()
+
+
+def test_unix_socket(tmp_path, make_files):
+    folder = make_files("a.jpg", "b.jpg")
+    path = str(tmp_path / "rpc.sock")
+    service = RenameService()
+    server = UnixRpcServer(path, service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with pytest.raises(OSError):
+            UnixRpcServer(path, RenameService())
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        reader = client.makefile("rb")
+        client.sendall(b"garbage\n")
+        assert json.loads(reader.readline())["error"]["code"] == PARSE_ERROR
+        request = _rpc("plan", {"folder": str(folder), "config": CONFIG, "stream": True}, req_id=7)
+        client.sendall(json.dumps(request).encode() + b"\n")
+        messages = []
+        while not messages or "result" not in messages[-1]:
+            messages.append(json.loads(reader.readline()))
+        assert messages[0]["method"] == "job"
+        assert messages[-1]["id"] == 7
+        assert messages[-1]["result"]["operations"] == 2
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
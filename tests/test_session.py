@@ -0,0 +1,71 @@
+import pytest
+
+from engine import build_multi_plan
+from session import SESSION_FILE, SNAPSHOT_FILE, diff_plans, load_session, save_session
+
+CONFIG = {"image": {"enabled": True, "prefix": "img_", "start": 1}}
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setenv("FRESHNAMER_CACHE_DIR", str(path))
+    return path
+
+
+def test_round_trip_with_snapshot(make_files, cache):
+    folder = make_files("a.jpg", "b.jpg")
+    plan = build_multi_plan(str(folder), CONFIG, True)
+    save_session(str(folder), True, CONFIG, plan)
+
+    session = load_session()
+    assert (session.folder, session.recursive, session.config) == (str(folder), True, CONFIG)
+    assert [op.new_path for op in session.plan.operations] == [op.new_path for op in plan.operations]
+    assert session.saved_at > 0
+
+
+def test_no_snapshot_for_empty_plan(cache):
+    save_session("/somewhere", False, CONFIG)
+    session = load_session()
+    assert session.folder == "/somewhere" and session.plan is None
+    assert not (cache / SNAPSHOT_FILE).exists()
+
+
+def test_missing_or_broken_session(cache):
+    assert load_session() is None
+    cache.mkdir()
+    (cache / SESSION_FILE).write_text("{broken", encoding="utf-8")
+    assert load_session() is None
+    (cache / SESSION_FILE).write_text('{"folder": ""}', encoding="utf-8")
+    assert load_session() is None
+
+
+def test_broken_snapshot_keeps_settings(make_files, cache):
+    folder = make_files("a.jpg")
+    save_session(str(folder), False, CONFIG, build_multi_plan(str(folder), CONFIG, False))
+    (cache / SNAPSHOT_FILE).write_bytes(b"garbage")
+    session = load_session()
+    assert session.folder == str(folder) and session.plan is None
+
+
+def test_save_failure_is_not_raised(tmp_path, monkeypatch):
+    blocker = tmp_path / "file"
+    blocker.write_text("", encoding="utf-8")
+    monkeypatch.setenv("FRESHNAMER_CACHE_DIR", str(blocker / "cache"))
+    save_session("/x", False, CONFIG)
+    assert load_session() is None
+
+
+def test_diff_plans_by_source_path(make_files):
+    folder = make_files("a.jpg", "b.jpg", "c.jpg")
+    cached = build_multi_plan(str(folder), CONFIG, False)
+    assert diff_plans(cached, build_multi_plan(str(folder), CONFIG, False)).is_empty
+
+    (folder / "a.jpg").unlink()
+    (folder / "d.jpg").write_bytes(b"")
+    fresh = build_multi_plan(str(folder), CONFIG, False)
+    diff = diff_plans(cached, fresh)
+    assert diff.removed == {folder / "a.jpg"}
+    assert [fresh.operations[i].old_path.name for i in diff.added] == ["d.jpg"]
+    # Numbers shift down by one for the files that are still there
+    assert diff.changed == {folder / "b.jpg", folder / "c.jpg"}
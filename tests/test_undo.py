@@ -0,0 +1,151 @@
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import crossmove
+import engine
+from engine import RenameOperation, RenamePlan, compose_undo, execute_plan, undo_last_rename, undo_to
+from fsbackend import OsFileSystem
+
+
+class _CaseInsensitiveFileSystem(OsFileSystem):
+    """Real folder whose names are looked up ignoring case, as on macOS or Windows."""
+
+    def __init__(self, fail_from=()):
+        self.fail_from = set(fail_from)
+
+    @staticmethod
+    def _actual(path):
+        path = Path(path)
+        try:
+            for name in os.listdir(path.parent):
+                if name.casefold() == path.name.casefold():
+                    return path.parent / name
+        except OSError:
+            pass
+        return path
+
+    def exists(self, path):
+        return os.path.lexists(self._actual(path))
+
+    def stat(self, path, follow_symlinks=True):
+        return os.stat(self._actual(path), follow_symlinks=follow_symlinks)
+
+    def rename(self, src, dst):
+        if Path(src).name in self.fail_from:
+            raise PermissionError(13, "Permission denied", str(src))
+        src, taken = self._actual(src), self._actual(dst)
+        if taken != src and os.path.lexists(taken):
+            raise FileExistsError(17, "File exists", str(dst))
+        os.rename(src, dst)
+
+
+class _TwoDeviceFileSystem(OsFileSystem):
+    """Real folders, one of which reports another device (moves to it cross devices)."""
+
+    def __init__(self, other):
+        self.other = other
+
+    def stat(self, path, follow_symlinks=True):
+        st = os.stat(path, follow_symlinks=follow_symlinks)
+        if Path(path) == self.other:
+            return SimpleNamespace(st_dev=st.st_dev + 1, st_mode=st.st_mode)
+        return st
+
+
+def _plan(folder, *pairs, policy="nfc"):
+    ops = [RenameOperation(folder / a, folder / b, "image") for a, b in pairs]
+    return RenamePlan(operations=ops, conflicts=[], skipped=[], name_policy=policy)
+
+
+def _names(folder):
+    return sorted(p.name for p in folder.iterdir())
+
+
+def test_compose_undo_collapses_levels():
+    d = Path("/d")
+    plans = [
+        _plan(d, ("a", "b"), ("x", "y")),
+        _plan(d, ("b", "c"), ("y", "x")),
+        _plan(d, ("c", "d")),
+    ]
+    assert compose_undo(plans) == [RenameOperation(d / "d", d / "a", "image")]
+
+
+def test_compose_undo_within_a_plan_is_simultaneous():
+    d = Path("/d")
+    # b → c runs before a → b: both files still go back one step
+    ops = compose_undo([_plan(d, ("b", "c"), ("a", "b"))])
+    assert sorted((op.old_path.name, op.new_path.name) for op in ops) == [("b", "a"), ("c", "b")]
+
+
+def test_undo_to_restores_several_levels(make_files):
+    folder = make_files("a.jpg", "b.jpg")
+    (folder / "a.jpg").write_bytes(b"a")
+    (folder / "b.jpg").write_bytes(b"b")
+    assert execute_plan(_plan(folder, ("a.jpg", "x.jpg"), ("b.jpg", "y.jpg"))) == (2, [])
+    assert execute_plan(_plan(folder, ("x.jpg", "b.jpg"), ("y.jpg", "a.jpg"))) == (2, [])
+    assert (folder / "a.jpg").read_bytes() == b"b"
+
+    # Undone as one swap (a cycle, through a temporary name), not four renames
+    assert undo_to(0) == (3, [])
+    assert (folder / "a.jpg").read_bytes() == b"a"
+    assert (folder / "b.jpg").read_bytes() == b"b"
+    assert _names(folder) == ["a.jpg", "b.jpg"]
+    assert engine._undo_stack == []
+
+
+def test_undo_to_bad_level():
+    count, errors = undo_to(3)
+    assert count == 0 and "No undo level" in errors[0]
+
+
+def test_partial_undo_keeps_case_only_renames(make_files):
+    folder = make_files("a.jpg", "b.jpg")
+    fs = _CaseInsensitiveFileSystem()
+    # The policy detect_policy() finds on such a filesystem
+    plan = _plan(folder, ("a.jpg", "A.jpg"), ("b.jpg", "c.jpg"), policy="casefold+nfc")
+    assert execute_plan(plan, fs) == (2, [])
+    assert _names(folder) == ["A.jpg", "c.jpg"]
+
+    fs.fail_from = {"c.jpg"}
+    count, failures = undo_to(0, fs)
+    # A → a went through a temporary name: two renames
+    assert count == 2 and len(failures) == 1
+    assert _names(folder) == ["a.jpg", "c.jpg"]
+    # The case-only rename happened (both spellings "exist" here) and is
+    # pushed as its own level, so it can be reverted
+    partial = engine._undo_stack[-1]
+    assert [(op.old_path.name, op.new_path.name) for op in partial.operations] == [("A.jpg", "a.jpg")]
+
+    fs.fail_from = set()
+    assert undo_last_rename(fs) == (1, [])
+    assert _names(folder) == ["A.jpg", "c.jpg"]
+
+
+def test_cross_device_undo_keeps_chain_order(tmp_path, monkeypatch):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir()
+    b.mkdir()
+    # After a level that moved a/x → b/x and, at once, b/x → a/y
+    (b / "x").write_bytes(b"was a/x")
+    (a / "y").write_bytes(b"was b/x")
+    engine._undo_stack.append(RenamePlan(
+        operations=[RenameOperation(a / "x", b / "x", "image"), RenameOperation(b / "x", a / "y", "image")],
+        conflicts=[], skipped=[],
+    ))
+
+    # b/x → a/x is slow; a/y → b/x must still wait for it
+    move_file = crossmove.move_file
+
+    def slow_move(src, dst, **kwargs):
+        if Path(dst) == a / "x":
+            time.sleep(0.2)
+        return move_file(src, dst, **kwargs)
+
+    monkeypatch.setattr(crossmove, "move_file", slow_move)
+    assert undo_to(0, _TwoDeviceFileSystem(b), workers=4) == (2, [])
+    assert (a / "x").read_bytes() == b"was a/x"
+    assert (b / "x").read_bytes() == b"was b/x"
+    assert not (a / "y").exists()